@@ -0,0 +1,328 @@
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+class PipelineStage:
+    # Черга етапу конвеєра разом з лічильниками для звіту про пропускну здатність
+
+    def __init__(self, name, queue_size):
+        self.name = name
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.busy_time = 0.0
+        self.max_depth = 0
+        self.started = time.monotonic()
+
+
+    async def put(self, item):
+        await self.queue.put(item)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+
+    def report(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        avg_time = self.busy_time / self.processed if self.processed else 0.0
+        return (f"{self.name}: queue {self.queue.qsize()}/{self.queue.maxsize} (max {self.max_depth}), "
+                f"processed {self.processed}, {self.processed / elapsed:.2f}/s, avg {avg_time * 1000:.1f} ms")
+
+
+class AsyncPipeline:
+    # Асинхронний варіант обробки сторінок:
+    # sitemap -> сторінка гри -> сторінка завантаження -> .torrent -> магнет-посилання.
+    # Кожен етап має власну обмежену чергу (backpressure) і пул обробників.
+    # Запити cloudscraper блокуючі, тому виконуються в потоках через run_in_executor.
+
+    def __init__(self, parser, queue_size=64, report_interval=30):
+        self.parser = parser
+        self.queue_size = queue_size
+        self.report_interval = report_interval
+
+
+    # MARK: run
+    def run(self, items, progress=None, start=0):
+        # items - (індекс, url) після start вже оброблених URL (відновлення з контрольної точки)
+        asyncio.run(self._run(items, progress, start))
+
+
+    async def _run(self, items, progress, start):
+        workers = self.parser.concurrency
+        self.executor = ThreadPoolExecutor(max_workers=workers * 3 + 2)
+
+        self.stages = {
+            "sitemap": PipelineStage("sitemap", self.queue_size),
+            "pages": PipelineStage("pages", self.queue_size),
+            "download_pages": PipelineStage("download_pages", self.queue_size),
+            "torrents": PipelineStage("torrents", self.queue_size),
+            "magnets": PipelineStage("magnets", self.queue_size),
+        }
+        self.done = asyncio.Queue()
+        # Обмежує кількість сторінок "в польоті", включно з тими, що чекають впорядкованого запису
+        self.in_flight = asyncio.Semaphore(self.queue_size * 2)
+
+        tasks = [
+            *[asyncio.create_task(self._stage_worker("pages", self._process_page)) for _ in range(workers)],
+            *[asyncio.create_task(self._stage_worker("download_pages", self._process_download_page)) for _ in range(workers)],
+            *[asyncio.create_task(self._stage_worker("torrents", self._process_torrent)) for _ in range(workers)],
+            *[asyncio.create_task(self._stage_worker("magnets", self._process_magnet)) for _ in range(2)],
+            asyncio.create_task(self._stage_worker("sitemap", self._process_sitemap_entry)),
+            asyncio.create_task(self._report_loop()),
+        ]
+
+        tasks.append(asyncio.create_task(self._feed(items, start)))
+
+        try:
+            await self._collect(progress, start)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.executor.shutdown(wait=True)
+            self._report(final=True)
+
+
+    # MARK: _feed
+    async def _feed(self, items, start):
+        # Наступний URL може чекати на завантаження sitemap, тому береться в потоці, а не в циклі подій
+        total = start
+        items = iter(items)
+        while True:
+            item = await self._to_thread(next, items, None)
+            if item is None:
+                break
+            await self.stages["sitemap"].put(item)
+            total = item[0]
+        # Маркер кінця: після нього колектор знає загальну кількість сторінок
+        await self.done.put({"total": total})
+
+
+    # MARK: _collect
+    async def _collect(self, progress, start):
+        # Результати приходять у довільному порядку, а застосовуються строго в порядку sitemap
+        ready = {}
+        next_index = start + 1
+        total = None
+        while total is None or next_index <= total:
+            result = await self.done.get()
+            if "total" in result:
+                total = result["total"]
+                continue
+            ready[result["index"]] = result
+
+            while next_index in ready:
+                self.parser._apply_result(ready.pop(next_index))
+                self.in_flight.release()
+                next_index += 1
+                if progress is not None:
+                    progress.update()
+
+
+    # MARK: _stage_worker
+    async def _stage_worker(self, stage_name, handler):
+        stage = self.stages[stage_name]
+        while True:
+            item = await stage.queue.get()
+            started = time.monotonic()
+            try:
+                await handler(item)
+            except Exception as e:
+                logging.error(f"(PIPELINE) {stage_name} failed: {e}")
+                # Інакше сторінка цього елемента ніколи не потрапить у done, і _collect чекатиме на неї вічно
+                await self._fail_item(stage_name, item, e)
+            finally:
+                stage.busy_time += time.monotonic() - started
+                stage.processed += 1
+                stage.queue.task_done()
+
+
+    async def _fail_item(self, stage_name, item, e):
+        if stage_name == "sitemap":
+            index, url = item
+            result = self.parser._new_result(index)
+            self.parser._handle_processing_error(result, url, e)
+            await self.done.put(result)
+        elif stage_name == "pages":
+            self.parser._handle_processing_error(item["result"], item["url"], e)
+            # Якщо посилання вже передано далі, сторінку завершить останнє з них
+            if "options" not in item:
+                await self._page_done(item)
+        else:
+            job, slot = item[0], item[1]
+            job["links_failed"] = True
+            await self._finish_option(job, slot, None)
+
+
+    async def _to_thread(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+
+    async def _fetch(self, url, stage):
+        response = await self._to_thread(functools.partial(self.parser._get, url, stage=stage))
+        response.raise_for_status()
+        return response
+
+
+    # MARK: _process_sitemap_entry
+    async def _process_sitemap_entry(self, item):
+        index, url = item
+        await self.in_flight.acquire()
+        await self.stages["pages"].put({
+            "url": url,
+            "result": self.parser._new_result(index)
+        })
+
+
+    # MARK: _process_page
+    async def _process_page(self, job):
+        parser = self.parser
+        result = job["result"]
+        url = job["url"]
+        try:
+            page_response = await self._to_thread(parser._fetch_game_page, result, url)
+            if page_response is None:
+                await self._page_done(job)
+                return
+
+            site_update_date, site_game_name, links = await self._to_thread(parser._parse_game_page_response, page_response)
+
+            if not parser._needs_download_options(result, url, site_update_date, site_game_name):
+                await self._page_done(job)
+                return
+
+            links = parser._skip_dead_torrents(result, links, site_update_date)
+            job["site_update_date"] = site_update_date
+            job["site_game_name"] = site_game_name
+
+        except requests.RequestException as e:
+            parser._handle_connection_error(result, url, e)
+            await self._page_done(job)
+            return
+
+        except Exception as e:
+            parser._handle_processing_error(result, url, e)
+            await self._page_done(job)
+            return
+
+        # Результати посилань збираються у слоти, щоб зберегти порядок варіантів завантаження
+        job["links"] = links
+        job["options"] = [None] * len(links)
+        job["finished"] = [False] * len(links)
+        job["remaining"] = len(links)
+        job["links_failed"] = False  # помилка запиту хоч одного посилання (див. IgruhaParser._fill_result)
+        if not links:
+            await self._finish_page(job)
+            return
+
+        for slot, (download_page_url, size_text) in enumerate(links):
+            await self.stages["download_pages"].put((job, slot, download_page_url, size_text))
+
+
+    # MARK: _process_download_page
+    async def _process_download_page(self, item):
+        job, slot, download_page_url, size_text = item
+        try:
+            page_response_2 = await self._fetch(download_page_url, 'download_page')
+            torrent_url = await self._to_thread(self.parser._extract_torrent_url_response, page_response_2)
+        except Exception as e:
+            logging.error(f"Failed to process {download_page_url}: {e}")
+            job["links_failed"] = True
+            torrent_url = None
+
+        if not torrent_url:
+            await self._finish_option(job, slot, None)
+            return
+
+        await self.stages["torrents"].put((job, slot, torrent_url, size_text))
+
+
+    # MARK: _process_torrent
+    async def _process_torrent(self, item):
+        job, slot, torrent_url, size_text = item
+        try:
+            response, magnet_info = await self._to_thread(self.parser._fetch_torrent, torrent_url)
+        except requests.RequestException as e:
+            logging.error(f"Failed to download {torrent_url}: {e}")
+            job["links_failed"] = True
+            await self._finish_option(job, slot, None)
+            return
+        except Exception as e:
+            # Наприклад, винятки cloudscraper (CloudflareChallengeError) - не RequestException
+            logging.error(f"Failed to process {job['links'][slot][0]}: {e}")
+            job["links_failed"] = True
+            await self._finish_option(job, slot, None)
+            return
+
+        # Торрент не змінився (304) - етап розбору не потрібен
+        if magnet_info is not None:
+            self._record_torrent_check(job, slot, magnet_info)
+            await self._finish_option(job, slot, self.parser._build_download_option(size_text, magnet_info))
+            return
+
+        await self.stages["magnets"].put((job, slot, torrent_url, size_text, response))
+
+
+    # MARK: _process_magnet
+    async def _process_magnet(self, item):
+        job, slot, torrent_url, size_text, response = item
+        try:
+            magnet_info = await self._to_thread(self.parser._torrent_response_to_magnet, torrent_url, response)
+            self._record_torrent_check(job, slot, magnet_info)
+            download_option = self.parser._build_download_option(size_text, magnet_info)
+        except Exception as e:
+            logging.error(f"Failed to process torrent for {job['url']}: {e}")
+            job["links_failed"] = True
+            download_option = None
+
+        await self._finish_option(job, slot, download_option)
+
+
+    def _record_torrent_check(self, job, slot, magnet_info):
+        download_page_url = job["links"][slot][0]
+        self.parser._record_torrent_check(job["url"], job["site_update_date"], download_page_url, magnet_info)
+
+
+    async def _finish_option(self, job, slot, download_option):
+        # Кожен слот завершується один раз, навіть якщо після помилки його завершує ще й _fail_item
+        if job["finished"][slot]:
+            return
+        job["finished"][slot] = True
+        job["options"][slot] = download_option
+        job["remaining"] -= 1
+        if job["remaining"] == 0:
+            await self._finish_page(job)
+
+
+    async def _finish_page(self, job):
+        result = job["result"]
+        download_options = [option for option in job["options"] if option]
+        try:
+            await self._to_thread(self.parser._fill_result, result, job["url"],
+                                  job["site_update_date"], job["site_game_name"], download_options, len(job["links"]), job["links_failed"])
+        except Exception as e:
+            self.parser._handle_processing_error(result, job["url"], e)
+        await self._page_done(job)
+
+
+    async def _page_done(self, job):
+        if job.get("done"):
+            return
+        job["done"] = True
+        await self.done.put(job["result"])
+
+
+    # MARK: _report
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self._report()
+
+
+    def _report(self, final=False):
+        for stage in self.stages.values():
+            logging.info(f"(PIPELINE) {stage.report()}")
+            if final:
+                print(f"(PIPELINE) {stage.report()}")
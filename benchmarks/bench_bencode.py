@@ -0,0 +1,145 @@
+# Порівняння швидкого сканера .torrent (utils/bencode_scanner.py) з повним розбором через bencodepy.
+# Спочатку перевіряє, що на корпусі торрентів обидва шляхи дають однакові магнет-посилання,
+# потім вимірює час обробки.
+#
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.bench_bencode
+#   python -m benchmarks.bench_bencode --torrents-dir path/to/torrents  (додатково перевірити власні файли)
+
+import argparse
+import glob
+import logging
+import os
+import random
+import time
+
+import bencodepy
+
+from igruha_parser import IgruhaParser
+from utils.bencode_scanner import torrent_to_magnet, BencodeFallback
+
+
+def legacy_torrent_to_magnet(torrent_bytes):
+    # Старий шлях не використовує стан парсера, тому self не потрібен
+    return IgruhaParser._torrent_to_magnet_bencodepy(None, torrent_bytes)
+
+
+def fast_torrent_to_magnet(torrent_bytes):
+    try:
+        return torrent_to_magnet(torrent_bytes)
+    except Exception:
+        return legacy_torrent_to_magnet(torrent_bytes)
+
+
+# MARK: build_corpus
+def build_corpus(seed=1):
+    rng = random.Random(seed)
+    corpus = {}
+
+    def pieces(count):
+        return bytes(rng.getrandbits(8) for _ in range(20 * count))
+
+    corpus['single_file'] = bencodepy.encode({
+        b'announce': b'http://tracker.example/announce',
+        b'creation date': 1700000000,
+        b'info': {b'length': 123456789, b'name': b'Game.iso', b'piece length': 262144, b'pieces': pieces(50)}
+    })
+    corpus['multi_file'] = bencodepy.encode({
+        b'announce': b'udp://tracker.example:80',
+        b'announce-list': [[b'udp://tracker.example:80'], [b'http://backup.example/announce']],
+        b'comment': b'https://itorrents-igruha.org',
+        b'creation date': 1650000000,
+        b'info': {
+            b'files': [{b'length': rng.randrange(1, 10 ** 9), b'path': [b'data', f'file{i}.bin'.encode()]} for i in range(300)],
+            b'name': 'Игра (RePack от xatab)'.encode(),
+            b'piece length': 4194304,
+            b'pieces': pieces(2000)
+        }
+    })
+    corpus['no_announce_no_date'] = bencodepy.encode({
+        b'info': {b'length': 1, b'name': b'a b&c', b'piece length': 16384, b'pieces': pieces(1)}
+    })
+    corpus['announce_list_only'] = bencodepy.encode({
+        b'announce-list': [[b'udp://a.example:1']],
+        b'info': {b'files': [], b'name': b'empty', b'piece length': 16384, b'pieces': b''}
+    })
+    corpus['private_nested'] = bencodepy.encode({
+        b'announce': b'',
+        b'info': {b'length': 0, b'name': b'x', b'piece length': 16384, b'pieces': b'', b'private': 1,
+                  b'source': {b'a': [1, 2, {b'b': b'c'}]}}
+    })
+    # Неканонічні та пошкоджені файли: сканер має передати їх повному розбору
+    corpus['unsorted_info_keys'] = (b'd8:announce3:abc4:infod4:name1:x6:lengthi5e12:piece lengthi16384e6:pieces0:ee')
+    corpus['leading_zero_int'] = (b'd4:infod6:lengthi05e4:name1:x12:piece lengthi16384e6:pieces0:ee')
+    corpus['duplicate_info_key'] = (b'd4:infod6:lengthi5e6:lengthi6e4:name1:xee')
+    corpus['announce_as_list'] = (b'd8:announcel3:abce4:infod6:lengthi5e4:name1:xee')
+    corpus['truncated'] = corpus['multi_file'][:len(corpus['multi_file']) // 2]
+    corpus['not_a_dict'] = b'li1ei2ee'
+    corpus['bad_utf8_name'] = bencodepy.encode({b'info': {b'length': 1, b'name': b'\xff\xfe'}})
+    corpus['trailing_garbage'] = corpus['single_file'] + b'garbage'
+    return corpus
+
+
+# MARK: verify
+def verify(corpus):
+    mismatches = 0
+    for name, torrent_bytes in corpus.items():
+        expected = legacy_torrent_to_magnet(torrent_bytes)
+        actual = fast_torrent_to_magnet(torrent_bytes)
+        try:
+            torrent_to_magnet(torrent_bytes)
+            path = 'scanner'
+        except BencodeFallback:
+            path = 'fallback'
+        except Exception:
+            path = 'fallback (error)'
+
+        status = 'OK' if expected == actual else 'MISMATCH'
+        if expected != actual:
+            mismatches += 1
+        print(f'{status:8} {path:16} {name}')
+        if expected != actual:
+            print(f'         expected: {expected}')
+            print(f'         actual:   {actual}')
+    return mismatches
+
+
+# MARK: bench
+def bench(func, corpus, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for torrent_bytes in corpus:
+            func(torrent_bytes)
+    return (time.perf_counter() - started) / (repeat * len(corpus))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark .torrent info-hash extraction')
+    parser.add_argument('--torrents-dir', help='directory with additional .torrent files to verify and benchmark')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)  # пошкоджені торренти з корпусу інакше засмічують вивід помилками
+
+    corpus = build_corpus()
+    if args.torrents_dir:
+        for path in sorted(glob.glob(os.path.join(args.torrents_dir, '*.torrent'))):
+            with open(path, 'rb') as f:
+                corpus[os.path.basename(path)] = f.read()
+
+    mismatches = verify(corpus)
+    print(f'\nMismatches: {mismatches}\n')
+
+    valid = [torrent_bytes for torrent_bytes in corpus.values() if legacy_torrent_to_magnet(torrent_bytes)[0]]
+    for name, torrent_bytes in [('multi_file', corpus['multi_file']), ('single_file', corpus['single_file']), ('all valid', None)]:
+        sample = valid if torrent_bytes is None else [torrent_bytes]
+        legacy_time = bench(legacy_torrent_to_magnet, sample, args.repeat)
+        fast_time = bench(fast_torrent_to_magnet, sample, args.repeat)
+        print(f'{name:12} bencodepy {legacy_time * 1e6:9.1f} us   scanner {fast_time * 1e6:9.1f} us   x{legacy_time / fast_time:.1f}')
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# Пропускна здатність CPU-етапів (розбір сторінки гри, сторінки завантаження і .torrent) у потоках парсера
+# проти пулу процесів (cpu_workers, utils/cpu_pool.py). Корпус - відповіді синтетичного сайту; їх обробляють
+# --threads потоків, як у звичайному запуску. Спочатку перевіряється, що пул дає ті самі результати, що й потоки.
+# Прискорення обмежене кількістю ядер машини (виводиться в заголовку).
+#
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.bench_cpu
+#   python -m benchmarks.bench_cpu --pages 500 --workers 1,2,4,8 --html-parser soup --json results.json
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.common import make_parser
+from benchmarks.site_fixture import SyntheticSite, resource_kind
+
+
+def build_corpus(pages):
+    # [(метод парсера, аргумент)] для всіх сторінок і торрентів сайту
+    site = SyntheticSite(pages=pages, seed=1)
+    corpus = []
+    for url, item in site.responses.items():
+        kind = resource_kind(url)
+        if kind == 'torrent_fetch':
+            corpus.append(('_torrent_to_magnet', item["body"]))
+            continue
+        if kind == 'sitemap_fetch':
+            continue
+        response = requests.Response()
+        response._content = item["body"]
+        response.encoding = 'utf-8'
+        response.status_code = 200
+        method = '_extract_torrent_url_response' if kind == 'download_page_fetch' else '_parse_game_page_response'
+        corpus.append((method, response))
+    return corpus
+
+
+def process(parser, corpus, threads):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(lambda task: getattr(parser, task[0])(task[1]), corpus))
+
+
+# MARK: measure
+def measure(work_dir, corpus, threads, cpu_workers, html_parser, repeat):
+    parser = make_parser(os.path.join(work_dir, f'workers-{cpu_workers}'), html_parser=html_parser, cpu_workers=cpu_workers)
+    try:
+        # Перший прохід запускає процеси пулу і не входить у вимірювання
+        results = process(parser, corpus, threads)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            process(parser, corpus, threads)
+        seconds = (time.perf_counter() - started) / repeat
+    finally:
+        if parser._cpu_pool is not None:
+            parser._cpu_pool.close()
+    return results, seconds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='CPU stage throughput: parser threads vs process pool')
+    arg_parser.add_argument('--pages', type=int, default=300)
+    arg_parser.add_argument('--workers', default='1,2,4', help='comma-separated process pool sizes')
+    arg_parser.add_argument('--threads', type=int, default=8, help='parser threads submitting the work')
+    arg_parser.add_argument('--html-parser', choices=['fast', 'soup'], default='fast')
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--json', help='also write results to this file')
+    args = arg_parser.parse_args()
+
+    corpus = build_corpus(args.pages)
+    print(f'{len(corpus)} responses, {args.threads} threads, html_parser={args.html_parser}, {os.cpu_count()} CPU cores')
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        expected, baseline = measure(work_dir, corpus, args.threads, 0, args.html_parser, args.repeat)
+        print(f'{"cpu_workers":>12}{"seconds":>10}{"items/s":>10}{"speedup":>10}{"identical":>11}')
+        print(f'{"threads":>12}{baseline:>10.3f}{len(corpus) / baseline:>10.0f}{1:>10.2f}{"-":>11}')
+        results.append({"cpu_workers": 0, "seconds": round(baseline, 4)})
+
+        for workers in (int(value) for value in args.workers.split(',')):
+            output, seconds = measure(work_dir, corpus, args.threads, workers, args.html_parser, args.repeat)
+            identical = output == expected
+            print(f'{workers:>12}{seconds:>10.3f}{len(corpus) / seconds:>10.0f}{baseline / seconds:>10.2f}{str(identical):>11}')
+            results.append({"cpu_workers": workers, "seconds": round(seconds, 4),
+                            "speedup": round(baseline / seconds, 2), "identical": identical})
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
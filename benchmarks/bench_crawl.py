@@ -0,0 +1,238 @@
+# Повний прогін IgruhaParser.run без мережі на офлайн-копії сайту (benchmarks/site_fixture.py).
+# Сценарії:
+#   cold    - порожні кеші
+#   warm    - повторний запуск після cold, сайт не змінився
+#   partial - повторний запуск після cold, частина сторінок і торрентів оновилась
+# Кожен сценарій виконується в окремому процесі, щоб пікова пам'ять (RSS) не залежала від попередніх.
+# Звіт: сторінок за секунду, час до першого URL з sitemap, перцентилі затримок по етапах, пікова RSS,
+# розмір вихідного файлу, кількість запитів.
+#
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.bench_crawl
+#   python -m benchmarks.bench_crawl --pages 2000 --latency 0.02 --concurrency 16 --pipeline async
+#   python -m benchmarks.bench_crawl --fixtures-dir benchmarks/fixtures/recorded --json results.json
+#   python -m benchmarks.bench_crawl --scenarios cold --fault-rate 0.05   # повтори і circuit breaker
+#   python -m benchmarks.bench_crawl --pages 20000 --sitemap-parts 4 --sitemap-gzip --bandwidth 200000   # потоковий sitemap
+
+import argparse
+import functools
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.common import make_parser
+from benchmarks.site_fixture import RecordedSite, ReplayAdapter, SyntheticSite, start_translation_stub
+
+
+SCENARIOS = ['cold', 'warm', 'partial']
+
+# Методи парсера, час виконання яких вимірюється як окремі етапи
+TIMED_METHODS = {
+    '_parse_game_page': 'page_parse',
+    '_extract_torrent_url': 'download_page_parse',
+    '_torrent_to_magnet': 'magnet',
+    '_flush_translation_queue': 'translation',
+    '_commit_result': 'commit',
+    '_save_cache': 'cache_save'
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(latencies):
+    summary = {}
+    for stage, values in sorted(latencies.items()):
+        if values:
+            summary[stage] = {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+                "p90_ms": round(percentile(values, 0.90) * 1000, 3),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+                "max_ms": round(max(values) * 1000, 3)
+            }
+    return summary
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux повертає кілобайти, macOS - байти
+    return round(peak / (2 ** 20 if sys.platform == 'darwin' else 2 ** 10), 1)
+
+
+def time_methods(parser, latencies):
+    lock = threading.Lock()
+
+    def timed(method, stage):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.setdefault(stage, []).append(elapsed)
+        return wrapper
+
+    for name, stage in TIMED_METHODS.items():
+        setattr(parser, name, timed(getattr(parser, name), stage))
+
+
+def load_site(args):
+    if args.fixtures_dir:
+        return RecordedSite(args.fixtures_dir)
+    return SyntheticSite(pages=args.pages, seed=args.seed, sitemap_parts=args.sitemap_parts, sitemap_gzip=args.sitemap_gzip)
+
+
+# MARK: run_worker
+def run_worker(args):
+    # Виконується в дочірньому процесі: один прогін парсера в args.work_dir
+    site = load_site(args)
+    if args.worker == 'measure' and args.scenario == 'partial':
+        site.mutate(fraction=args.changed_fraction)
+
+    # Збої лише у вимірюваному прогоні, щоб підготовлені кеші були повними
+    fault_rate = args.fault_rate if args.worker == 'measure' else 0.0
+    adapter = ReplayAdapter(site, latency=args.latency, fault_rate=fault_rate, seed=args.seed, bandwidth=args.bandwidth)
+    parser = make_parser(
+        args.work_dir,
+        concurrency=args.concurrency,
+        rate_limit=None,
+        pipeline=args.pipeline,
+        incremental=True,
+        cache_backend=args.cache_backend,
+        translate_endpoint=start_translation_stub(),
+        # Короткі затримки, щоб повтори не домінували в часі прогону
+        retry_backoff=0.01,
+        breaker_cooldown=0.2
+    )
+    parser.scraper.mount('https://', adapter)
+    parser.scraper.mount('http://', adapter)
+
+    latencies = {}
+    time_methods(parser, latencies)
+    rss_before = peak_rss_mb()
+
+    # Sitemap читається під час обробки сторінок, як у main.py
+    started = time.perf_counter()
+    parser.run()
+    elapsed = time.perf_counter() - started
+    pages = len(parser._run_urls)
+
+    latencies.update(adapter.latencies)
+    timings = parser.metrics.snapshot()["timings"]
+    result = {
+        "scenario": args.scenario,
+        "pages": pages,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 1),
+        "first_url_ms": round(timings["first_url"]["sum"] * 1000, 1),
+        "sitemap_read_ms": round(timings["sitemap_read"]["sum"] * 1000, 1),
+        "requests": adapter.requests,
+        "response_bytes": adapter.bytes_sent,
+        "output_bytes": os.path.getsize(parser.data_file),
+        "rss_before_run_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "faults": adapter.faults,
+        "retries": sum(item["value"] for item in parser.metrics.snapshot()["counters"].get("http_retries", [])),
+        "breaker_trips": parser.transport.breaker.trips,
+        "stats": {name: len(value) if isinstance(value, list) else value for name, value in parser.stats.items()},
+        "stages": summarize(latencies)
+    }
+    with open(args.result_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=4)
+
+
+def spawn_worker(args, worker, scenario, work_dir, result_file):
+    command = [sys.executable, '-m', 'benchmarks.bench_crawl', '--worker', worker, '--scenario', scenario,
+               '--work-dir', work_dir, '--result-file', result_file,
+               '--pages', str(args.pages), '--seed', str(args.seed), '--latency', str(args.latency),
+               '--concurrency', str(args.concurrency), '--pipeline', args.pipeline, '--cache-backend', args.cache_backend,
+               '--changed-fraction', str(args.changed_fraction), '--fault-rate', str(args.fault_rate),
+               '--sitemap-parts', str(args.sitemap_parts)]
+    if args.fixtures_dir:
+        command += ['--fixtures-dir', args.fixtures_dir]
+    if args.sitemap_gzip:
+        command += ['--sitemap-gzip']
+    if args.bandwidth:
+        command += ['--bandwidth', str(args.bandwidth)]
+    # Вивід парсера (tqdm, print) не потрібен у звіті
+    subprocess.run(command, check=True, cwd=os.getcwd(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+# MARK: run_scenario
+def run_scenario(args, scenario):
+    with tempfile.TemporaryDirectory() as work_dir:
+        result_file = os.path.join(work_dir, 'result.json')
+        if scenario != 'cold':
+            # Підготовка кешів холодним прогоном; його результати не враховуються
+            spawn_worker(args, 'prepare', scenario, os.path.join(work_dir, 'run'), result_file)
+        spawn_worker(args, 'measure', scenario, os.path.join(work_dir, 'run'), result_file)
+        with open(result_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def print_result(result):
+    print(f'\n== {result["scenario"]} ==')
+    print(f'{result["pages"]} pages in {result["seconds"]:.2f}s: {result["pages_per_sec"]:.1f} pages/sec, '
+          f'{result["requests"]} requests, {result["response_bytes"] / 2 ** 20:.1f} MiB received')
+    print(f'first URL after {result["first_url_ms"]:.1f} ms, sitemap read in {result["sitemap_read_ms"]:.1f} ms')
+    print(f'output: {result["output_bytes"]} bytes, peak RSS: {result["peak_rss_mb"]:.1f} MiB '
+          f'(before run: {result["rss_before_run_mb"]:.1f} MiB)')
+    if sum(result["faults"].values()):
+        print(f'faults injected: {result["faults"]}, retries: {result["retries"]}, circuit breaker trips: {result["breaker_trips"]}')
+    print(f'{"stage":<22}{"count":>8}{"p50 ms":>10}{"p90 ms":>10}{"p99 ms":>10}{"max ms":>10}')
+    for stage, summary in result["stages"].items():
+        print(f'{stage:<22}{summary["count"]:>8}{summary["p50_ms"]:>10.3f}{summary["p90_ms"]:>10.3f}'
+              f'{summary["p99_ms"]:>10.3f}{summary["max_ms"]:>10.3f}')
+    print('stats: ' + ', '.join(f'{name}={value}' for name, value in result["stats"].items()))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='End-to-end offline crawl benchmark')
+    arg_parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated: cold,warm,partial')
+    arg_parser.add_argument('--pages', type=int, default=500, help='pages of the synthetic site')
+    arg_parser.add_argument('--seed', type=int, default=1)
+    arg_parser.add_argument('--fixtures-dir', help='replay a site recorded by benchmarks.site_fixture record')
+    arg_parser.add_argument('--latency', type=float, default=0.005, help='simulated latency of every request, seconds')
+    arg_parser.add_argument('--concurrency', type=int, default=8)
+    arg_parser.add_argument('--pipeline', choices=['threads', 'async'], default='threads')
+    arg_parser.add_argument('--cache-backend', choices=['json', 'sqlite'], default='json')
+    arg_parser.add_argument('--changed-fraction', type=float, default=0.1, help='share of pages changed in "partial"')
+    arg_parser.add_argument('--fault-rate', type=float, default=0.0, help='share of requests answered with 429/503/reset/timeout')
+    arg_parser.add_argument('--sitemap-parts', type=int, default=0, help='serve the sitemap as an index of N child sitemaps')
+    arg_parser.add_argument('--sitemap-gzip', action='store_true', help='gzip the child sitemaps (with --sitemap-parts)')
+    arg_parser.add_argument('--bandwidth', type=float, help='simulated transfer rate of response bodies, bytes per second')
+    arg_parser.add_argument('--json', help='also write results to this file')
+    # Внутрішні параметри дочірнього процесу
+    arg_parser.add_argument('--worker', choices=['prepare', 'measure'], help=argparse.SUPPRESS)
+    arg_parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--work-dir', help=argparse.SUPPRESS)
+    arg_parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    results = []
+    for scenario in args.scenarios.split(','):
+        result = run_scenario(args, scenario)
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
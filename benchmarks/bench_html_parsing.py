@@ -0,0 +1,88 @@
+# Перевірка і порівняння бекендів розбору HTML: "fast" (utils/html_extract.py) і "soup" (BeautifulSoup).
+# Для кожної збереженої сторінки з benchmarks/fixtures/html (і, за бажанням, з --pages-dir)
+# перевіряє, що _parse_date_title, _parse_size_info і витягування посилань дають однаковий результат,
+# потім вимірює час розбору.
+#
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.bench_html_parsing
+#   python -m benchmarks.bench_html_parsing --pages-dir saved_pages/
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from benchmarks.common import FIXTURES_DIR, make_parser
+
+
+def load_pages(pages_dir):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def extract(parser, html):
+    # Усе, що парсер бере зі сторінки гри або сторінки завантаження
+    site_update_date, site_game_name, torrent_links = parser._parse_game_page(html)
+    sizes = [parser._parse_size_info(size_text) for _, size_text in torrent_links]
+    return {
+        'date_title': (site_update_date, site_game_name),
+        'torrent_links': torrent_links,
+        'size_info': sizes,
+        'torrent_url': parser._extract_torrent_url(html)
+    }
+
+
+def bench(parser, pages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for html in pages.values():
+            parser._parse_game_page(html)
+            parser._extract_torrent_url(html)
+    return (time.perf_counter() - started) / (repeat * len(pages))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Compare HTML parsing backends')
+    arg_parser.add_argument('--pages-dir', help='directory with additional saved .html pages')
+    arg_parser.add_argument('--repeat', type=int, default=200)
+    args = arg_parser.parse_args()
+
+    pages = load_pages(os.path.join(FIXTURES_DIR, 'html'))
+    if args.pages_dir:
+        pages.update(load_pages(args.pages_dir))
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        soup_parser = make_parser(work_dir, html_parser='soup')
+        fast_parser = make_parser(work_dir, html_parser='fast')
+
+        mismatches = 0
+        for name, html in pages.items():
+            expected = extract(soup_parser, html)
+            actual = extract(fast_parser, html)
+            if expected == actual:
+                print(f'OK       {name}: {expected["date_title"]}, {len(expected["torrent_links"])} links, torrent2={expected["torrent_url"]}')
+                continue
+
+            mismatches += 1
+            print(f'MISMATCH {name}')
+            for key in expected:
+                if expected[key] != actual[key]:
+                    print(f'         {key}: soup={expected[key]!r}')
+                    print(f'         {key}: fast={actual[key]!r}')
+
+        print(f'\nMismatches: {mismatches}\n')
+
+        soup_time = bench(soup_parser, pages, args.repeat)
+        fast_time = bench(fast_parser, pages, args.repeat)
+        print(f'soup {soup_time * 1e6:9.1f} us/page   fast {fast_time * 1e6:9.1f} us/page   x{soup_time / fast_time:.1f}')
+
+    if mismatches:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
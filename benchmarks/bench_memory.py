@@ -0,0 +1,147 @@
+# Пам'ять кешу сторінок (parser_cache.json) у JSONCacheStore: звичайні dict проти компактних записів utils/records.py.
+# Для кожного розміру генерується кеш з --entries записів завантажень (1-3 на сторінку), і в окремому процесі
+# вимірюється пам'ять (tracemalloc) і час завантаження, а також перевіряється, що save() записує файл байт-у-байт.
+#
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.bench_memory
+#   python -m benchmarks.bench_memory --entries 10000,100000,300000 --json results.json
+
+import argparse
+import base64
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.site_fixture import TRACKERS, UPLOADERS
+from utils.cache_store import JSONCacheStore
+
+
+TRACKER_SETS = [TRACKERS[:1], TRACKERS, TRACKERS + [f'udp://tracker{n}.example.org:6969/announce' for n in range(8)]]
+
+
+# MARK: generate_cache
+def generate_cache(path, entries, seed=1):
+    # Кеш у форматі parser_cache.json: сторінки з 1-3 варіантами завантаження, магнет-посилання з трекерами
+    rng = random.Random(seed)
+    cache = {}
+    count = 0
+    page = 0
+    while count < entries:
+        page += 1
+        name = f'Игра номер {page}' if page % 5 == 0 else f'Game Title {page}: Remastered'
+        options = []
+        for slot in range(min(rng.choice([1, 1, 2, 3]), entries - count)):
+            btih = base64.b32encode(rng.randbytes(20)).decode()
+            trackers = ''.join(f'&tr={tracker}' for tracker in rng.choice(TRACKER_SETS))
+            options.append({
+                "title": f'{name} by {rng.choice(UPLOADERS)}',
+                "uris": [f'magnet:?xt=urn:btih:{btih}&dn=Game.{page}.{slot}.RePack{trackers}&xl={rng.randrange(10 ** 9, 10 ** 11)}'],
+                "uploadDate": f'20{rng.randrange(18, 25)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}T12:00:00Z',
+                "fileSize": f'{rng.randrange(1, 120)}.{rng.randrange(0, 10)} GB'
+            })
+            count += 1
+        cache[f'https://itorrents-igruha.org/{page}-game-{page}.html'] = {
+            "site_update_date": f'{rng.randrange(1, 29):02d}.{rng.randrange(1, 13):02d}.2024, {rng.randrange(0, 24):02d}:00',
+            "site_game_name": name,
+            "download_options": options,
+            "sitemap_lastmod": f'2024-01-01T{rng.randrange(0, 24):02d}:00:00+00:00',
+            "etag": f'"{rng.randbytes(8).hex()}"',
+            "last_modified": 'Tue, 14 Nov 2023 22:13:20 GMT'
+        }
+
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(cache, file, ensure_ascii=False, indent=4)
+    return page
+
+
+def load_plain(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def load_records(path):
+    return JSONCacheStore(path)
+
+
+# MARK: run_worker
+def run_worker(args):
+    # Дочірній процес: один спосіб завантаження одного файлу
+    load = load_plain if args.worker == 'plain' else load_records
+
+    started = time.perf_counter()
+    cache = load(args.cache_file)
+    load_seconds = time.perf_counter() - started
+    del cache
+
+    tracemalloc.start()
+    cache = load(args.cache_file)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {"load_seconds": round(load_seconds, 3), "memory_mb": round(current / 2 ** 20, 1), "peak_mb": round(peak / 2 ** 20, 1)}
+
+    if args.worker == 'records':
+        # save() має записати той самий файл, з якого кеш завантажено
+        saved_file = f'{args.cache_file}.saved'
+        cache.cache_file = saved_file
+        started = time.perf_counter()
+        cache.save()
+        result["save_seconds"] = round(time.perf_counter() - started, 3)
+        with open(args.cache_file, 'rb') as original, open(saved_file, 'rb') as saved:
+            result["identical"] = original.read() == saved.read()
+
+    print(json.dumps(result))
+
+
+def spawn_worker(worker, cache_file):
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.bench_memory', '--worker', worker, '--cache-file', cache_file],
+                            check=True, capture_output=True, text=True, cwd=os.getcwd()).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Memory of the in-memory page cache: plain dicts vs compact records')
+    arg_parser.add_argument('--entries', default='10000,100000', help='comma-separated numbers of download entries')
+    arg_parser.add_argument('--json', help='also write results to this file')
+    # Внутрішні параметри дочірнього процесу
+    arg_parser.add_argument('--worker', choices=['plain', 'records'], help=argparse.SUPPRESS)
+    arg_parser.add_argument('--cache-file', help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    results = []
+    print(f'{"entries":>9}{"pages":>8}{"file MB":>9}{"dict MB":>9}{"records MB":>12}{"saved":>7}'
+          f'{"dict load s":>13}{"records load s":>16}{"save s":>8}{"identical":>11}')
+    with tempfile.TemporaryDirectory() as work_dir:
+        for entries in (int(value) for value in args.entries.split(',')):
+            cache_file = os.path.join(work_dir, f'parser_cache_{entries}.json')
+            pages = generate_cache(cache_file, entries)
+            plain = spawn_worker('plain', cache_file)
+            records = spawn_worker('records', cache_file)
+            result = {
+                "entries": entries,
+                "pages": pages,
+                "file_mb": round(os.path.getsize(cache_file) / 2 ** 20, 1),
+                "plain": plain,
+                "records": records
+            }
+            results.append(result)
+            print(f'{entries:>9}{pages:>8}{result["file_mb"]:>9.1f}{plain["memory_mb"]:>9.1f}{records["memory_mb"]:>12.1f}'
+                  f'{1 - records["memory_mb"] / plain["memory_mb"]:>7.0%}{plain["load_seconds"]:>13.3f}'
+                  f'{records["load_seconds"]:>16.3f}{records["save_seconds"]:>8.3f}{str(records["identical"]):>11}')
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# Час запуску: від старту інтерпретатора до першого рядка виводу і до завершення процесу.
+# Команди:
+#   import   - python -c "import igruha_parser"
+#   help     - python main.py --help
+#   rebuild  - python main.py --rebuild (вихідний файл з кешу без мережі) на кеші холодного прогону
+#              синтетичного сайту з --pages сторінок
+#   deps     - імпорт requests, cloudscraper, bs4, bencodepy і tqdm: скільки коштували б ці залежності,
+#              якби igruha_parser імпортував їх одразу
+# Кожна команда запускається --repeat разів, у звіті медіана і мінімум. Наприкінці - найповільніші імпорти rebuild.
+#
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.bench_startup
+#   python -m benchmarks.bench_startup --pages 5000 --repeat 5
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import make_parser
+from benchmarks.site_fixture import ReplayAdapter, SyntheticSite, start_translation_stub
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(REPO_DIR, 'main.py')
+
+
+def prepare_cache(work_dir, pages):
+    # Кеш сторінок, як після звичайного запуску main.py (ті самі імена файлів, що й у config.py)
+    parser = make_parser(work_dir, rate_limit=None, incremental=True, deduplicate=True,
+                         translate_endpoint=start_translation_stub(), concurrency=8)
+    adapter = ReplayAdapter(SyntheticSite(pages=pages))
+    parser.scraper.mount('https://', adapter)
+    parser.scraper.mount('http://', adapter)
+    parser.run()
+
+
+def measure(command, cwd):
+    # (секунди до першого рядка stdout, секунди до завершення процесу)
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               env=dict(os.environ, PYTHONPATH=REPO_DIR))
+    process.stdout.readline()
+    first_output = time.perf_counter() - started
+    process.stdout.read()
+    process.wait()
+    if process.returncode:
+        raise RuntimeError(f'{" ".join(command)} exited with {process.returncode}')
+    return first_output, time.perf_counter() - started
+
+
+def slowest_imports(command, cwd, count=10):
+    # Вивід -X importtime: "import time: self [us] | cumulative | imported package"
+    process = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:], cwd=cwd, capture_output=True, text=True,
+                             env=dict(os.environ, PYTHONPATH=REPO_DIR))
+    imports = []
+    for line in process.stderr.splitlines():
+        parts = line.removeprefix('import time:').split('|')
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((int(parts[1]), parts[2].rstrip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Interpreter start-up and cache-only rebuild benchmark')
+    arg_parser.add_argument('--pages', type=int, default=2000, help='pages of the synthetic site in the cache for "rebuild"')
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    arg_parser.add_argument('--json', help='also write results to this file')
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f'Preparing the cache of {args.pages} pages...')
+        prepare_cache(work_dir, args.pages)
+
+        commands = {
+            "import": [sys.executable, '-c', 'import igruha_parser; print("imported")'],
+            "help": [sys.executable, MAIN, '--help'],
+            "rebuild": [sys.executable, MAIN, '--rebuild'],
+            "deps": [sys.executable, '-c', 'import requests, cloudscraper, bs4, bencodepy, tqdm; print("imported")']
+        }
+
+        results = {}
+        print(f'\n{"command":<10}{"first output ms":>18}{"min":>10}{"exit ms":>12}{"min":>10}')
+        for name, command in commands.items():
+            timings = [measure(command, work_dir) for _ in range(args.repeat)]
+            first_output = [first for first, _ in timings]
+            total = [total for _, total in timings]
+            results[name] = {
+                "first_output_ms": round(statistics.median(first_output) * 1000, 1),
+                "first_output_min_ms": round(min(first_output) * 1000, 1),
+                "exit_ms": round(statistics.median(total) * 1000, 1),
+                "exit_min_ms": round(min(total) * 1000, 1)
+            }
+            result = results[name]
+            print(f'{name:<10}{result["first_output_ms"]:>18.1f}{result["first_output_min_ms"]:>10.1f}'
+                  f'{result["exit_ms"]:>12.1f}{result["exit_min_ms"]:>10.1f}')
+
+        print('\nslowest imports of "rebuild" (cumulative ms):')
+        imports = slowest_imports(commands["rebuild"], work_dir)
+        for microseconds, module in imports:
+            print(f'{microseconds / 1000:>10.1f}  {module}')
+        results["rebuild_slowest_imports"] = [[module.strip(), microseconds] for microseconds, module in imports]
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+# Спільні допоміжні функції для скриптів у benchmarks/
+
+import os
+
+from igruha_parser import IgruhaParser
+
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def make_parser(work_dir, **kwargs):
+    # Парсер, усі файли якого (лог, кеші, вихідний JSON, бекапи) лежать у work_dir
+    os.makedirs(work_dir, exist_ok=True)
+    return IgruhaParser(
+        site_name='Torrents-Igruha',
+        log_file=os.path.join(work_dir, 'parser.log'),
+        data_file=os.path.join(work_dir, 'igruha-hydra-links.json'),
+        backup_dir=os.path.join(work_dir, 'json'),
+        cache_dir=os.path.join(work_dir, 'cache'),
+        cache_file=os.path.join(work_dir, 'cache', 'parser_cache.json'),
+        sitemap_url='https://itorrents-igruha.org/sitemap.xml',
+        **kwargs
+    )
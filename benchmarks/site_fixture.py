@@ -0,0 +1,440 @@
+# Офлайн-копія сайту для бенчмарків: sitemap, сторінки ігор, сторінки завантаження і .torrent файли.
+# Сайт або генерується детерміновано (SyntheticSite), або завантажується з раніше записаної
+# директорії (RecordedSite). ReplayAdapter підключається до parser.scraper замість мережі.
+#
+# Запис реальних сторінок (звертається до живого сайту, запускати вручну):
+#   python -m benchmarks.site_fixture record --pages 200 --out benchmarks/fixtures/recorded
+
+import argparse
+import gzip
+import hashlib
+import io
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import bencodepy
+import requests
+from requests.adapters import BaseAdapter
+
+
+BASE_URL = 'https://itorrents-igruha.org'
+SITEMAP_URL = f'{BASE_URL}/sitemap.xml'
+
+GAME_PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>Скачать {title} через торрент</title>
+<link rel="stylesheet" href="/templates/style.css">
+<script type="text/javascript">var dle_root = '/'; var dle_skin = 'igruha';</script>
+</head>
+<body>
+<div id="header"><a href="/" class="logo"><img src="/logo.png" alt="logo"></a>
+<ul class="menu"><li><a href="/top-online.html" class="torrent">Топ онлайн</a></li><li><a href="/new/">Новинки</a></li></ul>
+</div>
+<div class="content">
+  <div class="module-title"><h1>{title}</h1></div>
+  <div id="article-film-full-info">
+    <div class="info-line"><b>Обновлено:</b> <time class="published">{date}</time></div>
+    <div class="info-line"><b>Жанр:</b> <a href="/rpg/">RPG</a>, <a href="/action/">Экшен</a></div>
+  </div>
+  <div class="full-story">{description}</div>
+  {torrents}
+  <div class="comments">{comments}</div>
+</div>
+<div id="footer">&copy; 2024</div>
+</body>
+</html>
+'''
+
+TORRENT_BLOCK_TEMPLATE = '''<center><span style="font-size:14pt;">Размер: {size} от {uploader} |</span></center>
+  <ul id="navbartor">
+    <li><a class="torrent" href="{download_page_url}">Скачать торрент</a></li>
+    <li><a href="/top-online.html" class="torrent">Играть онлайн</a></li>
+  </ul>
+'''
+
+DOWNLOAD_PAGE_TEMPLATE = '''<html><head><title>Скачать торрент</title></head><body>
+<div class="download"><p>Ваша загрузка начнётся через 5 секунд</p>
+<a class="torrent2" href="{torrent_url}">Скачать .torrent</a></div>
+</body></html>
+'''
+
+UPLOADERS = ['xatab', 'FitGirl', 'Механики', 'Chovka', 'DODI', 'ElAmigos']
+TRACKERS = ['udp://tracker.opentrackr.org:1337/announce', 'http://retracker.local/announce']
+
+
+class FixtureSite:
+    # responses: url -> {"body": bytes, "content_type": str, "etag": str, "last_modified": str, "revision": int}
+    # sitemap_parts > 0 - sitemap.xml стає <sitemapindex> з стількох дочірніх sitemap-<k>.xml,
+    # sitemap_gzip - дочірні sitemap віддаються стисненими (sitemap-<k>.xml.gz, без Content-Encoding)
+
+    def __init__(self, sitemap_parts=0, sitemap_gzip=False):
+        self.responses = {}
+        self.sitemap_entries = []  # (loc, lastmod)
+        self.sitemap_parts = sitemap_parts
+        self.sitemap_gzip = sitemap_gzip
+
+
+    def add(self, url, body, content_type):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        previous = self.responses.get(url)
+        if previous is not None and previous["body"] == body:
+            return
+        # Last-Modified змінюється з кожною ревізією відповіді, щоб умовні запити працювали детерміновано
+        revision = previous["revision"] + 1 if previous else 0
+        self.responses[url] = {
+            "body": body,
+            "content_type": content_type,
+            "etag": f'"{hashlib.sha1(body).hexdigest()[:16]}"',
+            "last_modified": formatdate(1700000000 + revision * 86400, usegmt=True),
+            "revision": revision
+        }
+
+
+    def build_sitemap(self):
+        if not self.sitemap_parts:
+            self.add(SITEMAP_URL, self._urlset(self.sitemap_entries), 'application/xml')
+            return
+
+        size = -(-len(self.sitemap_entries) // self.sitemap_parts)
+        children = ''
+        for part in range(self.sitemap_parts):
+            body = self._urlset(self.sitemap_entries[part * size:(part + 1) * size])
+            if self.sitemap_gzip:
+                url = f'{BASE_URL}/sitemap-{part + 1}.xml.gz'
+                self.add(url, gzip.compress(body.encode('utf-8'), mtime=0), 'application/x-gzip')
+            else:
+                url = f'{BASE_URL}/sitemap-{part + 1}.xml'
+                self.add(url, body, 'application/xml')
+            children += f'<sitemap><loc>{url}</loc></sitemap>'
+        self.add(SITEMAP_URL, '<?xml version="1.0" encoding="UTF-8"?>'
+                              f'<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{children}</sitemapindex>',
+                 'application/xml')
+
+
+    def _urlset(self, entries):
+        urls = ''.join(f'<url><loc>{loc}</loc><lastmod>{lastmod}</lastmod></url>' for loc, lastmod in entries)
+        return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'
+
+
+    def mutate(self, fraction=0.1, seed=2):
+        # Записаний сайт не можна змінити, тому оновлюється лише lastmod частини сторінок у sitemap:
+        # парсер завантажить їх повторно умовним запитом і отримає 304
+        rng = random.Random(seed)
+        now = datetime.now().strftime('%Y-%m-%dT%H:%M:%S+00:00')
+        self.sitemap_entries = [(loc, now if rng.random() < fraction else lastmod)
+                                for loc, lastmod in self.sitemap_entries]
+        self.build_sitemap()
+
+
+class SyntheticSite(FixtureSite):
+    # Детермінований сайт з pages сторінок. Серед них є невалідні сторінки, сторінки без торрентів,
+    # торренти, повторені на двох сторінках, і назви кирилицею (для перекладу). mutate() імітує часткове оновлення сайту між запусками.
+
+    def __init__(self, pages=500, seed=1, sitemap_parts=0, sitemap_gzip=False):
+        super().__init__(sitemap_parts=sitemap_parts, sitemap_gzip=sitemap_gzip)
+        self.rng = random.Random(seed)
+        self.games = {}
+        for index in range(1, pages + 1):
+            self._add_game(index)
+        self.build_sitemap()
+
+
+    def _add_game(self, index):
+        rng = self.rng
+        url = f'{BASE_URL}/{index}-game-{index}.html'
+        game = {
+            "url": url,
+            "index": index,
+            "title": f'Игра номер {index}' if index % 5 == 0 else f'Game Title {index}: Remastered',
+            "updated": datetime(2020, 1, 1) + timedelta(hours=rng.randrange(0, 40000)),
+            "torrents": [self._new_torrent(index, slot) for slot in range(rng.choice([1, 1, 2, 3]))],
+            "kind": 'invalid' if index % 25 == 0 else 'empty' if index % 40 == 0 else 'game'
+        }
+        # Той самий торрент, викладений на двох сторінках (дублікат за btih)
+        if index % 30 == 0:
+            game["torrents"][0]["bytes"] = self.games[f'{BASE_URL}/{index - 1}-game-{index - 1}.html']["torrents"][0]["bytes"]
+        self.games[url] = game
+        self._render_game(game)
+
+
+    def _new_torrent(self, index, slot, revision=0):
+        rng = self.rng
+        files = [{b'length': rng.randrange(10 ** 6, 10 ** 10), b'path': [b'data', f'file{n}.bin'.encode()]}
+                 for n in range(rng.randrange(1, 40))]
+        info = {
+            b'files': files,
+            b'name': f'Game.{index}.{slot}.RePack'.encode(),
+            b'piece length': 4194304,
+            b'pieces': rng.randbytes(20 * rng.randrange(50, 2000))
+        }
+        metadata = {
+            b'announce': TRACKERS[slot % len(TRACKERS)].encode(),
+            b'creation date': 1600000000 + index * 1000 + revision,
+            b'info': info
+        }
+        return {
+            "download_page_url": f'{BASE_URL}/index.php?do=download&id={index * 10 + slot}',
+            "torrent_url": f'{BASE_URL}/engine/download.php?id={index * 10 + slot}&rev={revision}',
+            "size": f'{rng.randrange(1, 120)}.{rng.randrange(0, 10)} GB',
+            "uploader": rng.choice(UPLOADERS),
+            "bytes": bencodepy.encode(metadata)
+        }
+
+
+    def _render_game(self, game):
+        if game["kind"] == 'invalid':
+            self.add(game["url"], '<html><body><div class="module-title"><h1>Новости</h1></div></body></html>', 'text/html')
+        else:
+            torrents = game["torrents"] if game["kind"] == 'game' else []
+            blocks = ''.join(TORRENT_BLOCK_TEMPLATE.format(size=torrent["size"], uploader=torrent["uploader"],
+                                                           download_page_url=torrent["download_page_url"])
+                             for torrent in torrents)
+            self.add(game["url"], GAME_PAGE_TEMPLATE.format(
+                title=game["title"],
+                date=game["updated"].strftime('%d.%m.%Y, %H:%M'),
+                description='<p>Описание игры.</p>' * 30,
+                torrents=blocks,
+                comments='<div class="comment"><b>user</b>: спасибо!</div>' * 20
+            ), 'text/html')
+
+            for torrent in torrents:
+                self.add(torrent["download_page_url"], DOWNLOAD_PAGE_TEMPLATE.format(torrent_url=torrent["torrent_url"]), 'text/html')
+                self.add(torrent["torrent_url"], torrent["bytes"], 'application/x-bittorrent')
+
+        lastmod = game["updated"].strftime('%Y-%m-%dT%H:%M:%S+00:00')
+        self.sitemap_entries = [(loc, lastmod if loc == game["url"] else old) for loc, old in self.sitemap_entries]
+        if game["url"] not in (loc for loc, _ in self.sitemap_entries):
+            self.sitemap_entries.append((game["url"], lastmod))
+
+
+    def mutate(self, fraction=0.1, seed=2):
+        # Оновлює дату частини сторінок; у половини з них змінюється і сам .torrent файл
+        rng = random.Random(seed)
+        for url, game in self.games.items():
+            if game["kind"] != 'game' or rng.random() >= fraction:
+                continue
+            game["updated"] += timedelta(days=1)
+            if rng.random() < 0.5:
+                game["torrents"] = [self._new_torrent(game["index"], slot, revision=1) for slot in range(len(game["torrents"]))]
+            self._render_game(game)
+        self.build_sitemap()
+
+
+class RecordedSite(FixtureSite):
+    # Сайт, записаний командою record: manifest.json + файли відповідей
+
+    def __init__(self, directory):
+        super().__init__()
+        with open(os.path.join(directory, 'manifest.json'), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        for url, item in manifest["responses"].items():
+            with open(os.path.join(directory, item["file"]), 'rb') as f:
+                self.add(url, f.read(), item["content_type"])
+        self.sitemap_entries = [tuple(entry) for entry in manifest["sitemap"]]
+        self.build_sitemap()
+
+
+class ReplayAdapter(BaseAdapter):
+    # Transport adapter для requests/cloudscraper, що віддає відповіді з FixtureSite.
+    # Підтримує умовні запити (ETag / Last-Modified -> 304), штучну затримку і рахує запити та байти.
+    # fault_rate - частка запитів, на які замість відповіді повертається збій (FAULTS): 429/503 з Retry-After,
+    # розірване з'єднання або таймаут. Збої детерміновані для того самого seed.
+    # bandwidth - швидкість передачі тіла відповіді (байтів за секунду, None - миттєво). Тіло потокової відповіді
+    # (stream=True) надходить блоками з цією швидкістю, звичайної - повністю перед поверненням відповіді.
+
+    FAULTS = ('429', '503', 'reset', 'timeout')
+
+    def __init__(self, site, latency=0.0, fault_rate=0.0, seed=1, bandwidth=None):
+        super().__init__()
+        self.site = site
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.fault_rate = fault_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.faults = {fault: 0 for fault in self.FAULTS}
+        self.latencies = {}  # тип ресурсу -> [секунди]
+
+
+    def _pick_fault(self):
+        if not self.fault_rate:
+            return None
+        with self.lock:
+            if self.rng.random() >= self.fault_rate:
+                return None
+            fault = self.rng.choice(self.FAULTS)
+            self.faults[fault] += 1
+            return fault
+
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+
+        fault = self._pick_fault()
+        if fault == 'reset':
+            raise requests.ConnectionError('Connection reset by peer (injected)', request=request)
+        if fault == 'timeout':
+            raise requests.ReadTimeout('Read timed out (injected)', request=request)
+
+        item = self.site.responses.get(request.url)
+        response = requests.Response()
+        response.url = request.url
+        response.request = request
+        response.encoding = 'utf-8'
+
+        if fault is not None:
+            response.status_code = int(fault)
+            response._content = b'Too Many Requests' if fault == '429' else b'Service Unavailable'
+            response.headers['Retry-After'] = '0'
+        elif item is None:
+            response.status_code = 404
+            response._content = b'Not Found'
+        elif self._not_modified(request.headers, item):
+            response.status_code = 304
+            response._content = b''
+        else:
+            response.status_code = 200
+            response._content = item["body"]
+            response.headers['Content-Type'] = item["content_type"]
+            response.headers['ETag'] = item["etag"]
+            response.headers['Last-Modified'] = item["last_modified"]
+
+        body = response._content
+        if kwargs.get('stream'):
+            response._content = False
+            response.raw = _Body(body, self.bandwidth)
+        elif self.bandwidth:
+            time.sleep(len(body) / self.bandwidth)
+
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += len(body)
+            self.latencies.setdefault(resource_kind(request.url), []).append(time.perf_counter() - started)
+        return response
+
+
+    def _not_modified(self, headers, item):
+        # Як і справжній сервер: If-None-Match має пріоритет над If-Modified-Since
+        if 'If-None-Match' in headers:
+            return headers['If-None-Match'] == item["etag"]
+        return headers.get('If-Modified-Since') == item["last_modified"]
+
+
+    def close(self):
+        pass
+
+
+class _TranslationHandler(BaseHTTPRequestHandler):
+    # Відповідає у форматі translate.googleapis.com: кожен рядок q перекладається як "EN <рядок>"
+
+    def do_GET(self):
+        lines = parse_qs(urlparse(self.path).query)["q"][0].split('\n')
+        parts = [[f'EN {line}' + ('\n' if position < len(lines) - 1 else ''), line] for position, line in enumerate(lines)]
+        body = json.dumps([parts]).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    def log_message(self, format, *args):
+        pass
+
+
+# MARK: start_translation_stub
+def start_translation_stub():
+    # Локальний HTTP-сервер замість Google Translate; повертає endpoint для translate_endpoint
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _TranslationHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_port}/translate_a/single'
+
+
+class _Body(io.BytesIO):
+    # Тіло потокової відповіді ReplayAdapter: read() віддає блок не швидше за bandwidth байтів за секунду
+
+    def __init__(self, body, bandwidth):
+        super().__init__(body)
+        self.bandwidth = bandwidth
+
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        if self.bandwidth and chunk:
+            time.sleep(len(chunk) / self.bandwidth)
+        return chunk
+
+
+def resource_kind(url):
+    path = urlparse(url).path
+    if path.startswith('/sitemap'):
+        return 'sitemap_fetch'
+    if 'do=download' in url:
+        return 'download_page_fetch'
+    if path.startswith('/engine/download.php'):
+        return 'torrent_fetch'
+    return 'page_fetch'
+
+
+# MARK: record
+def record(pages, out_dir):
+    # Записує sitemap і перші pages сторінок живого сайту разом зі сторінками завантаження і торрентами
+    from benchmarks.common import make_parser
+
+    os.makedirs(out_dir, exist_ok=True)
+    parser = make_parser(os.path.join(out_dir, '_work'), concurrency=1, rate_limit=2)
+    manifest = {"responses": {}, "sitemap": []}
+
+    def save(url, response):
+        name = f'{len(manifest["responses"]):05d}.bin'
+        with open(os.path.join(out_dir, name), 'wb') as f:
+            f.write(response.content)
+        manifest["responses"][url] = {"file": name, "content_type": response.headers.get('Content-Type', 'text/html')}
+
+    entries = list(itertools.islice(parser.get_sitemap_entries(parser.sitemap_url), pages))
+    manifest["sitemap"] = entries
+    for url, _ in entries:
+        response = parser._get(url)
+        save(url, response)
+        _, _, torrent_links = parser._parse_game_page(response.text)
+        for download_page_url, _ in torrent_links:
+            download_page = parser._get(download_page_url)
+            save(download_page_url, download_page)
+            torrent_url = parser._extract_torrent_url(download_page.text)
+            if torrent_url:
+                save(torrent_url, parser._get(torrent_url))
+
+    with open(os.path.join(out_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=4)
+    print(f'Recorded {len(manifest["responses"])} responses to {out_dir}')
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Offline site fixtures')
+    subparsers = arg_parser.add_subparsers(dest='command', required=True)
+    record_parser = subparsers.add_parser('record', help='record pages of the live site (needs network)')
+    record_parser.add_argument('--pages', type=int, default=200)
+    record_parser.add_argument('--out', default=os.path.join('benchmarks', 'fixtures', 'recorded'))
+    args = arg_parser.parse_args()
+
+    if args.command == 'record':
+        record(args.pages, args.out)
+
+
+if __name__ == '__main__':
+    main()
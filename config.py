@@ -3,16 +3,90 @@ import os
 SITE_NAME = "Torrents-Igruha" # "Torrents-Igruha" "Igruha" "TI"
 
 SITEMAP_URL = 'https://itorrents-igruha.org/sitemap.xml'
+# Кількість дочірніх sitemap (якщо SITEMAP_URL - <sitemapindex>), які завантажуються одночасно
+SITEMAP_CONCURRENCY = 4
 
 CACHE_DIR = 'cache'
 CACHE_FILE = os.path.join(CACHE_DIR, 'parser_cache.json')
+# Сховище кешу сторінок: "json" - CACHE_FILE цілком у пам'яті, "sqlite" - база cache/parser_cache.sqlite3
+# (при першому запуску в неї переноситься CACHE_FILE; "python main.py --export-cache" записує її назад у CACHE_FILE)
+CACHE_BACKEND = "json"
+# Максимальний розмір кешу торрентів (cache/torrent_cache.json), найдавніше використані записи витісняються
+TORRENT_CACHE_MAX_BYTES = 32 * 2**20
+# Кількість нових назв, які перекладаються одним пакетом (0 - перекладати кожну назву окремо)
+TRANSLATION_BATCH_SIZE = 50
+# Адреса сервісу перекладу (можна замінити на локальний сервер для тестів)
+TRANSLATE_ENDPOINT = 'https://translate.googleapis.com/translate_a/single'
 
 BACKUP_DIR = 'json'
+# Резервні копії: "full" - повна копія кожного запуску, "delta" - дельта відносно останньої повної копії
+# (повна копія робиться кожен FULL_SNAPSHOT_EVERY-й запуск). Відновлення: python main.py --restore-backup json/ihl_....json
+BACKUP_MODE = "delta"
+FULL_SNAPSHOT_EVERY = 20
 
 DATA_FILE = 'igruha-hydra-links.json'
+# Поруч із DATA_FILE записувати дельту відносно попереднього запуску (igruha-hydra-links.delta.json)
+# та індекс записів для дельти наступного запуску (igruha-hydra-links.json.index)
+DELTA_OUTPUT = True
+# Не записувати у вихідний файл повторно торрент (за btih), який уже є там з іншої сторінки
+DEDUPLICATE_DOWNLOADS = True
+# Відступ у вихідному JSON (None - компактний запис без пробілів)
+JSON_INDENT = 4
 
 LOG_FILE = 'parser.log'
 
+# Каталог шардованого запуску (python main.py --shards N): shards/shard-<k>/ з вихідним файлом, кешами і логом шарда
+SHARDS_DIR = 'shards'
+
+# Кількість сторінок, які обробляються одночасно (1 - послідовна обробка)
+CONCURRENCY = 8
+# Максимальна кількість запитів на секунду до одного хоста (None - без обмеження)
+RATE_LIMIT = 8
+
+# Таймаути HTTP-запитів (секунди): встановлення з'єднання і очікування відповіді
+HTTP_CONNECT_TIMEOUT = 10
+HTTP_READ_TIMEOUT = 30
+# Кількість повторів GET при помилках мережі, 429 і 5xx та базова затримка між ними (експоненційна, з джитером)
+HTTP_RETRIES = 3
+HTTP_RETRY_BACKOFF = 1.0
+# Circuit breaker: після стількох відповідей 429/503 поспіль хост призупиняється на CIRCUIT_BREAKER_COOLDOWN секунд,
+# а швидкість запитів до нього зменшується (0 - вимкнено)
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN = 30
+
+# Режим обробки: "threads" - пул потоків, "async" - асинхронний конвеєр з чергами між етапами
+PIPELINE = "threads"
+# Розмір черги кожного етапу асинхронного конвеєра
+PIPELINE_QUEUE_SIZE = 64
+
+# Розбір HTML: "fast" - потоковий екстрактор (utils/html_extract.py), "soup" - повне дерево BeautifulSoup
+HTML_PARSER = "fast"
+# Кількість процесів для розбору HTML і перетворення торрентів у магнет-посилання (0 - у потоках, через GIL
+# ці етапи виконуються по черзі). Має сенс, якщо їх час помітний поряд з мережею; з --shards - на кожен шард.
+CPU_WORKERS = 0
+
+# Контрольна точка (кеші, stats, позиція у вихідному файлі) кожні CHECKPOINT_INTERVAL сторінок;
+# перерваний запуск продовжується з неї командою "python main.py --resume" (0 - вимкнено)
+CHECKPOINT_INTERVAL = 500
+
+# Інкрементальний режим: сторінки з незміненим <lastmod> у sitemap беруться з кешу без завантаження,
+# решта запитується умовним GET (If-None-Match / If-Modified-Since)
+INCREMENTAL = True
+# Планувальник перевірок (інкрементальний режим): сторінка без зміненого <lastmod> у sitemap перевіряється
+# раз на 1..RECRAWL_MAX_INTERVAL запусків - тим рідше, чим довше вона не змінювалась (1 - щоразу).
+# Пропущені сторінки беруться з кешу. Історія перевірок зберігається в записах CACHE_FILE.
+RECRAWL_MAX_INTERVAL = 8
+# Максимальна кількість таких перевірок за запуск (None - без обмеження); нові сторінки і сторінки
+# зі зміненим <lastmod> перевіряються завжди і в бюджет не входять
+RECRAWL_BUDGET = None
+
+# Негативний кеш (cache/negative_cache.json): невалідні сторінки, сторінки без варіантів завантаження і мертві торренти
+# (DEAD_TORRENT у problem_urls) не запитуються повторно протягом TTL у годинах, поки не зміниться <lastmod> у sitemap
+# або дата оновлення сторінки. Кожна повторна перевірка з тим самим результатом подвоює інтервал, до NEGATIVE_CACHE_MAX_TTL.
+# None - вимкнено, 0 для причини - ця причина не кешується.
+NEGATIVE_CACHE_TTL = {"INVALID_PAGE": 24, "NO_DOWNLOAD_OPTIONS": 12, "DEAD_TORRENT": 72}
+NEGATIVE_CACHE_MAX_TTL = 24 * 30
+
 # If True, the parser will only parse problem_urls
 test_problem_urls = False # True False
 problem_urls = [
@@ -1,31 +1,52 @@
-import requests
-import xml.etree.ElementTree as ET
-from bs4 import BeautifulSoup
+# Важкі залежності (requests, cloudscraper, bs4, bencodepy, tqdm, ElementTree) імпортуються в методах,
+# яким вони потрібні: відновлення вихідного файлу з кешу (rebuild_from_cache) обходиться без них
 import json
 from datetime import datetime
 import os
+import shutil
+import time
 
-from io import BytesIO
 import re
 
-import bencodepy
 import hashlib
 import base64
 from urllib.parse import quote
 
-from utils.translator import translate_line
+from utils.translator import translate_line, translate_batch, TranslationCache, TRANSLATE_ENDPOINT
 from utils.format_utils import date_to_iso, format_size
 
 import logging
 
-from tqdm import tqdm
-
-
-import cloudscraper
+import threading
+from collections import deque
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.rate_limiter import HostRateLimiter
+from utils.json_writer import StreamingJSONWriter
+from utils.bencode_scanner import torrent_to_magnet
+from utils.torrent_cache import TorrentCache
+from utils.cache_store import open_cache_store
+from utils.download_index import DownloadIndex
+from utils.recrawl import RECRAWL_FILE, RecrawlScheduler
+from utils.negative_cache import NEGATIVE_CACHE_FILE, NegativeCache
+from utils.delta import OutputIndex, compute_delta, index_file, load_index, save_index, write_delta
+from utils.sharding import load_shard
+from utils.metrics import Metrics
+from utils import html_extract
+
+# Імена резервних копій: ihl_<час>.json - повна копія, ihl_<час>.delta.json - дельта
+BACKUP_NAME_PATTERN = re.compile(r'ihl_\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}(\.delta)?\.json')
 
 class IgruhaParser:
     # MARK: __init__
-    def __init__(self, site_name, log_file, data_file, backup_dir, cache_dir, cache_file, sitemap_url, test_problem_urls=False, problem_urls=None):
+    def __init__(self, site_name, log_file, data_file, backup_dir, cache_dir, cache_file, sitemap_url, test_problem_urls=False, problem_urls=None,
+                 concurrency=1, rate_limit=None, pipeline='threads', pipeline_queue_size=64, incremental=False, json_indent=4,
+                 translation_batch_size=50, translate_endpoint=TRANSLATE_ENDPOINT,
+                 torrent_cache_max_bytes=None, html_parser='fast', connect_timeout=10, read_timeout=30, retries=3, retry_backoff=1.0,
+                 breaker_threshold=5, breaker_cooldown=30, checkpoint_interval=0, cache_backend='json', deduplicate=False,
+                 delta_output=False, backup_mode='full', full_snapshot_every=20, manifest_file=None, sitemap_concurrency=4,
+                 recrawl_max_interval=1, recrawl_budget=None, cpu_workers=0, negative_cache_ttl=None, negative_cache_max_ttl=None):
 
         self.site_name = site_name
         self.log_file = log_file
@@ -36,6 +57,48 @@ class IgruhaParser:
         self.sitemap_url = sitemap_url
         self.test_problem_urls = test_problem_urls
         self.problem_urls = problem_urls if problem_urls is not None else []
+        self.concurrency = max(1, concurrency)
+        self.pipeline = pipeline
+        self.pipeline_queue_size = pipeline_queue_size
+        self.incremental = incremental
+        self.sitemap_lastmod = {}  # url -> <lastmod> з sitemap
+        # Кількість дочірніх sitemap (з <sitemapindex>), які завантажуються одночасно
+        self.sitemap_concurrency = sitemap_concurrency
+        self.json_indent = json_indent
+        # delta_output: поруч із data_file пишеться дельта відносно попереднього запуску (<data_file>.delta.json).
+        # backup_mode "delta": у backup_dir зберігаються дельти відносно останньої повної копії,
+        # повна копія - кожен full_snapshot_every-й запуск.
+        self.delta_output = delta_output
+        self.delta_file = f'{os.path.splitext(data_file)[0]}.delta.json'
+        self.backup_mode = backup_mode
+        self.full_snapshot_every = full_snapshot_every
+        # manifest_file: рядок [індекс, кількість записів] на кожну сторінку вихідного файлу
+        # (для об'єднання шардів, див. utils/sharding.py); None - не записується
+        self.manifest_file = manifest_file
+        self.manifest = None
+        self.html_parser = html_parser
+        # cpu_workers > 0: розбір HTML і перетворення торрентів виконуються в пулі з cpu_workers процесів
+        # (utils/cpu_pool.py), 0 - у потоках парсера
+        self.cpu_workers = cpu_workers
+        self._cpu_pool = None
+        self.cache_backend = cache_backend
+        # deduplicate: запис з btih, який уже є у вихідному файлі (з іншої сторінки), не записується вдруге
+        self.deduplicate = deduplicate
+        self.download_index = None
+        # Планувальник повторних перевірок (utils/recrawl.py): сторінка без ознаки зміни в sitemap перевіряється
+        # раз на 1..recrawl_max_interval запусків залежно від того, як часто вона змінювалась, і не більше
+        # recrawl_budget таких перевірок за запуск. recrawl_max_interval=1 без бюджету - кожна сторінка щоразу.
+        self.recrawl = None
+        if incremental and (recrawl_max_interval > 1 or recrawl_budget is not None):
+            self.recrawl = RecrawlScheduler(os.path.join(self.cache_dir, RECRAWL_FILE), max_interval=recrawl_max_interval,
+                                            budget=recrawl_budget)
+        # Негативний кеш (utils/negative_cache.py): невалідні сторінки, сторінки без варіантів завантаження і мертві
+        # торренти не запитуються повторно протягом negative_cache_ttl[причина] годин (з подвоєнням до negative_cache_max_ttl).
+        # None - вимкнено.
+        self.negative_cache = None
+        if negative_cache_ttl:
+            self.negative_cache = NegativeCache(os.path.join(self.cache_dir, NEGATIVE_CACHE_FILE), negative_cache_ttl,
+                                                max_ttl=negative_cache_max_ttl)
 
         logging.basicConfig(filename=self.log_file, 
                             level=logging.INFO, 
@@ -44,11 +107,34 @@ class IgruhaParser:
                             encoding='utf-8')
 
         self.cache = self._initialize_cache()
-
-        self.data = {
-            "name": self.site_name,
-            "downloads": []
-        }
+        # Кеші перекладів і торрентів (torrent_cache.json - до десятків МБ) завантажуються при першому зверненні
+        self._translation_cache = None
+        self.translation_batch_size = translation_batch_size
+        self.translate_endpoint = translate_endpoint
+        self.torrent_cache_max_bytes = torrent_cache_max_bytes
+        self._torrent_cache = None
+        self._lazy_lock = threading.Lock()
+        self._translation_queue = []  # результати, що чекають пакетного перекладу назв
+        self._pending_titles = {}  # dict замість set, щоб порядок запитів і записів у кеші був детермінованим
+
+        # Записи завантажень не накопичуються в пам'яті, а одразу пишуться у файл через self.writer
+        self.writer = None
+
+        # Контрольні точки: кожні checkpoint_interval сторінок зберігаються кеші, stats і позиція у вихідному файлі,
+        # щоб перерваний запуск можна було продовжити (run(resume=True)). 0 - вимкнено.
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_file = os.path.join(self.cache_dir, 'checkpoint.json')
+        self.checkpoint_urls_file = os.path.join(self.cache_dir, 'checkpoint_urls.json')
+        # Список URL останнього запуску - порядок сторінок для rebuild_from_cache
+        self.run_urls_file = os.path.join(self.cache_dir, 'last_run_urls.json')
+        self._completed = 0  # кількість URL, результати яких вже записані (в порядку sitemap)
+        self._last_checkpoint = 0
+        # URL поточного запуску, отримані до цього моменту (sitemap читається під час обробки сторінок)
+        self._run_urls = []
+        self._urls_complete = False
+        self._checkpoint_urls_complete = False
+        self._sitemap_reader = None  # SitemapReader поточного запуску (помилки читання sitemap)
+        self.progress = None
 
         self.stats = {
             "added_games": [],
@@ -56,20 +142,113 @@ class IgruhaParser:
             "download_options": 0,
             "no_download_options": 0,
             "invalid_pages": 0,
+            "unchanged_pages": 0,
+            "skipped_pages": 0,
+            "torrent_cache_hits": 0,
+            "negative_cache_saved_requests": 0,
+            "duplicate_downloads": 0,
             "error_connecting": [],
             "error_processing": []
         }
 
-        self.scraper = cloudscraper.create_scraper()
+        # Час етапів, байти і влучання в кеші; зберігаються поруч із stats_output.txt у print_stats
+        self.metrics = Metrics()
+
+        self.rate_limiter = HostRateLimiter(rate_limit)
+        # Сесія cloudscraper і Transport створюються при першому запиті (див. transport)
+        self.transport_options = {
+            "connect_timeout": connect_timeout,
+            "read_timeout": read_timeout,
+            "retries": retries,
+            "backoff": retry_backoff,
+            # Async pipeline виконує запити з пулу на concurrency * 3 + 2 потоків (див. AsyncPipeline._run)
+            "pool_size": max(10, self.concurrency * 3 + 2 if pipeline == 'async' else self.concurrency),
+            "breaker_threshold": breaker_threshold,
+            "breaker_cooldown": breaker_cooldown
+        }
+        self._transport = None
 
 
-    # MARK: run
-    def run(self, urls=None):
+    # MARK: transport
+    @property
+    def transport(self):
+        with self._lazy_lock:
+            if self._transport is None:
+                import cloudscraper
+                from utils.transport import Transport
+
+                self._transport = Transport(cloudscraper.create_scraper(), self.rate_limiter, self.metrics, **self.transport_options)
+            return self._transport
+
+
+    # MARK: cpu_pool
+    @property
+    def cpu_pool(self):
+        with self._lazy_lock:
+            if self._cpu_pool is None:
+                from utils.cpu_pool import CPUPool
+
+                self._cpu_pool = CPUPool(self.cpu_workers, html_parser=self.html_parser)
+            return self._cpu_pool
+
 
-        if urls is None:
-            urls = self.get_urls_from_sitemap(self.sitemap_url)
+    # MARK: scraper
+    @property
+    def scraper(self):
+        return self.transport.session
 
-        logging.info(f"Total URLs: {len(urls)}")
+
+    # MARK: translation_cache
+    @property
+    def translation_cache(self):
+        with self._lazy_lock:
+            if self._translation_cache is None:
+                self._translation_cache = TranslationCache(os.path.join(self.cache_dir, 'translation_cache.json'))
+            return self._translation_cache
+
+
+    # MARK: torrent_cache
+    @property
+    def torrent_cache(self):
+        with self._lazy_lock:
+            if self._torrent_cache is None:
+                self._torrent_cache = TorrentCache(os.path.join(self.cache_dir, 'torrent_cache.json'), max_bytes=self.torrent_cache_max_bytes)
+            return self._torrent_cache
+
+
+    # MARK: run
+    def run(self, urls=None, resume=False):
+        from tqdm import tqdm
+        from async_pipeline import AsyncPipeline
+
+        started = time.perf_counter()
+        from_sitemap = urls is None
+        self._sitemap_reader = None
+        checkpoint = self._load_checkpoint() if resume else None
+        if checkpoint is not None:
+            if self.recrawl is not None:
+                self.recrawl.load()
+            urls = checkpoint["urls"]
+            if not checkpoint["urls_complete"]:
+                # Контрольну точку збережено до кінця sitemap - після її URL читається решта sitemap
+                urls = self._resume_urls(urls)
+        else:
+            if from_sitemap:
+                # URL надходять по мірі завантаження sitemap, обробка починається з першого з них
+                urls = self.iter_sitemap_urls(self.sitemap_url)
+            self._start_checkpoints()
+            self.plan_recrawl()
+
+        start = self._completed
+        items = self._url_items(urls, start)
+        first_item = next(items, None)
+        if first_item is None and not self._run_urls and from_sitemap:
+            # Порожній або недоступний sitemap: попередній вихідний файл залишається як є
+            print("Failed to get URL from sitemap.xml")
+            logging.error("Failed to get URL from sitemap.xml")
+            return False
+        self.metrics.observe('first_url', time.perf_counter() - started)
+        items = chain([first_item] if first_item is not None else [], items)
 
         if os.getenv('GITHUB_ACTIONS') == 'true':
             miniters_value = 100  # Для GitHub Actions
@@ -81,244 +260,1075 @@ class IgruhaParser:
             logging.info('Running locally')
 
 
-        for index, url in enumerate(tqdm(urls, desc="Processing pages", unit="page", miniters=miniters_value, maxinterval=maxinterval_value), start=1):
-            self.process_url(index, url)  # Ваш метод обробки URL
+        logging.info(f"Concurrency: {self.concurrency}, pipeline: {self.pipeline}")
 
-        self._save_cache()
+        previous_index = self._previous_output_index()
+        # Продовжений файл уже містить записи, яких немає в індексі, - тоді індекс будується після запису
+        output_index = self._new_output_index() if checkpoint is None else None
+
+        if self.deduplicate:
+            self.download_index = DownloadIndex()
+            if checkpoint is not None:
+                self.download_index.load_partial(f'{self.data_file}.partial', checkpoint["writer"]["offset"])
+
+        if self.manifest_file:
+            self.manifest = open(self.manifest_file, 'a' if checkpoint is not None else 'w', encoding='utf-8')
+
+        total = len(self._run_urls) if self._urls_complete else None
+        with StreamingJSONWriter(self.data_file, self.site_name, indent=self.json_indent, keep_partial=self.checkpoint_interval > 0,
+                                 resume_state=checkpoint["writer"] if checkpoint else None, index=output_index) as self.writer:
+            with tqdm(total=total, initial=start, desc="Processing pages", unit="page", miniters=miniters_value, maxinterval=maxinterval_value) as self.progress:
+                if self.pipeline == 'async':
+                    AsyncPipeline(self, queue_size=self.pipeline_queue_size).run(items, self.progress, start=start)
+                else:
+                    self._run_threads(items, self.progress)
+            self.progress = None
+
+            if self._sitemap_failures():
+                self._abort_incomplete_run()
+                return False
+
+            self._flush_translation_queue()
+            self.stats["torrent_cache_hits"] = self.torrent_cache.hits
+            self._save_cache()
+            if self.recrawl is not None:
+                self.recrawl.finish()
+
+        if self.manifest is not None:
+            self.manifest.close()
+            self.manifest = None
+
+        self._remove_checkpoint()
+        self._save_run_urls(self._run_urls)
+
+        if self._cpu_pool is not None:
+            self._cpu_pool.close()
+            self._cpu_pool = None
+
+        self.metrics.observe('run', time.perf_counter() - started)
+        self.metrics.inc('output_bytes', os.path.getsize(self.data_file))
+        self.metrics.cache_lookup('torrent', True, self.torrent_cache.hits)
+        self.metrics.cache_lookup('torrent', False, self.torrent_cache.misses)
+        self.metrics.cache_lookup('translation', True, self.translation_cache.hits)
+        self.metrics.cache_lookup('translation', False, self.translation_cache.misses)
+        self.metrics.inc('circuit_breaker_trips', self.transport.breaker.trips)
 
         # self.print_stats()
 
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=4)
+        self._finish_output(previous_index, output_index)
+        return True
+
+
+    # MARK: plan_recrawl
+    def plan_recrawl(self):
+        # План перевірок складається один раз на запуск; шард отримує вже складений план (див. utils/sharding.py)
+        if self.recrawl is not None and self.recrawl.checks is None:
+            self.recrawl.plan(self.cache)
+
+
+    # MARK: _url_items
+    def _url_items(self, urls, start):
+        # (індекс, url) для обробки зі списку або потоку URL. Усі отримані URL запам'ятовуються в _run_urls
+        # (для контрольних точок і last_run_urls), перші start з них уже оброблено (відновлення з контрольної точки).
+        self._run_urls = []
+        self._urls_complete = False
+        for index, url in enumerate(urls, start=1):
+            self._run_urls.append(url)
+            if index > start:
+                yield index, url
+
+        # Sitemap з помилкою не вважається прочитаним: відновлений запуск дочитає його (_resume_urls)
+        self._urls_complete = not self._sitemap_failures()
+        logging.info(f"Total URLs: {len(self._run_urls)}")
+        if self.progress is not None:
+            self.progress.total = len(self._run_urls)
+            self.progress.refresh()
+
+
+    # MARK: _abort_incomplete_run
+    def _abort_incomplete_run(self):
+        # Частину sitemap не прочитано, тож новий файл неповний: попередній вихідний файл залишається як є,
+        # а оброблене зберігається в контрольній точці разом з тимчасовим файлом - --resume продовжить запуск
+        self._save_checkpoint()
+        self.writer.keep_partial = True
+        self.writer.abort()
+
+        if self.manifest is not None:
+            self.manifest.close()
+            self.manifest = None
+        if self._cpu_pool is not None:
+            self._cpu_pool.close()
+            self._cpu_pool = None
+
+        failed_text = f"Failed to read sitemap {', '.join(self._sitemap_failures())}: run aborted, use --resume to continue"
+        print(failed_text)
+        logging.error(failed_text)
+
+
+    # MARK: _resume_urls
+    def _resume_urls(self, urls):
+        yield from urls
+        saved_urls = set(urls)
+        for url in self.iter_sitemap_urls(self.sitemap_url):
+            if url not in saved_urls:
+                yield url
+
+
+    # MARK: _previous_output_index
+    def _previous_output_index(self):
+        # Індекс попереднього вихідного файлу (ключі і хеші записів), поки його ще не замінено новим
+        if self.delta_output and os.path.exists(self.data_file):
+            return load_index(self.data_file)
+        return None
+
+
+    def _new_output_index(self):
+        # Індекс записів нового файлу потрібен лише для дельт
+        if self.delta_output or (self.backup_dir is not None and self.backup_mode == 'delta'):
+            return OutputIndex()
+        return None
+
+
+    # MARK: _finish_output
+    def _finish_output(self, previous_index, output_index=None):
         print(f"Data saved in file {self.data_file}")
         logging.info(f"Data saved in file {self.data_file}")
 
+        # Шарди (backup_dir=None) не роблять резервних копій - їх робить об'єднання
+        backup = self.backup_dir is not None
+        index = None
+        if self.delta_output or (backup and self.backup_mode == 'delta'):
+            index = output_index.entries if output_index is not None else index_file(self.data_file)
+        if self.delta_output:
+            # Збережений індекс - база дельти наступного запуску
+            save_index(self.data_file, index)
+            self._write_output_delta(index, previous_index)
+
+        if backup:
+            self._backup_output(index)
+
+
+    # MARK: merge_shards
+    def merge_shards(self, shard_dirs):
+        # Об'єднує завершені шарди (utils/sharding.py) у data_file, кеші і stats так,
+        # ніби всі їхні URL оброблено одним запуском у порядку sitemap
+        shards = [load_shard(shard_dir) for shard_dir in shard_dirs]
+        # (індекс у sitemap, шард, позиція в шарді)
+        pages = sorted((global_index, shard, position)
+                       for shard, shard_info in enumerate(shards)
+                       for position, (global_index, _) in enumerate(shard_info["urls"]))
+        logging.info(f"Merging {len(shards)} shards: {len(pages)} URLs")
+        self._save_run_urls([shards[shard]["urls"][position][1] for _, shard, position in pages])
+
+        # Шарди відкидають дублікати лише в межах себе, дублікати між шардами відкидаються тут
+        download_index = DownloadIndex()
+        previous_index = self._previous_output_index()
+        output_index = self._new_output_index()
+        with StreamingJSONWriter(self.data_file, self.site_name, indent=self.json_indent, index=output_index) as writer:
+            for _, shard, position in pages:
+                for download in shards[shard]["downloads"][position]:
+                    if not self.deduplicate or download_index.add(download):
+                        writer.write(download)
+
+        for shard_info in shards:
+            self.torrent_cache.merge(TorrentCache(os.path.join(shard_info["cache_dir"], 'torrent_cache.json')))
+            self.translation_cache.merge(TranslationCache(os.path.join(shard_info["cache_dir"], 'translation_cache.json')))
+            shard_info["cache"] = open_cache_store(shard_info["cache_backend"], shard_info["cache_file"])
+
+        # Нові сторінки додаються в кеш у порядку sitemap, як і при звичайному запуску
+        for _, shard, position in pages:
+            url = shards[shard]["urls"][position][1]
+            cache_entry = shards[shard]["cache"].get(url)
+            if cache_entry is not None:
+                self.cache.set(url, cache_entry)
+
+        for shard_info in shards:
+            shard_info["cache"].close()
+
+        # Номер запуску планувальника - той, з яким шарди записали історію перевірок
+        if self.recrawl is not None:
+            for shard_info in shards:
+                shard_recrawl = RecrawlScheduler(os.path.join(shard_info["cache_dir"], RECRAWL_FILE)).load()
+                self.recrawl.run = max(self.recrawl.run, shard_recrawl.run)
+            self.recrawl.finish()
+
+        # Записи негативного кешу сторінок шарда (разом з видаленими ним) - з каталогу шарда
+        if self.negative_cache is not None:
+            for shard_info in shards:
+                shard_negative_cache = NegativeCache(os.path.join(shard_info["cache_dir"], NEGATIVE_CACHE_FILE), None)
+                self.negative_cache.merge(shard_negative_cache, [url for _, url in shard_info["urls"]])
+
+        self._merge_shard_stats(shards)
+        self.stats["duplicate_downloads"] += download_index.duplicates
+        self._save_cache()
+        self._finish_output(previous_index, output_index)
+
+
+    # MARK: _merge_shard_stats
+    def _merge_shard_stats(self, shards):
+        # Елементи списків починаються з індексу сторінки в шарді ("12. ...") -
+        # він замінюється на індекс у sitemap, і списки впорядковуються за ним
+        elements = {stat_name: [] for stat_name, stat_value in self.stats.items() if isinstance(stat_value, list)}
+        for shard_info in shards:
+            for stat_name, stat_value in shard_info["stats"].items():
+                if not isinstance(stat_value, list):
+                    self.stats[stat_name] += stat_value
+                    continue
+                for element in stat_value:
+                    local_index, _, text = element.partition('. ')
+                    global_index = shard_info["urls"][int(local_index) - 1][0]
+                    elements[stat_name].append((global_index, f'{global_index}. {text}'))
+
+        for stat_name, stat_elements in elements.items():
+            self.stats[stat_name] = [element for _, element in sorted(stat_elements, key=lambda item: item[0])]
 
+
+    # MARK: _write_output_delta
+    def _write_output_delta(self, index, previous_index):
+        delta = compute_delta(previous_index or [], index, self.site_name, self.data_file, indent=self.json_indent)
+        write_delta(self.delta_file, delta)
+        delta_text = f"Delta saved in file {self.delta_file}: {len(delta['added'])} added, {len(delta['updated'])} updated, {len(delta['removed'])} removed"
+        print(delta_text)
+        logging.info(delta_text)
+
+
+    # MARK: _backup_output
+    def _backup_output(self, index=None):
         os.makedirs(self.backup_dir , exist_ok=True)  # Create the directory if it doesn't exist
         current_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+
+        if self.backup_mode == 'delta':
+            base_filename, deltas_since_base = self._latest_full_backup()
+            if base_filename and deltas_since_base < self.full_snapshot_every - 1:
+                base_index = load_index(os.path.join(self.backup_dir, base_filename))
+                delta = compute_delta(base_index, index, self.site_name, self.data_file, base=base_filename, indent=self.json_indent)
+                backup_file_path = os.path.join(self.backup_dir, f'ihl_{current_time}.delta.json')
+                write_delta(backup_file_path, delta)
+                print(f"The backup delta against {base_filename} is saved in file {backup_file_path}")
+                logging.info(f"The backup delta against {base_filename} is saved in file {backup_file_path}")
+                return
+
         backup_filename  = f'ihl_{current_time}.json'
         backup_file_path  = os.path.join(self.backup_dir, backup_filename)
-        # Збереження копії у JSON файл
-        with open(backup_file_path, 'w', encoding='utf-8') as f:
-            json.dump(self.data, f, ensure_ascii=False, indent=4)
+        # Копія вже записаного файлу: жорстке посилання (DATA_FILE наступного запуску замінюється
+        # атомарно новим файлом, тому копія не зміниться), або звичайне копіювання
+        try:
+            os.link(self.data_file, backup_file_path)
+        except OSError:
+            shutil.copy2(self.data_file, backup_file_path)
+        if self.backup_mode == 'delta':
+            # Індекс повної копії - база наступних дельт (<копія>.index не потрапляє в _latest_full_backup)
+            save_index(backup_file_path, index)
         print(f"The backup data is saved in file {backup_file_path}")
         logging.info(f"The backup data is saved in file {backup_file_path}")
 
 
+    # MARK: _latest_full_backup
+    def _latest_full_backup(self):
+        # Повертає (ім'я останньої повної копії або None, кількість дельт, записаних після неї)
+        # Лише імена, які дає _backup_output, - інші файли в backup_dir (наприклад, відновлені) не стають базою дельт
+        backups = sorted(name for name in os.listdir(self.backup_dir) if BACKUP_NAME_PATTERN.fullmatch(name))
+        deltas_since_base = 0
+        for name in reversed(backups):
+            if not name.endswith('.delta.json'):
+                return name, deltas_since_base
+            deltas_since_base += 1
+        return None, deltas_since_base
+
+
+    # MARK: _run_threads
+    def _run_threads(self, items, progress):
+        # Сторінки обробляються пулом потоків, а результати застосовуються строго в порядку sitemap,
+        # тому вихідний JSON, кеш і stats не залежать від порядку завершення запитів.
+        # Вікно незавершених задач обмежене, щоб не тримати в пам'яті результати всього sitemap.
+        max_pending = self.concurrency * 4
+        pending = deque()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            # items - (індекс, url); URL з sitemap можуть ще завантажуватися
+            for index, url in items:
+                pending.append(executor.submit(self.process_url, index, url))
+
+                if len(pending) >= max_pending:
+                    self._apply_result(pending.popleft().result())
+                    progress.update()
+
+            while pending:
+                self._apply_result(pending.popleft().result())
+                progress.update()
+
+
+    # MARK: _start_checkpoints
+    def _start_checkpoints(self):
+        # Новий запуск: стара контрольна точка більше не дійсна
+        self._remove_checkpoint()
+        self._checkpoint_urls_complete = False
+
+
+    # MARK: _save_checkpoint_urls
+    def _save_checkpoint_urls(self):
+        # Список URL, отриманих до контрольної точки, щоб відновлений запуск обробив саме його, навіть якщо
+        # sitemap за цей час змінився. Коли sitemap прочитано повністю, список більше не перезаписується.
+        if self._checkpoint_urls_complete:
+            return
+
+        # Копії: в async-режимі sitemap читається в іншому потоці і доповнює обидва об'єкти
+        complete = self._urls_complete
+        urls = self._run_urls[:]
+        sitemap_lastmod = dict(self.sitemap_lastmod)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_file = f'{self.checkpoint_urls_file}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as file:
+            json.dump({"urls": urls, "sitemap_lastmod": sitemap_lastmod, "complete": complete}, file, ensure_ascii=False)
+        os.replace(temp_file, self.checkpoint_urls_file)
+        self._checkpoint_urls_complete = complete
+
+
+    # MARK: _save_checkpoint
+    def _save_checkpoint(self):
+        # Спочатку дописуються всі результати, що чекають перекладу, потім зберігаються кеші і
+        # стан вихідного файлу, і лише після цього (атомарно) сама контрольна точка
+        self._flush_translation_queue()
+        writer_state = self.writer.checkpoint()
+        if self.manifest is not None:
+            self.manifest.flush()
+            os.fsync(self.manifest.fileno())
+        self.stats["torrent_cache_hits"] = self.torrent_cache.hits
+        self._save_cache()
+        self._save_checkpoint_urls()
+
+        temp_file = f'{self.checkpoint_file}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as file:
+            json.dump({
+                "completed": self._completed,
+                "writer": writer_state,
+                "stats": self.stats,
+                "time": datetime.now().isoformat(timespec='seconds')
+            }, file, ensure_ascii=False, indent=4)
+        os.replace(temp_file, self.checkpoint_file)
+
+        self._last_checkpoint = self._completed
+        logging.info(f"Checkpoint saved: {self._completed} URLs completed")
+
+
+    # MARK: _load_checkpoint
+    def _load_checkpoint(self):
+        # Повертає {"urls", "writer"} і відновлює stats, або None, якщо продовжувати нічого
+        if not (os.path.exists(self.checkpoint_file) and os.path.exists(self.checkpoint_urls_file)
+                and os.path.exists(f'{self.data_file}.partial')):
+            print("No checkpoint to resume from, starting a new run")
+            logging.info("No checkpoint to resume from, starting a new run")
+            return None
+
+        with open(self.checkpoint_file, 'r', encoding='utf-8') as file:
+            checkpoint = json.load(file)
+        with open(self.checkpoint_urls_file, 'r', encoding='utf-8') as file:
+            checkpoint_urls = json.load(file)
+
+        self.stats = checkpoint["stats"]
+        self.torrent_cache.hits = self.stats["torrent_cache_hits"]
+        self.sitemap_lastmod = checkpoint_urls["sitemap_lastmod"]
+        self._completed = self._last_checkpoint = checkpoint["completed"]
+        # Список без "complete" (старий формат) завжди містив увесь sitemap
+        urls_complete = checkpoint_urls.get("complete", True)
+        self._checkpoint_urls_complete = urls_complete
+
+        total = len(checkpoint_urls['urls']) if urls_complete else f"{len(checkpoint_urls['urls'])}+"
+        print(f"Resuming from checkpoint of {checkpoint['time']}: {self._completed} of {total} URLs completed")
+        logging.info(f"Resuming from checkpoint of {checkpoint['time']}: {self._completed} of {total} URLs completed")
+        return {"urls": checkpoint_urls["urls"], "urls_complete": urls_complete, "writer": checkpoint["writer"]}
+
+
+    # MARK: _remove_checkpoint
+    def _remove_checkpoint(self):
+        for path in (self.checkpoint_file, self.checkpoint_urls_file):
+            if os.path.exists(path):
+                os.remove(path)
+
+
     # MARK: _initialize_cache
     def _initialize_cache(self):
+        # Сховище кешу сторінок: parser_cache.json у пам'яті або SQLite (див. utils/cache_store.py)
         os.makedirs(self.cache_dir, exist_ok=True)
-        if os.path.exists(self.cache_file):
-            with open(self.cache_file, 'r', encoding='utf-8') as file:
-                return json.load(file)
-        return {}
+        return open_cache_store(self.cache_backend, self.cache_file)
 
 
     # MARK: _save_cache
     def _save_cache(self):
-        with open(self.cache_file, 'w', encoding='utf-8') as file:
-            json.dump(self.cache, file, ensure_ascii=False, indent=4)
-        print(f"Cache saved to {self.cache_file}")
-        logging.info(f"Cache saved to {self.cache_file}")
+        with self.metrics.timer('cache_save'):
+            self.cache.save()
+            print(f"Cache saved to {self.cache.path}")
+            logging.info(f"Cache saved to {self.cache.path}")
+
+            self.translation_cache.save()
+            self.torrent_cache.save()
+            if self.negative_cache is not None:
+                self.negative_cache.save()
+
+
+    # MARK: _get
+    def _get(self, url, stage='request', **kwargs):
+        # stage - назва етапу для метрик: sitemap, page, download_page, torrent
+        return self.transport.get(url, stage=stage, **kwargs)
+
+
+    # MARK: _new_result
+    def _new_result(self, index):
+        # Результат обробки однієї сторінки. Воркери не змінюють вихідний файл, self.stats і self.cache напряму,
+        # а повертають результат, який застосовується в основному потоці через _apply_result.
+        return {
+            "index": index,
+            "downloads": [],
+            "cache_entry": None,
+            "validators": None,
+            "page_validators": None,
+            "recrawl": None,
+            "pending_title": None,
+            "pending_downloads": [],
+            "stats": {stat_name: [] if isinstance(stat_value, list) else 0 for stat_name, stat_value in self.stats.items()}
+        }
+
+
+    # MARK: _apply_result
+    def _apply_result(self, result):
+        # Результати з неперекладеними назвами накопичуються, щоб перекласти назви одним пакетом.
+        # Наступні за ними результати чекають у тій же черзі, щоб не порушити порядок sitemap.
+        if result["pending_title"] is None and not self._translation_queue:
+            self._commit_result(result)
+        else:
+            self._translation_queue.append(result)
+            if result["pending_title"] is not None:
+                self._pending_titles[result["pending_title"]] = None
+
+            if len(self._pending_titles) >= self.translation_batch_size or len(self._translation_queue) >= self.translation_batch_size * 20:
+                self._flush_translation_queue()
+
+        if self.checkpoint_interval and result["index"] - self._last_checkpoint >= self.checkpoint_interval:
+            self._save_checkpoint()
+
+
+    # MARK: _flush_translation_queue
+    def _flush_translation_queue(self):
+        if not self._translation_queue:
+            return
+
+        with self.metrics.timer('translation_batch'):
+            translations = translate_batch(list(self._pending_titles), target_language='en', source_language='ru',
+                                           cache=self.translation_cache, endpoint=self.translate_endpoint)
+
+        for result in self._translation_queue:
+            if result["pending_title"] is not None:
+                translated_name = translations.get(result["pending_title"])
+                for download_info, title_details in result["pending_downloads"]:
+                    download_info["title"] = f"{translated_name} {title_details}"
+                    logging.info(f'       {download_info["title"]} / {download_info["uploadDate"]} / {download_info["fileSize"]}')
+
+            self._commit_result(result)
+
+        self._translation_queue = []
+        self._pending_titles = {}
+
+
+    # MARK: _commit_result
+    def _commit_result(self, result):
+        written = 0
+        with self.metrics.timer('json_write'):
+            for download in result["downloads"]:
+                # Дублікати відкидаються тут, в основному потоці і в порядку sitemap, тому залишається
+                # завжди те саме (перше) входження
+                if self.download_index is not None and not self.download_index.add(download):
+                    logging.info(f'{result["index"]}. (DUPLICATE) {download["title"]} / {download["uris"][0]}')
+                    self.stats["duplicate_downloads"] += 1
+                    continue
+                self.writer.write(download)
+                written += 1
+            if self.manifest is not None:
+                self.manifest.write(f'[{result["index"]}, {written}]\n')
+
+        if result["cache_entry"] is not None:
+            url, cache_entry = result["cache_entry"]
+            self.cache.set(url, cache_entry)
+
+        # Оновлюємо lastmod/ETag/Last-Modified для наступного інкрементального запуску
+        if result["validators"] is not None:
+            url, validators = result["validators"]
+            self.cache.update(url, validators)
+
+        if result["recrawl"] is not None:
+            url, recrawl_fields = result["recrawl"]
+            self.cache.update(url, recrawl_fields)
+
+        for stat_name, stat_value in result["stats"].items():
+            self.stats[stat_name] += stat_value
+
+        self._completed = result["index"]
 
 
     # MARK: get_urls_from_sitemap
     def get_urls_from_sitemap(self, sitemap_url):
-        try:
-            response = self.scraper.get(sitemap_url)  # Use cloudscraper to get the sitemap
+        # Порожній список, якщо якийсь sitemap не прочитано: неповний список не можна ділити між шардами
+        urls = list(self.iter_sitemap_urls(sitemap_url))
+        return [] if self._sitemap_failures() else urls
 
-            response.raise_for_status()  # Check the response status
-            sitemap_content = response.content
-        except requests.RequestException as e:
-            logging.error(f"Error connecting to {sitemap_url}: {e}")
-            return []
-        
-        # Парсинг XML для витягнення всіх URL
-        root = ET.fromstring(sitemap_content)
-        namespaces = {'ns': 'http://www.sitemaps.org/schemas/sitemap/0.9'}
-        return [elem.text for elem in root.findall('.//ns:loc', namespaces)]
 
+    # MARK: iter_sitemap_urls
+    def iter_sitemap_urls(self, sitemap_url):
+        # URL віддаються по мірі завантаження sitemap; <lastmod> URL потрапляє в sitemap_lastmod раніше за сам URL
+        for url, lastmod in self.get_sitemap_entries(sitemap_url):
+            if lastmod:
+                self.sitemap_lastmod[url] = lastmod
+            yield url
 
-    # MARK: get_urls_from_cache
-    def get_urls_from_cache(self):
-        return list(self.cache.keys())
 
+    # MARK: get_sitemap_entries
+    def get_sitemap_entries(self, sitemap_url):
+        # Ітератор (loc, lastmod) з sitemap і всіх дочірніх sitemap індексу, див. utils/sitemap.py
+        from utils.sitemap import SitemapReader
 
-    # MARK: process_url
-    def process_url(self, index, url):
-        try:
-            page_response = self.scraper.get(url)  # Use cloudscraper to get the page
-            page_response.raise_for_status()  # Check the response status
-            soup = BeautifulSoup(page_response.text, 'html.parser')
-            site_update_date, site_game_name = self._parse_date_title(soup)
+        self._sitemap_reader = SitemapReader(self._get, concurrency=self.sitemap_concurrency, metrics=self.metrics)
+        return self._sitemap_reader.entries(sitemap_url)
 
-            # Якщо сторінка не з грою, пропускаємо
-            if not site_update_date or not site_game_name:
-                logging.info(f"{index}. (INVALID_PAGE) {url}")
 
-                self.stats["invalid_pages"] += 1
-                return
+    def _sitemap_failures(self):
+        return self._sitemap_reader.failed if self._sitemap_reader is not None else []
 
-            # Якщо дані актуальні, беремо з кешу
-            cache_entry = self.cache.get(url)
-            if cache_entry and cache_entry['site_update_date'] == site_update_date:
 
-                logging.info(f'{index}. (CACHE) {cache_entry["site_game_name"]} / {cache_entry["site_update_date"]} / {url}')
+    # MARK: get_urls_from_cache
+    def get_urls_from_cache(self):
+        # Ітератор: URL читаються зі сховища по черзі, без побудови списку
+        return self.cache.urls()
 
+
+    # MARK: _save_run_urls
+    def _save_run_urls(self, urls):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_file = f'{self.run_urls_file}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as file:
+            json.dump(urls, file, ensure_ascii=False)
+        os.replace(temp_file, self.run_urls_file)
+
+
+    # MARK: rebuild_from_cache
+    def rebuild_from_cache(self):
+        # Перезаписує data_file з кешу сторінок без жодного мережевого запиту (наприклад, після ручного
+        # редагування кешу). Сторінки йдуть у порядку останнього запуску, а якщо його список не збережено -
+        # у порядку кешу. Записи кожної сторінки - її download_options з кешу, як для незміненої сторінки.
+        if os.path.exists(self.run_urls_file):
+            with open(self.run_urls_file, 'r', encoding='utf-8') as file:
+                urls = json.load(file)
+        else:
+            urls = self.get_urls_from_cache()
+
+        previous_index = self._previous_output_index()
+        if self.deduplicate:
+            self.download_index = DownloadIndex()
+
+        pages = 0
+        output_index = self._new_output_index()
+        with StreamingJSONWriter(self.data_file, self.site_name, indent=self.json_indent, index=output_index) as self.writer:
+            for index, url in enumerate(urls, start=1):
+                cache_entry = self.cache.get(url)
+                if not cache_entry:
+                    continue
+                result = self._new_result(index)
                 for cached_download in cache_entry["download_options"]:
+                    result["downloads"].append(cached_download)
+                result["stats"]["download_options"] += len(cache_entry["download_options"])
+                self._commit_result(result)
+                pages += 1
 
-                    self.data["downloads"].append(cached_download)
-                    logging.info(f'       {cached_download["title"]} / {cached_download["uploadDate"]} / {cached_download["fileSize"]}')
+        rebuild_text = f"Rebuilt {self.writer.count} downloads of {pages} cached pages without network requests"
+        print(rebuild_text)
+        logging.info(rebuild_text)
 
-                self.stats["download_options"] += len(cache_entry["download_options"])
-                return
+        self._finish_output(previous_index, output_index)
 
 
-            download_options = self.parse_download_options(soup)
-            # Якщо немає варіантів завантаження, пропускаємо
-            if not download_options:
-                logging.info(f'{index}. (NO_DOWNLOAD_OPTIONS) {site_game_name} / {site_update_date} / {url}')
-                self.stats["no_download_options"] += 1
-                return
+    # MARK: process_url
+    def process_url(self, index, url):
+        import requests
 
+        result = self._new_result(index)
+        try:
+            page_response = self._fetch_game_page(result, url)
+            if page_response is None:
+                return result
 
-            if cache_entry:
-                game_page_log = f'{index}. (UPDATED) {site_game_name} / {cache_entry['site_update_date']} -> {site_update_date} / {url}'   
-                self.stats["updated_games"].append(game_page_log)
-            else:
-                game_page_log = f'{index}. (ADDED) {site_game_name} / {site_update_date} / {url}'
-                self.stats["added_games"].append(game_page_log)
-            logging.info(game_page_log)
+            site_update_date, site_game_name, torrent_links = self._parse_game_page_response(page_response)
+
+            if not self._needs_download_options(result, url, site_update_date, site_game_name):
+                return result
+
+            torrent_links = self._skip_dead_torrents(result, torrent_links, site_update_date)
+            download_options, links_failed = self._fetch_download_options(torrent_links, url, site_update_date)
+            self._fill_result(result, url, site_update_date, site_game_name, download_options, len(torrent_links), links_failed)
 
+        except requests.RequestException as e:
+            self._handle_connection_error(result, url, e)
+
+        except Exception as e:
+            self._handle_processing_error(result, url, e)
+
+        return result
+
+
+    # MARK: _fetch_game_page
+    def _fetch_game_page(self, result, url):
+        # Повертає відповідь сервера або None, якщо сторінка не змінилась і результат взято з кешу
+        cache_entry = self.cache.get(url)
+        sitemap_lastmod = self.sitemap_lastmod.get(url)
+        headers = {}
+
+        # Нещодавно невалідна сторінка або сторінка без варіантів завантаження, lastmod якої в sitemap не змінився.
+        # Без lastmod зміну видно лише за датою на самій сторінці (див. _needs_download_options)
+        negative_entry = None
+        if sitemap_lastmod:
+            negative_entry = self._negative_cache_lookup(result, url, sitemap_lastmod=sitemap_lastmod)
+        if negative_entry is not None:
+            logging.info(f'{result["index"]}. (NEGATIVE_CACHE)({negative_entry["reason"]}) {url}')
+            result["stats"]["invalid_pages" if negative_entry["reason"] == "INVALID_PAGE" else "no_download_options"] += 1
+            return None
+
+        if self.incremental and cache_entry:
+            # lastmod у sitemap не змінився - сторінку не завантажуємо взагалі
+            if sitemap_lastmod and cache_entry.get("sitemap_lastmod") == sitemap_lastmod:
+                self._add_unchanged_page(result, url, cache_entry, "LASTMOD")
+                return None
+
+            # Без ознаки зміни в sitemap сторінка перевіряється, лише коли настала її черга в планувальнику
+            lastmod_changed = sitemap_lastmod and cache_entry.get("sitemap_lastmod")
+            if self.recrawl is not None and not lastmod_changed and self.recrawl.skips(url):
+                self._add_unchanged_page(result, url, cache_entry, "SCHEDULE", stat_name="skipped_pages")
+                return None
+
+            # Інакше умовний GET: сервер відповість 304, якщо сторінка не змінилась
+            if cache_entry.get("etag"):
+                headers["If-None-Match"] = cache_entry["etag"]
+            if cache_entry.get("last_modified"):
+                headers["If-Modified-Since"] = cache_entry["last_modified"]
+
+        page_response = self._get(url, stage='page', headers=headers)  # Use cloudscraper to get the page
+
+        if page_response.status_code == 304 and cache_entry:
+            self._add_unchanged_page(result, url, cache_entry, "NOT_MODIFIED")
+            self._record_check(result, url, cache_entry, changed=False)
+            if sitemap_lastmod:
+                result["validators"] = (url, {"sitemap_lastmod": sitemap_lastmod})
+            return None
+
+        page_response.raise_for_status()  # Check the response status
+        self.metrics.cache_lookup('page', False)
+
+        validators = {
+            "sitemap_lastmod": sitemap_lastmod,
+            "etag": page_response.headers.get("ETag"),
+            "last_modified": page_response.headers.get("Last-Modified")
+        }
+        # Зберігаються лише разом із записом кешу, що відповідає цій відповіді (_needs_download_options, _fill_result):
+        # інакше старий запис отримав би новий lastmod/ETag, і зміну сторінки не було б помічено
+        result["page_validators"] = (url, {key: value for key, value in validators.items() if value})
+
+        return page_response
+
+
+    # MARK: _add_unchanged_page
+    def _add_unchanged_page(self, result, url, cache_entry, reason, stat_name="unchanged_pages"):
+        self.metrics.cache_lookup('page', True)
+        logging.info(f'{result["index"]}. (CACHE)({reason}) {cache_entry["site_game_name"]} / {cache_entry["site_update_date"]} / {url}')
+        self._add_cached_downloads(result, cache_entry)
+        result["stats"][stat_name] += 1
+
+
+    # MARK: _record_check
+    def _record_check(self, result, url, cache_entry, changed):
+        # Історія перевірок для планувальника; потрапляє в кеш разом з рештою результату (_commit_result)
+        if self.recrawl is not None:
+            result["recrawl"] = (url, self.recrawl.checked(cache_entry, changed))
+
+
+    # MARK: _negative_cache_lookup
+    def _negative_cache_lookup(self, result, key, spent=0, **state):
+        # Чинний запис негативного кешу або None; влучання зараховує зекономлені запити в stats результату
+        # (spent - скільки з них вже виконано)
+        if self.negative_cache is None:
+            return None
+        negative_entry = self.negative_cache.lookup(key, **state)
+        self.metrics.cache_lookup('negative', negative_entry is not None)
+        if negative_entry is not None:
+            result["stats"]["negative_cache_saved_requests"] += negative_entry["requests"] - spent
+        return negative_entry
+
+
+    # MARK: _record_negative
+    def _record_negative(self, key, reason, requests, **state):
+        if self.negative_cache is not None:
+            self.negative_cache.record(key, reason, requests, **state)
+
+
+    # MARK: _skip_dead_torrents
+    def _skip_dead_torrents(self, result, torrent_links, site_update_date):
+        # Посилання, які треба запитати: торренти з чинним записом DEAD_TORRENT пропускаються
+        links = []
+        for download_page_url, size_text in torrent_links:
+            if self._negative_cache_lookup(result, download_page_url, site_update_date=site_update_date):
+                logging.info(f'{result["index"]}. (NEGATIVE_CACHE)(DEAD_TORRENT) {download_page_url}')
+                continue
+            links.append((download_page_url, size_text))
+        return links
+
+
+    # MARK: _record_torrent_check
+    def _record_torrent_check(self, url, site_update_date, download_page_url, magnet_info):
+        # Торрент, який не перетворюється в магнет-посилання, не запитується (разом зі сторінкою завантаження),
+        # поки не зміниться дата оновлення сторінки гри url
+        if self.negative_cache is None or url is None:
+            return
+        if magnet_info[0]:
+            self.negative_cache.discard(download_page_url)
+        else:
+            self._record_negative(download_page_url, "DEAD_TORRENT", 2, page=url, site_update_date=site_update_date)
+
+
+    # MARK: _needs_download_options
+    def _needs_download_options(self, result, url, site_update_date, site_game_name):
+        # Повертає False, якщо сторінку вже оброблено (невалідна сторінка або актуальний кеш)
+        index = result["index"]
+        stats = result["stats"]
+
+        # Якщо сторінка не з грою, пропускаємо
+        if not site_update_date or not site_game_name:
+            logging.info(f"{index}. (INVALID_PAGE) {url}")
+
+            stats["invalid_pages"] += 1
+            # Кешується лише сторінка самого сайту (з його заголовком div.module-title), а не сторінка
+            # перевірки Cloudflare чи техобслуговування, віддана з кодом 200
+            if site_game_name:
+                self._record_negative(url, "INVALID_PAGE", 1, sitemap_lastmod=self.sitemap_lastmod.get(url), site_update_date=site_update_date)
+            return False
+
+        # Якщо дані актуальні, беремо з кешу
+        cache_entry = self.cache.get(url)
+        if cache_entry and cache_entry['site_update_date'] == site_update_date:
+
+            logging.info(f'{index}. (CACHE) {cache_entry["site_game_name"]} / {cache_entry["site_update_date"]} / {url}')
+            self._add_cached_downloads(result, cache_entry)
+            self._record_check(result, url, cache_entry, changed=False)
+            result["validators"] = result["page_validators"]
+            return False
+
+        # Дата оновлення та сама, що й при перевірці, яка не знайшла варіантів завантаження
+        negative_entry = self._negative_cache_lookup(result, url, spent=1, reason="NO_DOWNLOAD_OPTIONS", site_update_date=site_update_date)
+        if negative_entry is not None:
+            logging.info(f'{index}. (NEGATIVE_CACHE)(NO_DOWNLOAD_OPTIONS) {site_game_name} / {site_update_date} / {url}')
+            stats["no_download_options"] += 1
+            return False
+
+        return True
+
+
+    # MARK: _add_cached_downloads
+    def _add_cached_downloads(self, result, cache_entry):
+        for cached_download in cache_entry["download_options"]:
+
+            result["downloads"].append(cached_download)
+            logging.info(f'       {cached_download["title"]} / {cached_download["uploadDate"]} / {cached_download["fileSize"]}')
+
+        result["stats"]["download_options"] += len(cache_entry["download_options"])
+
+
+    # MARK: _fill_result
+    def _fill_result(self, result, url, site_update_date, site_game_name, download_options, link_count=0, links_failed=False):
+        index = result["index"]
+        stats = result["stats"]
+
+        # Якщо немає варіантів завантаження, пропускаємо
+        if not download_options:
+            logging.info(f'{index}. (NO_DOWNLOAD_OPTIONS) {site_game_name} / {site_update_date} / {url}')
+            stats["no_download_options"] += 1
+            # Кешується, лише якщо всі посилання вдалося перевірити: після помилки запиту (links_failed)
+            # варіанти можуть з'явитися вже наступного запуску.
+            # Повторна перевірка - сторінка гри, а також сторінка завантаження і торрент на кожне посилання,
+            # запитане цього разу (link_count; пропущені через DEAD_TORRENT не рахуються)
+            if not links_failed:
+                self._record_negative(url, "NO_DOWNLOAD_OPTIONS", 1 + 2 * link_count,
+                                      sitemap_lastmod=self.sitemap_lastmod.get(url), site_update_date=site_update_date)
+            return
+
+        if self.negative_cache is not None:
+            self.negative_cache.discard(url)
+
+        previous_entry = self.cache.get(url)
+        if previous_entry:
+            game_page_log = f'{index}. (UPDATED) {site_game_name} / {previous_entry['site_update_date']} -> {site_update_date} / {url}'   
+            stats["updated_games"].append(game_page_log)
+        else:
+            game_page_log = f'{index}. (ADDED) {site_game_name} / {site_update_date} / {url}'
+            stats["added_games"].append(game_page_log)
+        logging.info(game_page_log)
+
+        # Назву, якої немає в кеші перекладів, перекладаємо пізніше пакетом (див. _apply_result)
+        title_text, needs_translation = self._prepare_title(site_game_name)
+        if needs_translation and self.translation_batch_size and title_text not in self.translation_cache:
+            result["pending_title"] = title_text
+            translated_name = None
+        else:
             translated_name = self.translate_text(site_game_name, target_language='en', source_language='ru')
-            
-            # Новий запис у кеші
-            cache_entry = {
-                "site_update_date": site_update_date,
-                "site_game_name": site_game_name,
-                "download_options": []
-            }
 
-            for download_option in download_options:
+        # Новий запис у кеші
+        cache_entry = {
+            "site_update_date": site_update_date,
+            "site_game_name": site_game_name,
+            "download_options": []
+        }
 
-                title = f"{translated_name} {download_option['info'].replace('от', 'by')}"
+        for download_option in download_options:
 
+            title_details = download_option['info'].replace('от', 'by')
+            title = f"{translated_name} {title_details}"
 
-                if (download_option['date']):
-                    uploadDate = download_option['date']
-                else:
-                    logging.warning(f'Date Not Available in Torrent File. Using page update date')
-                    uploadDate = date_to_iso(site_update_date)
 
+            if (download_option['date']):
+                uploadDate = download_option['date']
+            else:
+                logging.warning(f'Date Not Available in Torrent File. Using page update date')
+                uploadDate = date_to_iso(site_update_date)
+
+
+            download_info = {
+                "title": title,
+                "uris": [download_option['magnet_link']],
+                "uploadDate": uploadDate,
+                "fileSize": download_option['fileSize']
+            }
 
+            if result["pending_title"] is not None:
+                result["pending_downloads"].append((download_info, title_details))
+            else:
                 logging.info(f'       {title} / {uploadDate} / {download_option["fileSize"]}')
 
-                download_info = {
-                    "title": title,
-                    "uris": [download_option['magnet_link']],
-                    "uploadDate": uploadDate,
-                    "fileSize": download_option['fileSize']
-                }
+            result["downloads"].append(download_info)
+            cache_entry["download_options"].append(download_info)
 
-                self.data["downloads"].append(download_info)
-                cache_entry["download_options"].append(download_info)
+            stats["download_options"] += 1
 
-                self.stats["download_options"] += 1
+        # Оновлюємо кеш із новими даними для поточного URL
+        result["cache_entry"] = (url, cache_entry)
+        result["validators"] = result["page_validators"]
+        self._record_check(result, url, previous_entry, changed=True)
 
-            # Оновлюємо кеш із новими даними для поточного URL
-            self.cache[url] = cache_entry
 
+    # MARK: _handle_connection_error
+    def _handle_connection_error(self, result, url, e):
+        index = result["index"]
+        logging.error(f"{index}. Error connecting to {url}: {e}")
+        result["stats"]["error_connecting"].append(f'{index}. {url}')
 
-        except requests.RequestException as e:
-            logging.error(f"{index}. Error connecting to {url}: {e}")
-            self.stats["error_connecting"].append(f'{index}. {url}')
+        cache_entry = self.cache.get(url)
+        if cache_entry:
 
-            cache_entry = self.cache.get(url)
-            if cache_entry:
+            logging.info(f'{index}. (RequestException)(CACHE) {cache_entry["site_game_name"]} / {cache_entry["site_update_date"]} / {url}')
+            self._add_cached_downloads(result, cache_entry)
 
-                logging.info(f'{index}. (RequestException)(CACHE) {cache_entry["site_game_name"]} / {cache_entry["site_update_date"]} / {url}')
 
-                for cached_download in cache_entry["download_options"]:
+    # MARK: _handle_processing_error
+    def _handle_processing_error(self, result, url, e):
+        index = result["index"]
+        logging.error(f"{index}. Error processing {url}: {e}")
+        result["stats"]["error_processing"].append(f'{index}. {url}')
 
-                    self.data["downloads"].append(cached_download)
-                    logging.info(f'       {cached_download["title"]} / {cached_download["uploadDate"]} / {cached_download["fileSize"]}')
 
-                self.stats["download_options"] += len(cache_entry["download_options"])
+    # MARK: _parse_game_page
+    def _parse_game_page(self, html):
+        # Повертає (site_update_date, site_game_name, torrent_links)
+        with self.metrics.timer('page_parse'):
+            if self.html_parser == 'fast':
+                try:
+                    return html_extract.parse_game_page(html)
+                except Exception as e:
+                    logging.warning(f'Fast HTML extractor failed, falling back to BeautifulSoup: {e}')
+
+            from bs4 import BeautifulSoup
+            soup = BeautifulSoup(html, 'html.parser')
+            site_update_date, site_game_name = self._parse_date_title(soup)
+            return site_update_date, site_game_name, self._extract_torrent_links(soup)
 
-            
-        except Exception as e:
-            logging.error(f"{index}. Error processing {url}: {e}")
-            self.stats["error_processing"].append(f'{index}. {url}')
+
+    # MARK: _parse_game_page_response
+    def _parse_game_page_response(self, response):
+        # З пулом процесів воркеру передаються сирі байти: текст декодується вже там
+        if self.cpu_workers:
+            return self.cpu_pool.call(self.metrics, 'parse_game_page', response.content, response.encoding)
+        return self._parse_game_page(response.text)
 
 
     # MARK: parse_download_options
     def parse_download_options(self, soup):
+        return self._fetch_download_options(self._extract_torrent_links(soup))[0]
+
+
+    # MARK: _fetch_download_options
+    def _fetch_download_options(self, torrent_links, url=None, site_update_date=None):
+        # Повертає (варіанти завантаження, чи не вдалося перевірити якесь посилання через помилку).
+        # url, site_update_date - сторінка гри, для якої записуються мертві торренти (див. _skip_dead_torrents)
+        import requests
 
         # Список для збереження результатів
         torrent_info_list = []
+        links_failed = False
 
-        # Шукаємо всі посилання з класом 'torrent'
-        torrent_links = soup.find_all('a', class_='torrent')
+        for download_page_url, size_text in torrent_links:
+            try:
+                # Отримуємо сторінку завантаження
+                page_response_2 = self._get(download_page_url, stage='download_page')  # Use cloudscraper to get the download page
+                page_response_2.raise_for_status()
+                torrent_url = self._extract_torrent_url_response(page_response_2)
+                if not torrent_url:
+                    continue
+
+                # Завантаження торрент файлу
+                try:
+                    # Отримання контенту файлу (або результату з кешу торрентів, якщо файл не змінився)
+                    response, magnet_info = self._fetch_torrent(torrent_url)
+                    if magnet_info is None:
+                        magnet_info = self._torrent_response_to_magnet(torrent_url, response)
+                    self._record_torrent_check(url, site_update_date, download_page_url, magnet_info)
+                    download_option = self._build_download_option(size_text, magnet_info)
+
+                except requests.RequestException as e:
+                    logging.error(f"Failed to download {torrent_url}: {e}")
+                    download_option = None
+                    links_failed = True
+
+                if download_option:
+                    torrent_info_list.append(download_option)
+
+            except Exception as e:
+                logging.error(f"Failed to process {download_page_url}: {e}")
+                links_failed = True
 
-        for torrent in torrent_links:
+        return torrent_info_list, links_failed
+
+
+    # MARK: _extract_torrent_links
+    def _extract_torrent_links(self, soup):
+        # Повертає список (посилання на сторінку завантаження, текст з розміром) для сторінки гри
+        torrent_links = []
+
+        # Шукаємо всі посилання з класом 'torrent'
+        for torrent in soup.find_all('a', class_='torrent'):
 
             # Продовжити до наступної ітерації, якщо посилання веде на '/top-online.html'
             if torrent['href'] == '/top-online.html':
                 continue
 
-            try:
-                # Отримуємо сторінку завантаження
-                page_response_2 = self.scraper.get(torrent['href'])  # Use cloudscraper to get the download page
-                page_response_2.raise_for_status()
-                soup_2 = BeautifulSoup(page_response_2.text, 'html.parser')
-                download_page_link = soup_2.find('a', class_='torrent2')
+            navbartor = torrent.find_parent('ul', id='navbartor')
+            if not navbartor:
+                continue  # Продовжити, якщо 'navbartor' не знайдено
 
-                navbartor = torrent.find_parent('ul', id='navbartor')
-                if not navbartor:
-                    continue  # Продовжити, якщо 'navbartor' не знайдено
+            center_tag = navbartor.find_previous('center')
+            if not center_tag:
+                continue  # Продовжити, якщо <center> не знайдено
 
-                center_tag = navbartor.find_previous('center')
-                if not center_tag:
-                    continue  # Продовжити, якщо <center> не знайдено
+            size_and_info = center_tag.find('span', style="font-size:14pt;")
+            if not size_and_info:
+                continue
 
-                size_and_info = center_tag.find('span', style="font-size:14pt;")
-                if not size_and_info or not download_page_link:
-                    continue
+            torrent_links.append((torrent['href'], size_and_info.get_text(strip=True)))
 
+        return torrent_links
 
-                site_size, name_details = self._parse_size_info(size_and_info.get_text(strip=True))
 
-                # Завантаження торрент файлу
-                torrent_url = download_page_link['href']
+    # MARK: _extract_torrent_url
+    def _extract_torrent_url(self, download_page_html):
+        with self.metrics.timer('download_page_parse'):
+            if self.html_parser == 'fast':
                 try:
-                    # Отримання контенту файлу
-                    response = self.scraper.get(torrent_url)  # Use cloudscraper to get the torrent file
-                    response.raise_for_status()
-                    # Використання BytesIO для зберігання в пам'яті
-                    torrent_bytes = BytesIO(response.content)
-                    # Отримання магнет-посилання
-                    magnet_link, torrent_date, torrent_size_bytes = self._torrent_to_magnet(torrent_bytes.getvalue())
+                    return html_extract.parse_download_page(download_page_html)
+                except Exception as e:
+                    logging.warning(f'Fast HTML extractor failed, falling back to BeautifulSoup: {e}')
 
-                except requests.RequestException as e:
-                    logging.error(f"Failed to download {torrent_url}: {e}")
-                    magnet_link, torrent_date, torrent_size_bytes = None, None, None
+            from bs4 import BeautifulSoup
+            soup_2 = BeautifulSoup(download_page_html, 'html.parser')
+            download_page_link = soup_2.find('a', class_='torrent2')
+            return download_page_link['href'] if download_page_link else None
 
-                if magnet_link:
-                    torrent_info_list.append({
-                        'info': name_details,
-                        'fileSize': site_size,
-                        'date': torrent_date,
-                        'magnet_link': magnet_link
-                    })
 
-            except Exception as e:
-                logging.error(f"Failed to process {torrent['href']}: {e}")
+    # MARK: _extract_torrent_url_response
+    def _extract_torrent_url_response(self, response):
+        if self.cpu_workers:
+            return self.cpu_pool.call(self.metrics, 'extract_torrent_url', response.content, response.encoding)
+        return self._extract_torrent_url(response.text)
+
+
+    # MARK: _fetch_torrent
+    def _fetch_torrent(self, torrent_url):
+        # Повертає (відповідь, None) або (None, (магнет, дата, розмір)), якщо сервер підтвердив (304),
+        # що торрент не змінився з часу, коли його було збережено в кеші торрентів
+        cache_entry = self.torrent_cache.get(torrent_url)
+        response = self._get(torrent_url, stage='torrent', headers=self.torrent_cache.conditional_headers(cache_entry))  # Use cloudscraper to get the torrent file
+
+        if response.status_code == 304 and cache_entry:
+            magnet_info = self.torrent_cache.hit(torrent_url)
+            if magnet_info:
+                return None, magnet_info
+            response = self._get(torrent_url, stage='torrent')
+
+        response.raise_for_status()
+        return response, None
+
+
+    # MARK: _torrent_response_to_magnet
+    def _torrent_response_to_magnet(self, torrent_url, response):
+        torrent_bytes = response.content
+        sha1 = hashlib.sha1(torrent_bytes).hexdigest()
+
+        # Той самий файл, що й минулого разу - розбирати повторно не потрібно
+        magnet_info = self.torrent_cache.hit(torrent_url, sha1)
+        if magnet_info:
+            return magnet_info
 
-        return torrent_info_list
+        magnet_info = self._torrent_to_magnet(torrent_bytes)
+        if magnet_info[0]:
+            self.torrent_cache.put(torrent_url, response.headers, len(torrent_bytes), sha1, *magnet_info)
+        return magnet_info
+
+
+    # MARK: _build_download_option
+    def _build_download_option(self, size_text, magnet_info):
+        site_size, name_details = self._parse_size_info(size_text)
+
+        magnet_link, torrent_date, torrent_size_bytes = magnet_info
+        if not magnet_link:
+            return None
+
+        return {
+            'info': name_details,
+            'fileSize': site_size,
+            'date': torrent_date,
+            'magnet_link': magnet_link
+        }
 
 
     # MARK: _torrent_to_magnet
     def _torrent_to_magnet(self, torrent_bytes):
+        if self.cpu_workers:
+            return self.cpu_pool.call(self.metrics, 'torrent_to_magnet', torrent_bytes)
+
+        with self.metrics.timer('magnet'):
+            try:
+                # Швидкий шлях: хеш сирих байтів info без повного декодування
+                return torrent_to_magnet(torrent_bytes)
+            except Exception:
+                # Нестандартний або пошкоджений торрент - повний розбір, як і раніше
+                self.metrics.inc('magnet_fallbacks')
+                return self._torrent_to_magnet_bencodepy(torrent_bytes)
+
+
+    # MARK: _torrent_to_magnet_bencodepy
+    def _torrent_to_magnet_bencodepy(self, torrent_bytes):
+        import bencodepy
+
         try:
             # Декодування метаданих без збереження у файл
             metadata = bencodepy.decode(torrent_bytes)
@@ -416,6 +1426,18 @@ class IgruhaParser:
 
     # MARK: translate_text
     def translate_text(self, text, target_language='en', source_language='ru'):
+        text, needs_translation = self._prepare_title(text)
+
+        if needs_translation:
+            with self.metrics.timer('translation'):
+                return translate_line(text , target_language, source_language, cache=self.translation_cache, endpoint=self.translate_endpoint)
+        else:
+            # print(f'ALREADY IN ENGLISH ({text})')
+            return text 
+
+
+    # MARK: _prepare_title
+    def _prepare_title(self, text):
         # Регулярний вираз для перевірки неанглійських букв
         non_english_pattern = re.compile(r'[^\x00-\x7F]')
 
@@ -423,11 +1445,7 @@ class IgruhaParser:
         # text = text.replace("–", "-")
 
         # Перевіряємо, чи рядок містить неанглійські букви
-        if non_english_pattern.search(text):
-            return translate_line(text , target_language, source_language)
-        else:
-            # print(f'ALREADY IN ENGLISH ({text})')
-            return text 
+        return text, bool(non_english_pattern.search(text))
 
 
     # MARK: print_stats
@@ -456,3 +1474,8 @@ class IgruhaParser:
                     print(output_text)
                     logging.info(output_text)
                     file.write(output_text + "\n")  # Запис в файл
+
+        # Метрики запуску у форматі JSON і Prometheus поруч із файлом статистики
+        output_dir = os.path.dirname(output_file)
+        self.metrics.export(os.path.join(output_dir, 'metrics.json'), os.path.join(output_dir, 'metrics.prom'), stats=self.stats)
+        print(f"Metrics saved in {os.path.join(output_dir, 'metrics.json')} and {os.path.join(output_dir, 'metrics.prom')}")
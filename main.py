@@ -1,10 +1,47 @@
+import argparse
+import multiprocessing
+import os
+import sys
+
 from igruha_parser import IgruhaParser
+from utils.torrent_cache import TorrentCache
+from utils.cache_store import export_json_cache, open_cache_store
+from utils.delta import restore_backup
+from utils.sharding import prepare_shard, run_local_shards, run_shard, shard_dir, shard_kwargs, split_urls
 import config
 
 
 
-def main():
-    parser = IgruhaParser(
+def parse_args():
+    arg_parser = argparse.ArgumentParser(description=f"{config.SITE_NAME} parser")
+    arg_parser.add_argument('--prune-torrent-cache', action='store_true',
+                            help='prune cache/torrent_cache.json down to TORRENT_CACHE_MAX_BYTES and exit')
+    arg_parser.add_argument('--max-age-days', type=float, default=None,
+                            help='with --prune-torrent-cache: also drop torrents not used for this many days')
+    arg_parser.add_argument('--export-cache', action='store_true',
+                            help='write the SQLite page cache back to CACHE_FILE (JSON) and exit')
+    arg_parser.add_argument('--restore-backup', metavar='BACKUP_FILE',
+                            help='rebuild the full JSON of a backup (full copy or delta) from BACKUP_DIR and exit')
+    arg_parser.add_argument('--output', default=None,
+                            help='with --restore-backup: where to write the rebuilt file (default: <backup>.restored.json in the current directory)')
+    arg_parser.add_argument('--resume', action='store_true',
+                            help='continue an interrupted run from its last checkpoint (see CHECKPOINT_INTERVAL); '
+                                 'with --shards: continue the unfinished shards in SHARDS_DIR')
+    arg_parser.add_argument('--rebuild', action='store_true',
+                            help='rewrite DATA_FILE from the page cache without network requests and exit')
+    arg_parser.add_argument('--shards', type=int, default=0, metavar='N',
+                            help='split the sitemap into N shards by URL hash, crawl them in a process pool and merge the results')
+    arg_parser.add_argument('--shard', type=int, default=None, metavar='K',
+                            help='with --shards: crawl only shard K (0..N-1) into SHARDS_DIR, e.g. on a separate runner')
+    arg_parser.add_argument('--merge-shards', action='store_true',
+                            help='with --shards: merge finished shards from SHARDS_DIR into DATA_FILE and the caches')
+    arg_parser.add_argument('--processes', type=int, default=None,
+                            help='with --shards: size of the process pool (default: one process per shard)')
+    return arg_parser.parse_args()
+
+
+def parser_kwargs(**overrides):
+    return dict(
         site_name=config.SITE_NAME,
         log_file=config.LOG_FILE,
         data_file=config.DATA_FILE,
@@ -12,25 +49,143 @@ def main():
         cache_dir=config.CACHE_DIR,
         cache_file=config.CACHE_FILE,
         sitemap_url=config.SITEMAP_URL,
+        sitemap_concurrency=config.SITEMAP_CONCURRENCY,
         test_problem_urls=config.test_problem_urls,
-        problem_urls=config.problem_urls
-    )
+        problem_urls=config.problem_urls,
+        concurrency=config.CONCURRENCY,
+        rate_limit=config.RATE_LIMIT,
+        pipeline=config.PIPELINE,
+        pipeline_queue_size=config.PIPELINE_QUEUE_SIZE,
+        incremental=config.INCREMENTAL,
+        recrawl_max_interval=config.RECRAWL_MAX_INTERVAL,
+        recrawl_budget=config.RECRAWL_BUDGET,
+        negative_cache_ttl=config.NEGATIVE_CACHE_TTL,
+        negative_cache_max_ttl=config.NEGATIVE_CACHE_MAX_TTL,
+        json_indent=config.JSON_INDENT,
+        translation_batch_size=config.TRANSLATION_BATCH_SIZE,
+        translate_endpoint=config.TRANSLATE_ENDPOINT,
+        torrent_cache_max_bytes=config.TORRENT_CACHE_MAX_BYTES,
+        html_parser=config.HTML_PARSER,
+        cpu_workers=config.CPU_WORKERS,
+        connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+        read_timeout=config.HTTP_READ_TIMEOUT,
+        retries=config.HTTP_RETRIES,
+        retry_backoff=config.HTTP_RETRY_BACKOFF,
+        breaker_threshold=config.CIRCUIT_BREAKER_THRESHOLD,
+        breaker_cooldown=config.CIRCUIT_BREAKER_COOLDOWN,
+        checkpoint_interval=config.CHECKPOINT_INTERVAL,
+        cache_backend=config.CACHE_BACKEND,
+        deduplicate=config.DEDUPLICATE_DOWNLOADS,
+        delta_output=config.DELTA_OUTPUT,
+        backup_mode=config.BACKUP_MODE,
+        full_snapshot_every=config.FULL_SNAPSHOT_EVERY
+    ) | overrides
+
 
-    urls = parser.get_urls_from_sitemap(config.SITEMAP_URL)
-    # urls = urls[:200]  # 200 перших URL для тестування
+def create_parser(**overrides):
+    return IgruhaParser(**parser_kwargs(**overrides))
+
+
+def run_shards(args):
+    parser = create_parser()
+
+    if args.merge_shards:
+        parser.merge_shards([shard_dir(config.SHARDS_DIR, shard) for shard in range(args.shards)])
+        parser.print_stats()
+        return
 
-    if not urls:
-        print("Failed to get URL from sitemap.xml")
+    if args.shard is not None:
+        kwargs = shard_kwargs(parser_kwargs(), config.SHARDS_DIR, args.shard)
+        if not args.resume:
+            urls = parser.get_urls_from_sitemap(config.SITEMAP_URL)
+            if not urls:
+                print("Failed to get URL from sitemap.xml")
+                sys.exit(1)
+            prepare_shard(parser, kwargs, split_urls(urls, args.shards)[args.shard])
+        count = run_shard(kwargs, resume=args.resume)
+        print(f"Shard {args.shard}/{args.shards} done: {count} URLs in {shard_dir(config.SHARDS_DIR, args.shard)}")
         return
-        # urls = parser.get_urls_from_cache()
 
-    if config.test_problem_urls:
-        urls = config.problem_urls
+    # --resume: продовжуються шарди, вже підготовлені в SHARDS_DIR, - sitemap не читається і каталоги не створюються заново
+    urls = None
+    if not args.resume:
+        urls = parser.get_urls_from_sitemap(config.SITEMAP_URL)
+        if not urls:
+            print("Failed to get URL from sitemap.xml")
+            sys.exit(1)
+
+    # Шарди на одній машині звертаються до того ж хоста одночасно - ліміт запитів ділиться між ними
+    rate_limit = config.RATE_LIMIT / args.shards if config.RATE_LIMIT else config.RATE_LIMIT
+    run_local_shards(parser, parser_kwargs(rate_limit=rate_limit), urls, args.shards, config.SHARDS_DIR,
+                     processes=args.processes, resume=args.resume)
+    parser.print_stats()
+
+
+def prune_torrent_cache(max_age_days=None):
+    torrent_cache = TorrentCache(os.path.join(config.CACHE_DIR, 'torrent_cache.json'), max_bytes=config.TORRENT_CACHE_MAX_BYTES)
+    before = len(torrent_cache)
+    removed = torrent_cache.prune(max_age_days=max_age_days)
+    torrent_cache.save()
+    print(f"Torrent cache pruned: {removed} of {before} entries removed")
+
+
+def export_cache():
+    store = open_cache_store('sqlite', config.CACHE_FILE)
+    count = export_json_cache(store, config.CACHE_FILE)
+    store.close()
+    print(f"Exported {count} cache entries from {store.path} to {config.CACHE_FILE}")
+
+
+def main():
+    # Зібраний PyInstaller'ом exe (main.spec) інакше запускає main() заново в кожному процесі пулу (шарди, CPU_WORKERS)
+    multiprocessing.freeze_support()
+    args = parse_args()
+
+    if args.prune_torrent_cache:
+        prune_torrent_cache(args.max_age_days)
+        return
+
+    if args.export_cache:
+        export_cache()
+        return
+
+    if args.restore_backup:
+        # Не в BACKUP_DIR: там файл вважався б повною копією і базою наступних дельт
+        output_file = args.output or f'{os.path.basename(args.restore_backup).removesuffix(".json")}.restored.json'
+        count = restore_backup(args.restore_backup, output_file)
+        print(f"Restored {count} downloads from {args.restore_backup} to {output_file}")
+        return
+
+    if args.rebuild:
+        parser = create_parser()
+        parser.rebuild_from_cache()
+        return
+
+    if args.shards and not config.test_problem_urls:
+        run_shards(args)
+        return
+
+    parser = create_parser()
+
+    if args.resume and not config.test_problem_urls:
+        # Список URL береться з контрольної точки; якщо її немає, run() почне новий запуск з sitemap
+        if not parser.run(resume=True):
+            sys.exit(1)
+        parser.print_stats()
+        return
+
+    # urls=None - URL з sitemap обробляються по мірі його завантаження; якщо sitemap порожній або прочитаний
+    # не повністю, run() повертає False - ненульовий код виходу зупиняє workflow до коміту
+    urls = config.problem_urls if config.test_problem_urls else None
+    # urls = itertools.islice(parser.iter_sitemap_urls(config.SITEMAP_URL), 200)  # 200 перших URL для тестування
+
+    if not parser.run(urls=urls):
+        sys.exit(1)
+        # urls = list(parser.get_urls_from_cache())
 
-    parser.run(urls=urls)
     parser.print_stats()
 
 
 if __name__ == "__main__":
     main()
-    # input("Press Enter to exit...")
\ No newline at end of file
+    # input("Press Enter to exit...")
@@ -0,0 +1,118 @@
+# Негативний кеш (utils/negative_cache.py) не повинен запам'ятовувати тимчасові збої: недоступний хост торрентів
+# або сторінку перевірки замість сторінки гри. Прогони йдуть на синтетичному сайті з benchmarks/site_fixture.py.
+#
+# Запуск з кореня репозиторію:
+#   python -m unittest discover tests
+
+import os
+import tempfile
+import unittest
+
+import requests
+
+from benchmarks.common import make_parser
+from benchmarks.site_fixture import ReplayAdapter, SyntheticSite, resource_kind, start_translation_stub
+
+
+NEGATIVE_CACHE_TTL = {"INVALID_PAGE": 24, "NO_DOWNLOAD_OPTIONS": 12, "DEAD_TORRENT": 72}
+CHALLENGE_PAGE = '<html><head><title>Just a moment...</title></head><body>Checking your browser</body></html>'
+
+
+class TorrentHostAdapter(ReplayAdapter):
+    # Поки down=True, запити .torrent файлів падають з помилкою з'єднання
+
+    def __init__(self, site):
+        super().__init__(site)
+        self.down = False
+
+
+    def send(self, request, **kwargs):
+        if self.down and resource_kind(request.url) == 'torrent_fetch':
+            raise requests.ConnectionError('Torrent host is down (test)', request=request)
+        return super().send(request, **kwargs)
+
+
+class NegativeCacheTransientFailureTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.translate_endpoint = start_translation_stub()
+
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.site = SyntheticSite(pages=60, seed=1)
+        self.adapter = TorrentHostAdapter(self.site)
+
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+
+    def crawl(self, name, pipeline='threads'):
+        parser = make_parser(os.path.join(self.temp_dir.name, name), rate_limit=None, incremental=True,
+                             translate_endpoint=self.translate_endpoint, pipeline=pipeline, retries=0,
+                             breaker_threshold=10 ** 6, negative_cache_ttl=NEGATIVE_CACHE_TTL)
+        parser.scraper.mount('https://', self.adapter)
+        parser.scraper.mount('http://', self.adapter)
+        self.assertTrue(parser.run())
+        return parser
+
+
+    def output(self, name):
+        with open(os.path.join(self.temp_dir.name, name, 'igruha-hydra-links.json'), 'rb') as f:
+            return f.read()
+
+
+    def negative_reasons(self, parser):
+        return {key: entry["reason"] for key, entry in parser.negative_cache._entries.items()}
+
+
+    def check_torrent_host_recovery(self, pipeline):
+        self.crawl('expected', pipeline)
+
+        self.adapter.down = True
+        parser = self.crawl('run', pipeline)
+        # NO_DOWNLOAD_OPTIONS - лише сторінки, на яких торрентів справді немає
+        empty_pages = {url for url, game in self.site.games.items() if game["kind"] == 'empty'}
+        reasons = self.negative_reasons(parser)
+        self.assertEqual({key for key, reason in reasons.items() if reason == "NO_DOWNLOAD_OPTIONS"}, empty_pages)
+        self.assertNotIn("DEAD_TORRENT", reasons.values())
+
+        # Хост знову доступний, sitemap не змінився: сторінки без варіантів перевіряються заново,
+        # і негативний кеш економить не більше запитів, ніж у повторному запуску без збою
+        self.adapter.down = False
+        parser = self.crawl('run', pipeline)
+        expected = self.crawl('expected', pipeline)
+        self.assertEqual(parser.stats["negative_cache_saved_requests"], expected.stats["negative_cache_saved_requests"])
+        self.assertEqual(self.output('run'), self.output('expected'))
+
+
+    def test_torrent_host_recovery_threads(self):
+        self.check_torrent_host_recovery('threads')
+
+
+    def test_torrent_host_recovery_async(self):
+        self.check_torrent_host_recovery('async')
+
+
+    def test_challenge_page_is_not_invalid_page(self):
+        self.crawl('expected')
+
+        game_url = next(url for url, game in self.site.games.items() if game["kind"] == 'game')
+        invalid_url = next(url for url, game in self.site.games.items() if game["kind"] == 'invalid')
+        original = self.site.responses[game_url]
+        self.site.add(game_url, CHALLENGE_PAGE, 'text/html')
+        parser = self.crawl('run')
+        reasons = self.negative_reasons(parser)
+        self.assertNotIn(game_url, reasons)
+        # Справжня сторінка сайту без гри кешується, як і раніше
+        self.assertEqual(reasons.get(invalid_url), "INVALID_PAGE")
+
+        self.site.responses[game_url] = original
+        self.crawl('run')
+        self.assertEqual(self.output('run'), self.output('expected'))
+
+
+if __name__ == '__main__':
+    unittest.main()
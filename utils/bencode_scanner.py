@@ -0,0 +1,238 @@
+import base64
+import hashlib
+from datetime import datetime
+from urllib.parse import quote
+
+
+# Швидкий розбір .torrent без побудови повного дерева об'єктів.
+# Сканер знаходить сирі байти словника info і хешує їх напряму через memoryview,
+# а з метаданих витягує лише name, length/files, announce/announce-list і creation date.
+#
+# Старий код (bencodepy.decode + bencodepy.encode) хешує не сирі байти, а повторно закодований info.
+# Результати збігаються, якщо info записано канонічно (числа без ведучих нулів, довжини рядків без
+# ведучих нулів, без повторюваних ключів). Для всіх інших випадків сканер кидає BencodeFallback,
+# і виклик має перейти на повний розбір через bencodepy, щоб магнет-посилання не змінились.
+
+
+class BencodeFallback(ValueError):
+    pass
+
+
+_DIGITS = frozenset(b'0123456789')
+_INT = ord('i')
+_LIST = ord('l')
+_DICT = ord('d')
+_END = ord('e')
+
+
+def _read_int(data, pos):
+    end = data.index(b'e', pos)
+    text = data[pos + 1:end]
+    digits = text[1:] if text[:1] == b'-' else text
+    if not digits.isdigit() or (digits[0] == 0x30 and (len(digits) > 1 or digits is not text)):
+        raise BencodeFallback(f'non-canonical integer at {pos}')
+    return int(text), end + 1
+
+
+def _read_bytes_span(data, pos):
+    colon = data.index(b':', pos)
+    length_text = data[pos:colon]
+    if not length_text.isdigit() or (length_text[0] == 0x30 and len(length_text) > 1):
+        raise BencodeFallback(f'non-canonical string length at {pos}')
+    start = colon + 1
+    end = start + int(length_text)
+    if end > len(data):
+        raise BencodeFallback(f'truncated string at {pos}')
+    return start, end
+
+
+def _skip(data, pos):
+    # Повертає позицію одразу після значення, яке починається з pos
+    c = data[pos]
+    if c in _DIGITS:
+        return _read_bytes_span(data, pos)[1]
+    if c == _INT:
+        return _read_int(data, pos)[1]
+    if c == _LIST:
+        pos += 1
+        while data[pos] != _END:
+            pos = _skip(data, pos)
+        return pos + 1
+    if c == _DICT:
+        pos += 1
+        previous_key = None
+        while data[pos] != _END:
+            key_start, key_end = _read_bytes_span(data, pos)
+            key = data[key_start:key_end]
+            # Невпорядковані ключі можуть приховувати дублікати, які bencodepy склеїть
+            if previous_key is not None and key <= previous_key:
+                raise BencodeFallback(f'unsorted dictionary keys at {pos}')
+            previous_key = key
+            pos = _skip(data, key_end)
+        return pos + 1
+    raise BencodeFallback(f'unexpected byte {c!r} at {pos}')
+
+
+def _decode(data, pos):
+    # Повне декодування невеликих значень (announce-list)
+    c = data[pos]
+    if c in _DIGITS:
+        start, end = _read_bytes_span(data, pos)
+        return data[start:end], end
+    if c == _INT:
+        return _read_int(data, pos)
+    if c == _LIST:
+        pos += 1
+        items = []
+        while data[pos] != _END:
+            item, pos = _decode(data, pos)
+            items.append(item)
+        return items, pos + 1
+    raise BencodeFallback(f'unexpected value at {pos}')
+
+
+def _iter_dict(data, pos):
+    # Ітерує (ключ, позиція значення) словника з pos; позицію після значення повідомляють через send()
+    if data[pos] != _DICT:
+        raise BencodeFallback(f'dictionary expected at {pos}')
+    pos += 1
+    previous_key = None
+    while data[pos] != _END:
+        key_start, key_end = _read_bytes_span(data, pos)
+        key = data[key_start:key_end]
+        if previous_key is not None and key <= previous_key:
+            raise BencodeFallback(f'unsorted dictionary keys at {pos}')
+        previous_key = key
+        pos = yield key, key_end
+    yield None, pos + 1
+
+
+def _scan_files(data, pos, lengths):
+    if data[pos] != _LIST:
+        raise BencodeFallback(f'files list expected at {pos}')
+    pos += 1
+    while data[pos] != _END:
+        length = None
+        entries = _iter_dict(data, pos)
+        key, value_pos = next(entries)
+        while key is not None:
+            if key == b'length':
+                if data[value_pos] != _INT:
+                    raise BencodeFallback(f'non-integer file length at {value_pos}')
+                length, end = _read_int(data, value_pos)
+            else:
+                end = _skip(data, value_pos)
+            key, value_pos = entries.send(end)
+        if length is None:
+            raise BencodeFallback(f'file without length at {pos}')
+        lengths.append(length)
+        pos = value_pos
+    return pos + 1
+
+
+def _scan_info(data, pos, torrent):
+    entries = _iter_dict(data, pos)
+    key, value_pos = next(entries)
+    while key is not None:
+        if key == b'name':
+            if data[value_pos] not in _DIGITS:
+                raise BencodeFallback('non-string name')
+            start, end = _read_bytes_span(data, value_pos)
+            torrent['name'] = data[start:end]
+        elif key == b'length':
+            if data[value_pos] != _INT:
+                raise BencodeFallback('non-integer length')
+            torrent['length'], end = _read_int(data, value_pos)
+        elif key == b'files':
+            torrent['files'] = []
+            end = _scan_files(data, value_pos, torrent['files'])
+        else:
+            end = _skip(data, value_pos)
+        key, value_pos = entries.send(end)
+    return value_pos
+
+
+# MARK: scan_torrent
+def scan_torrent(torrent_bytes):
+    # Повертає словник з info_hash (SHA-1), name, length, files (список довжин), announce,
+    # announce_list і creation_date. Відсутні поля мають значення None.
+    data = bytes(torrent_bytes)
+    torrent = {
+        'info_hash': None,
+        'name': None,
+        'length': None,
+        'files': None,
+        'announce': None,
+        'announce_list': None,
+        'creation_date': None
+    }
+
+    seen_keys = set()
+    entries = _iter_dict_unordered(data)
+    key, value_pos = next(entries)
+    while key is not None:
+        if key in seen_keys:
+            raise BencodeFallback(f'duplicate key {key!r}')
+        seen_keys.add(key)
+
+        if key == b'info':
+            end = _scan_info(data, value_pos, torrent)
+            torrent['info_hash'] = hashlib.sha1(memoryview(data)[value_pos:end]).digest()
+        elif key == b'announce':
+            if data[value_pos] not in _DIGITS:
+                raise BencodeFallback('non-string announce')
+            start, end = _read_bytes_span(data, value_pos)
+            torrent['announce'] = data[start:end]
+        elif key == b'announce-list':
+            torrent['announce_list'], end = _decode(data, value_pos)
+        elif key == b'creation date':
+            if data[value_pos] != _INT:
+                raise BencodeFallback('non-integer creation date')
+            torrent['creation_date'], end = _read_int(data, value_pos)
+        else:
+            end = _skip(data, value_pos)
+        key, value_pos = entries.send(end)
+
+    if torrent['info_hash'] is None or torrent['name'] is None:
+        raise BencodeFallback('info or name is missing')
+
+    return torrent
+
+
+def _iter_dict_unordered(data):
+    # Верхній рівень може мати ключі в довільному порядку: він не хешується, дублікати перевіряє scan_torrent
+    if not data or data[0] != _DICT:
+        raise BencodeFallback('torrent must be a dictionary')
+    pos = 1
+    while data[pos] != _END:
+        key_start, key_end = _read_bytes_span(data, pos)
+        pos = yield data[key_start:key_end], key_end
+    yield None, pos + 1
+
+
+# MARK: torrent_to_magnet
+def torrent_to_magnet(torrent_bytes):
+    # Те саме, що IgruhaParser._torrent_to_magnet_bencodepy: (магнет-посилання, дата створення, розмір у байтах)
+    torrent = scan_torrent(torrent_bytes)
+
+    b32hash = base64.b32encode(torrent['info_hash']).decode()
+    name = quote(torrent['name'].decode())  # URL encode the name
+
+    total_length = 0
+    if torrent['length'] is not None:
+        total_length = torrent['length']
+    elif torrent['files'] is not None:
+        total_length = sum(torrent['files'])
+
+    magnet_link = f'magnet:?xt=urn:btih:{b32hash}&dn={name}'
+
+    if torrent['announce'] is not None:
+        magnet_link += f'&tr={torrent["announce"].decode()}'
+
+    magnet_link += f'&xl={total_length}'
+
+    formatted_date = None
+    if torrent['creation_date'] is not None:
+        formatted_date = datetime.fromtimestamp(torrent['creation_date']).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    return magnet_link, formatted_date, total_length
@@ -0,0 +1,229 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from utils.records import pack_entry, pack_json_object, unpack_entry
+
+
+# Сховища кешу сторінок (url -> {"site_game_name", "site_update_date", "download_options", ...}).
+# JSONCacheStore - як і раніше, увесь parser_cache.json у пам'яті (у компактних записах utils/records.py)
+# і повний перезапис при збереженні.
+# SQLiteCacheStore - записи читаються і оновлюються по одному, у пам'яті нічого не накопичується.
+# Обидва мають однаковий інтерфейс: get, set, update, urls, __contains__, __len__, save, close.
+
+
+class JSONCacheStore:
+
+    def __init__(self, cache_file):
+        self.cache_file = self.path = cache_file
+        self._entries = {}
+        if os.path.exists(self.cache_file):
+            with open(self.cache_file, 'r', encoding='utf-8') as file:
+                self._entries = json.load(file, object_hook=pack_json_object)
+
+
+    def __contains__(self, url):
+        return url in self._entries
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def get(self, url):
+        # Кожен виклик повертає новий dict, тому зміни в ньому не потрапляють у кеш без set()
+        return unpack_entry(self._entries.get(url))
+
+
+    def set(self, url, entry):
+        self._entries[url] = pack_entry(entry)
+
+
+    def update(self, url, fields):
+        # Оновлює поля наявного запису; для відсутнього URL нічого не робить
+        if url in self._entries:
+            entry = unpack_entry(self._entries[url])
+            entry.update(fields)
+            self._entries[url] = pack_entry(entry)
+
+
+    def urls(self):
+        yield from list(self._entries)
+
+
+    def items(self):
+        for url, record in list(self._entries.items()):
+            yield url, unpack_entry(record)
+
+
+    def save(self):
+        export_json_cache(self, self.cache_file)
+
+
+    def close(self):
+        pass
+
+
+class SQLiteCacheStore:
+    # Таблиця pages з первинним ключем url та індексом за site_update_date.
+    # WAL: читання з потоків-воркерів (кожен потік має власне з'єднання) не блокуються записом.
+    # Усі записи йдуть через одне з'єднання і комітяться пакетами по commit_every і в save().
+    # Порядок записів (rowid) зберігається, тому експорт у JSON збігається з тим, що записав би JSONCacheStore.
+
+    def __init__(self, db_file, commit_every=500):
+        self.db_file = self.path = db_file
+        self.commit_every = commit_every
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._uncommitted = 0
+
+        os.makedirs(os.path.dirname(self.db_file) or '.', exist_ok=True)
+        self._writer = self._connect()
+        self._writer.execute('PRAGMA journal_mode=WAL')
+        self._writer.execute('''CREATE TABLE IF NOT EXISTS pages (
+                                  url TEXT PRIMARY KEY,
+                                  site_update_date TEXT,
+                                  entry TEXT NOT NULL
+                              )''')
+        self._writer.execute('CREATE INDEX IF NOT EXISTS pages_site_update_date ON pages (site_update_date)')
+        self._writer.commit()
+
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_file, timeout=30, check_same_thread=False)
+        connection.execute('PRAGMA synchronous=NORMAL')  # у режимі WAL цілісність зберігається і так
+        return connection
+
+
+    def _connection(self):
+        # З'єднання для читання в поточному потоці
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+
+    def __contains__(self, url):
+        return self._connection().execute('SELECT 1 FROM pages WHERE url = ?', (url,)).fetchone() is not None
+
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM pages').fetchone()[0]
+
+
+    def get(self, url):
+        row = self._connection().execute('SELECT entry FROM pages WHERE url = ?', (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+    def set(self, url, entry):
+        with self._write_lock:
+            self._writer.execute(
+                '''INSERT INTO pages (url, site_update_date, entry) VALUES (?, ?, ?)
+                   ON CONFLICT(url) DO UPDATE SET site_update_date = excluded.site_update_date, entry = excluded.entry''',
+                (url, entry.get("site_update_date"), json.dumps(entry, ensure_ascii=False)))
+            self._written()
+
+
+    def update(self, url, fields):
+        with self._write_lock:
+            # Читання через те саме з'єднання, щоб бачити ще не закомічені записи
+            row = self._writer.execute('SELECT entry FROM pages WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return
+            entry = json.loads(row[0])
+            entry.update(fields)
+            self._writer.execute('UPDATE pages SET entry = ? WHERE url = ?', (json.dumps(entry, ensure_ascii=False), url))
+            self._written()
+
+
+    def _written(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self.commit_every:
+            self._writer.commit()
+            self._uncommitted = 0
+
+
+    def urls(self):
+        # Окреме з'єднання: курсор читає таблицю частинами, поки в неї пишуть інші з'єднання
+        connection = sqlite3.connect(self.db_file)
+        try:
+            for (url,) in connection.execute('SELECT url FROM pages ORDER BY rowid'):
+                yield url
+        finally:
+            connection.close()
+
+
+    def items(self):
+        connection = sqlite3.connect(self.db_file)
+        try:
+            for url, entry in connection.execute('SELECT url, entry FROM pages ORDER BY rowid'):
+                yield url, json.loads(entry)
+        finally:
+            connection.close()
+
+
+    def save(self):
+        with self._write_lock:
+            self._writer.commit()
+            self._uncommitted = 0
+
+
+    def close(self):
+        self.save()
+        self._writer.close()
+
+
+# MARK: import_json_cache
+def import_json_cache(store, cache_file):
+    # Одноразова міграція parser_cache.json у сховище (записи додаються в тому ж порядку)
+    source = JSONCacheStore(cache_file)
+    for url, entry in source.items():
+        store.set(url, entry)
+    store.save()
+    return len(source)
+
+
+# MARK: export_json_cache
+def export_json_cache(store, cache_file):
+    # Записує сховище у формат parser_cache.json потоково, запис за записом.
+    # Результат байт-у-байт збігається з json.dump(cache, f, ensure_ascii=False, indent=4).
+    os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)  # Create the directory if it doesn't exist
+    temp_file = f'{cache_file}.tmp'
+    count = 0
+    with open(temp_file, 'w', encoding='utf-8') as file:
+        file.write('{')
+        for url, entry in store.items():
+            text = json.dumps(entry, ensure_ascii=False, indent=4).replace('\n', '\n    ')
+            file.write(f'{"," if count else ""}\n    {json.dumps(url, ensure_ascii=False)}: {text}')
+            count += 1
+        file.write('\n}' if count else '}')
+    os.replace(temp_file, cache_file)
+    return count
+
+
+# MARK: open_cache_store
+def open_cache_store(backend, cache_file):
+    # backend: "json" - cache_file як є; "sqlite" - база поруч з cache_file (parser_cache.sqlite3).
+    # Якщо бази ще немає, а JSON-кеш є, він переноситься в базу.
+    if backend == 'json':
+        return JSONCacheStore(cache_file)
+    if backend != 'sqlite':
+        raise ValueError(f'Unknown cache backend: {backend}')
+
+    db_file = f'{os.path.splitext(cache_file)[0]}.sqlite3'
+    if not os.path.exists(db_file) and os.path.exists(cache_file):
+        # Міграція у тимчасову базу, щоб перерваний перенос не залишив неповну базу
+        temp_file = f'{db_file}.tmp'
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        store = SQLiteCacheStore(temp_file)
+        count = import_json_cache(store, cache_file)
+        store.close()
+        os.replace(temp_file, db_file)
+        print(f"Migrated {count} cache entries from {cache_file} to {db_file}")
+        logging.info(f"Migrated {count} cache entries from {cache_file} to {db_file}")
+
+    return SQLiteCacheStore(db_file)
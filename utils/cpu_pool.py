@@ -0,0 +1,115 @@
+import logging
+import time
+from contextlib import contextmanager
+
+
+# Пул процесів для CPU-етапів обробки: розбір HTML сторінки гри і сторінки завантаження,
+# перетворення .torrent у магнет-посилання. У потоках ці етапи виконуються по черзі через GIL.
+# Воркеру передаються сирі байти відповіді, а повертаються лише результати розбору - кеші, stats
+# і вихідний файл залишаються в процесі парсера.
+#
+# Воркер виконує ті самі методи IgruhaParser (_parse_game_page, _extract_torrent_url, _torrent_to_magnet)
+# на екземплярі без кешів, логу і мережі, тому результат збігається з обробкою в потоках.
+# Записи логу і метрики воркера повертаються разом з результатом і відтворюються в процесі парсера.
+
+_parser = None
+_records = []
+
+
+class _RecordBuffer(logging.Handler):
+    # Записи логу поточної задачі воркера
+
+    def emit(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        _records.append(record)
+
+
+class _MetricsRecorder:
+    # Замість Metrics у воркері: запам'ятовує виклики, щоб повторити їх на Metrics парсера
+
+    def __init__(self):
+        self.events = []
+
+
+    @contextmanager
+    def timer(self, name, label=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.events.append(('observe', (name, time.perf_counter() - started, label), {}))
+
+
+    def observe(self, name, seconds, label=None):
+        self.events.append(('observe', (name, seconds, label), {}))
+
+
+    def inc(self, name, value=1, **labels):
+        self.events.append(('inc', (name, value), labels))
+
+
+def _init_worker(html_parser):
+    global _parser
+    from igruha_parser import IgruhaParser
+
+    root = logging.getLogger()
+    root.handlers[:] = [_RecordBuffer()]
+    root.setLevel(logging.INFO)
+
+    # Лише методи розбору: __init__ не викликається, тому кеші, лог-файл і сесія не відкриваються
+    _parser = IgruhaParser.__new__(IgruhaParser)
+    _parser.html_parser = html_parser
+    _parser.cpu_workers = 0
+
+
+def _decode(content, encoding):
+    # Той самий текст, що й response.text у процесі парсера (зокрема визначення кодування, якщо його немає)
+    import requests
+
+    response = requests.Response()
+    response._content = content
+    response.encoding = encoding
+    return response.text
+
+
+def _run_task(task, args):
+    _records.clear()
+    _parser.metrics = _MetricsRecorder()
+
+    if task == 'parse_game_page':
+        result = _parser._parse_game_page(_decode(*args))
+    elif task == 'extract_torrent_url':
+        result = _parser._extract_torrent_url(_decode(*args))
+    else:
+        result = _parser._torrent_to_magnet(*args)
+    return result, _parser.metrics.events, list(_records)
+
+
+class CPUPool:
+
+    def __init__(self, workers, html_parser='fast'):
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+
+        self.workers = workers
+        # spawn: воркери не успадковують потоки, сесію і обробники логу процесу парсера
+        context = multiprocessing.get_context('spawn')
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                            initializer=_init_worker, initargs=(html_parser,))
+
+
+    # MARK: call
+    def call(self, metrics, task, *args):
+        # Виконує задачу у воркері (блокує потік, що викликав) і повторює її записи логу і метрики тут
+        result, events, records = self.executor.submit(_run_task, task, args).result()
+        for method, method_args, labels in events:
+            getattr(metrics, method)(*method_args, **labels)
+        for record in records:
+            logging.getLogger(record.name).handle(record)
+        return result
+
+
+    def close(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,223 @@
+import difflib
+import hashlib
+import json
+import os
+import shutil
+
+from utils.download_index import download_btih
+from utils.json_writer import StreamingJSONWriter
+
+
+# Різниця між двома вихідними файлами {"name": ..., "downloads": [...]}.
+# Записи зіставляються за info-hash магнет-посилання (btih); якщо той самий хеш трапляється кілька разів,
+# наступні входження мають ключі "<btih>#2", "<btih>#3", ...
+#
+# Формат дельти:
+#   {"name": ..., "indent": 4, "base": ім'я файлу бази або null,
+#    "added": [ключі], "updated": [ключі], "removed": [ключі],
+#    "entries": {ключ: запис} - лише нові та змінені записи,
+#    "order": [[початок, кінець] - відрізок ключів бази | [ключ, ...] - ключі з entries, ...]}
+# З бази і дельти файл відновлюється байт-у-байт (apply_delta + write_downloads).
+#
+# Для дельти потрібен лише індекс файлу - [(ключ, SHA-1 запису)]. Його будує OutputIndex під час запису
+# (StreamingJSONWriter(index=...)) і зберігає поруч із файлом (<файл>.index); без збереженого індексу
+# файл читається потоково, по одному запису (iter_downloads), а не завантажується цілим.
+
+INDEX_SUFFIX = '.index'
+READ_CHUNK_SIZE = 1 << 20
+
+
+def download_keys(downloads):
+    occurrences = {}
+    for download in downloads:
+        yield _download_key(occurrences, download)
+
+
+def _download_key(occurrences, download):
+    key = download_btih(download)
+    occurrences[key] = occurrences.get(key, 0) + 1
+    return key if occurrences[key] == 1 else f'{key}#{occurrences[key]}'
+
+
+def entry_digest(entry):
+    return hashlib.sha1(json.dumps(entry, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class OutputIndex:
+    # [(ключ, SHA-1 запису)] - достатньо, щоб порахувати дельту, не тримаючи в пам'яті самі записи
+
+    def __init__(self):
+        self.entries = []
+        self._occurrences = {}
+
+
+    def add(self, download):
+        self.entries.append((_download_key(self._occurrences, download), entry_digest(download)))
+
+
+def load_output(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# MARK: iter_downloads
+def iter_downloads(path):
+    # Записи "downloads" вихідного файлу (з відступами або компактного) по одному, без читання всього файлу
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, position = '', 0
+
+        def read_more():
+            nonlocal buffer, position
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise ValueError(f'Unexpected end of {path}')
+            buffer, position = buffer[position:] + chunk, 0
+
+        def skip(separators):
+            # Пропускає пробіли і символи separators, повертає наступний символ
+            nonlocal position
+            while True:
+                while position < len(buffer) and (buffer[position].isspace() or buffer[position] in separators):
+                    position += 1
+                if position < len(buffer):
+                    return buffer[position]
+                read_more()
+
+        def decode():
+            # Обрізаний в кінці буфера об'єкт чи рядок не розбирається - тоді дочитуємо файл
+            nonlocal position
+            while True:
+                try:
+                    item, position = decoder.raw_decode(buffer, position)
+                    return item
+                except json.JSONDecodeError:
+                    read_more()
+
+        skip('{')
+        while decode() != 'downloads':
+            skip(':')
+            decode()
+            skip(',')
+        skip(':')
+        skip('[')
+        while skip(',') != ']':
+            yield decode()
+
+
+def index_file(path):
+    index = OutputIndex()
+    for download in iter_downloads(path):
+        index.add(download)
+    return index.entries
+
+
+def _file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_index(path, index):
+    # Індекс файлу path у <path>.index; SHA-1 самого файлу відрізняє індекс від застарілого
+    # (час зміни для цього не годиться: git checkout його змінює)
+    write_delta(f'{path}{INDEX_SUFFIX}', {"size": os.path.getsize(path), "sha1": _file_digest(path), "index": index})
+
+
+def load_index(path):
+    # Збережений індекс файлу path, а якщо його немає або файл змінився - індекс, побудований потоковим читанням
+    index_path = f'{path}{INDEX_SUFFIX}'
+    if os.path.exists(index_path):
+        saved = load_output(index_path)
+        if saved["size"] == os.path.getsize(path) and saved["sha1"] == _file_digest(path):
+            return [tuple(item) for item in saved["index"]]
+    return index_file(path)
+
+
+# MARK: compute_delta
+def compute_delta(base_index, output_index, name, output_file, base=None, indent=4):
+    # output_index - індекс файлу output_file; із самого файлу потоково читаються лише нові та змінені записи
+    keys = [key for key, _ in output_index]
+    base_keys = [key for key, _ in base_index]
+    base_digests = dict(base_index)
+    new_keys = set(keys)
+
+    added = [key for key in keys if key not in base_digests]
+    updated = [key for key, digest in output_index
+               if key in base_digests and base_digests[key] != digest]
+    removed = [key for key in base_keys if key not in new_keys]
+    changed = set(added) | set(updated)
+
+    order = []
+    matcher = difflib.SequenceMatcher(None, base_keys, keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            order.append([i1, i2])
+        elif tag in ('replace', 'insert'):
+            order.append(keys[j1:j2])
+
+    entries = {}
+    if changed:
+        for key, download in zip(keys, iter_downloads(output_file)):
+            if key in changed:
+                entries[key] = download
+
+    return {
+        "name": name,
+        "indent": indent,
+        "base": base,
+        "added": added,
+        "updated": updated,
+        "removed": removed,
+        "entries": entries,
+        "order": order
+    }
+
+
+# MARK: apply_delta
+def apply_delta(base_output, delta):
+    base_downloads = base_output["downloads"]
+    base_by_key = dict(zip(download_keys(base_downloads), base_downloads))
+    base_keys = list(base_by_key)
+
+    downloads = []
+    for item in delta["order"]:
+        if item and isinstance(item[0], int):
+            keys = base_keys[item[0]:item[1]]
+        else:
+            keys = item
+        for key in keys:
+            downloads.append(delta["entries"][key] if key in delta["entries"] else base_by_key[key])
+
+    return {"name": delta["name"], "downloads": downloads}
+
+
+def write_delta(path, delta):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_file = f'{path}.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as f:
+        json.dump(delta, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temp_file, path)
+
+
+def write_downloads(path, output, indent=4):
+    with StreamingJSONWriter(path, output["name"], indent=indent) as writer:
+        for download in output["downloads"]:
+            writer.write(download)
+
+
+# MARK: restore_backup
+def restore_backup(backup_file, output_file):
+    # Відновлює повний файл з резервної копії: повна копія копіюється як є,
+    # дельта застосовується до повної копії, вказаної в її полі "base" (у тій самій директорії)
+    backup = load_output(backup_file)
+    if "order" not in backup:
+        shutil.copyfile(backup_file, output_file)
+        return len(backup["downloads"])
+
+    base_output = load_output(os.path.join(os.path.dirname(backup_file), backup["base"]))
+    output = apply_delta(base_output, backup)
+    write_downloads(output_file, output, indent=backup["indent"])
+    return len(output["downloads"])
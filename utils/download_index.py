@@ -0,0 +1,57 @@
+import json
+import re
+
+
+# Індекс записів вихідного файлу за info-hash магнет-посилання (btih).
+# Той самий торрент може бути на кількох сторінках гри; у вихідний файл потрапляє лише перше входження
+# в порядку sitemap, наступні відкидаються і рахуються в duplicates.
+# Записи без btih не індексуються і не вважаються дублікатами.
+
+_BTIH_PATTERN = re.compile(r'xt=urn:btih:([^&]+)')
+
+
+def download_btih(download):
+    match = _BTIH_PATTERN.search(' '.join(download.get('uris') or []))
+    return match.group(1) if match else ''
+
+
+class DownloadIndex:
+
+    def __init__(self):
+        self._positions = {}  # btih -> позиція запису у вихідному файлі
+        self.count = 0
+        self.duplicates = 0
+
+
+    def __contains__(self, btih):
+        return btih in self._positions
+
+
+    def __len__(self):
+        return len(self._positions)
+
+
+    def get(self, btih):
+        return self._positions.get(btih)
+
+
+    def add(self, download):
+        # True - запис новий і має бути записаний, False - дублікат уже записаного
+        btih = download_btih(download)
+        if btih and btih in self._positions:
+            self.duplicates += 1
+            return False
+
+        if btih:
+            self._positions[btih] = self.count
+        self.count += 1
+        return True
+
+
+    def load_partial(self, path, offset):
+        # Відновлення після контрольної точки: індекс записів, вже записаних у тимчасовий файл StreamingJSONWriter
+        with open(path, 'rb') as file:
+            text = file.read(offset).decode('utf-8')
+        for download in json.loads(text + ']}')["downloads"]:
+            self.add(download)
+        self.duplicates = 0
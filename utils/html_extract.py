@@ -0,0 +1,212 @@
+from html.parser import HTMLParser
+
+
+# Швидке витягування потрібних даних зі сторінок без побудови дерева BeautifulSoup.
+# Сторінка проходиться один раз потоковим html.parser.HTMLParser, а результат відповідає
+# тому, що дають IgruhaParser._parse_date_title, _extract_torrent_links і _extract_torrent_url
+# на дереві BeautifulSoup(html, 'html.parser'), зокрема правилам вкладеності тегів bs4:
+# закриваючий тег закриває найближчий відкритий тег з тим самим ім'ям, а void-теги не мають вмісту.
+
+
+# Ті самі void-теги, що й у bs4 (HTMLTreeBuilder.empty_element_tags)
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem', 'meta',
+    'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex',
+    'nextid', 'spacer'
+])
+
+
+def _has_class(attrs, class_name):
+    return class_name in (attrs.get('class') or '').split()
+
+
+class _Element:
+    __slots__ = ('tag', 'attrs', 'capture', 'center_index', 'previous_center')
+
+    def __init__(self, tag, attrs):
+        self.tag = tag
+        self.attrs = attrs
+        self.capture = None       # список текстових вузлів елемента
+        self.center_index = None     # для <center>: індекс у GamePageExtractor._centers
+        self.previous_center = None  # для ul#navbartor: останній <center> перед ним (find_previous)
+
+
+class GamePageExtractor(HTMLParser):
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+
+        self.site_update_date = None
+        self.site_game_title = None
+        self.torrent2_href = None
+
+        self._article_info = None   # перший div#article-film-full-info
+        self._time_parts = None     # текст першого time.published всередині нього
+        self._module_title = None   # перший div.module-title
+        self._h1_parts = None       # текст першого h1 всередині нього
+
+        self._centers = []          # для кожного <center>: текстові вузли першого span[style="font-size:14pt;"]
+        self._last_center = None    # останній <center>, що зустрівся в документі
+        self._in_text = False       # чи продовжує наступний handle_data поточний текстовий вузол
+        self.links = []             # (href, індекс center або None)
+
+
+    # MARK: handle_starttag
+    def handle_starttag(self, tag, attrs):
+        self._in_text = False
+        attrs = {name: value if value is not None else '' for name, value in attrs}
+
+        if tag == 'a':
+            self._handle_link(attrs)
+        elif tag == 'center':
+            element = _Element(tag, attrs)
+            self._centers.append(None)
+            element.center_index = self._last_center = len(self._centers) - 1
+            self._push(element)
+            return
+        elif tag == 'ul' and attrs.get('id') == 'navbartor':
+            element = _Element(tag, attrs)
+            element.previous_center = self._last_center
+            self._push(element)
+            return
+        elif tag == 'span' and attrs.get('style') == 'font-size:14pt;':
+            # span належить усім відкритим <center>, у яких ще немає такого span
+            element = _Element(tag, attrs)
+            for open_element in self.stack:
+                if open_element.center_index is not None and self._centers[open_element.center_index] is None:
+                    if element.capture is None:
+                        element.capture = []
+                    self._centers[open_element.center_index] = element.capture
+            self._push(element)
+            return
+        elif tag == 'div':
+            if self._article_info is None and attrs.get('id') == 'article-film-full-info':
+                element = _Element(tag, attrs)
+                self._article_info = element
+                self._push(element)
+                return
+            if self._module_title is None and _has_class(attrs, 'module-title'):
+                element = _Element(tag, attrs)
+                self._module_title = element
+                self._push(element)
+                return
+        elif tag == 'time' and self._time_parts is None and _has_class(attrs, 'published') and self._is_open(self._article_info):
+            element = _Element(tag, attrs)
+            element.capture = self._time_parts = []
+            self._push(element)
+            return
+        elif tag == 'h1' and self._h1_parts is None and self._is_open(self._module_title):
+            element = _Element(tag, attrs)
+            element.capture = self._h1_parts = []
+            self._push(element)
+            return
+
+        self._push(_Element(tag, attrs))
+
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.handle_endtag(tag)
+
+
+    # MARK: handle_endtag
+    def handle_endtag(self, tag):
+        self._in_text = False
+        if tag in VOID_ELEMENTS:
+            return
+        for position in range(len(self.stack) - 1, -1, -1):
+            if self.stack[position].tag == tag:
+                del self.stack[position:]
+                break
+
+
+    def handle_data(self, data):
+        # Сусідні шматки тексту bs4 склеює в один вузол, тому й тут вони додаються до останнього вузла
+        for element in self.stack:
+            if element.capture is not None:
+                if self._in_text and element.capture:
+                    element.capture[-1] += data
+                else:
+                    element.capture.append(data)
+        self._in_text = True
+
+
+    def handle_comment(self, data):
+        self._in_text = False
+
+
+    def handle_decl(self, decl):
+        self._in_text = False
+
+
+    def handle_pi(self, data):
+        self._in_text = False
+
+
+    # MARK: _handle_link
+    def _handle_link(self, attrs):
+        if _has_class(attrs, 'torrent2') and self.torrent2_href is None:
+            self.torrent2_href = attrs['href']
+
+        if not _has_class(attrs, 'torrent'):
+            return
+
+        # KeyError без href - так само, як torrent['href'] у шляху BeautifulSoup
+        if attrs['href'] == '/top-online.html':
+            return
+
+        navbartor = None
+        for element in reversed(self.stack):
+            if element.tag == 'ul' and element.attrs.get('id') == 'navbartor':
+                navbartor = element
+                break
+
+        if navbartor is not None:
+            self.links.append((attrs['href'], navbartor.previous_center))
+
+
+    def _push(self, element):
+        if element.tag not in VOID_ELEMENTS:
+            self.stack.append(element)
+
+
+    def _is_open(self, element):
+        return element is not None and any(open_element is element for open_element in self.stack)
+
+
+    # MARK: result
+    def result(self):
+        if self._time_parts is not None:
+            self.site_update_date = ''.join(self._time_parts)
+        if self._h1_parts is not None:
+            self.site_game_title = ''.join(self._h1_parts).strip()
+
+        torrent_links = []
+        for href, center_index in self.links:
+            if center_index is None:
+                continue  # Продовжити, якщо <center> не знайдено
+            span_parts = self._centers[center_index]
+            if span_parts is None:
+                continue  # немає span з розміром
+            torrent_links.append((href, ''.join(part.strip() for part in span_parts)))
+
+        return self.site_update_date, self.site_game_title, torrent_links
+
+
+# MARK: parse_game_page
+def parse_game_page(html):
+    # Повертає (site_update_date, site_game_name, [(посилання на сторінку завантаження, текст з розміром), ...])
+    extractor = GamePageExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.result()
+
+
+# MARK: parse_download_page
+def parse_download_page(html):
+    # Повертає посилання a.torrent2 на .torrent файл або None
+    extractor = GamePageExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.torrent2_href
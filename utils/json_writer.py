@@ -0,0 +1,106 @@
+import json
+import os
+
+
+class StreamingJSONWriter:
+    # Записує {"name": ..., "downloads": [...]} потоково: кожен запис одразу потрапляє у тимчасовий файл,
+    # а наприкінці файл атомарно перейменовується в цільовий. При падінні старий файл залишається цілим.
+    # З indent=4 результат байт-у-байт збігається з json.dump(data, f, ensure_ascii=False, indent=4),
+    # з indent=None записується компактний JSON без пробілів.
+    # Для відновлення перерваного запуску: checkpoint() повертає стан файлу після останнього повного запису,
+    # а writer, створений з resume_state, продовжує той самий тимчасовий файл з цього місця.
+    # keep_partial=True залишає тимчасовий файл при помилці, щоб його можна було продовжити.
+    # abort() всередині with відкидає файл: цільовий файл тоді не замінюється і без винятку.
+    # index (utils.delta.OutputIndex) отримує кожен записаний запис - індекс для дельти без повторного читання файлу.
+
+    def __init__(self, path, name, indent=4, keep_partial=False, resume_state=None, index=None):
+        self.path = path
+        self.temp_path = f'{path}.partial'
+        self.name = name
+        self.indent = indent
+        self.keep_partial = keep_partial
+        self.resume_state = resume_state
+        self.index = index
+        self.count = 0
+        self.file = None
+
+
+    def __enter__(self):
+        self.open()
+        return self
+
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.file is not None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+    def open(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        if self.resume_state is not None:
+            # Усе, що було дописано після контрольної точки, відкидається
+            os.truncate(self.temp_path, self.resume_state["offset"])
+            self.file = open(self.temp_path, 'a', encoding='utf-8')
+            self.count = self.resume_state["count"]
+            return
+
+        self.file = open(self.temp_path, 'w', encoding='utf-8')
+        self.count = 0
+
+        name = json.dumps(self.name, ensure_ascii=False)
+        if self.indent is None:
+            self.file.write(f'{{"name":{name},"downloads":[')
+        else:
+            pad = ' ' * self.indent
+            self.file.write(f'{{\n{pad}"name": {name},\n{pad}"downloads": [')
+
+
+    def write(self, entry):
+        if self.indent is None:
+            text = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+            self.file.write(text if self.count == 0 else f',{text}')
+        else:
+            # Запис знаходиться на другому рівні вкладеності, тому кожен рядок зсуваємо на 2 * indent
+            pad = ' ' * (self.indent * 2)
+            text = json.dumps(entry, ensure_ascii=False, indent=self.indent)
+            text = '\n'.join(pad + line for line in text.split('\n'))
+            self.file.write(f'\n{text}' if self.count == 0 else f',\n{text}')
+
+        if self.index is not None:
+            self.index.add(entry)
+        self.count += 1
+
+
+    def checkpoint(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"offset": os.fstat(self.file.fileno()).st_size, "count": self.count}
+
+
+    def close(self):
+        if self.indent is None:
+            self.file.write(']}')
+        elif self.count:
+            self.file.write(f'\n{" " * self.indent}]\n}}')
+        else:
+            self.file.write(']\n}')
+
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        self.file = None
+
+        os.replace(self.temp_path, self.path)
+
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if not self.keep_partial and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
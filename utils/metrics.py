@@ -0,0 +1,163 @@
+import heapq
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Межі кошиків гістограм часу (секунди), як у prometheus_client
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Histogram:
+    __slots__ = ('counts', 'count', 'sum', 'min', 'max', 'slowest')
+
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)  # останній кошик - +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.slowest = []  # мін-купа (секунди, мітка) найповільніших вимірів
+
+
+class Metrics:
+    # Метрики одного запуску парсера: гістограми часу етапів, лічильники (з мітками) і частка влучань у кеші.
+    # Потокобезпечний: виміри надходять з пулу потоків і з async pipeline.
+    # Результат зберігається як JSON і як текстовий формат Prometheus (для node_exporter textfile collector).
+
+    def __init__(self, buckets=LATENCY_BUCKETS, slowest=10):
+        self.buckets = buckets
+        self.slowest = slowest
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}  # (ім'я, ((мітка, значення), ...)) -> значення
+
+
+    @contextmanager
+    def timer(self, name, label=None):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, label)
+
+
+    def observe(self, name, seconds, label=None):
+        # label (наприклад URL сторінки) зберігається лише для найповільніших вимірів
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = _Histogram(self.buckets)
+
+            position = 0
+            while position < len(self.buckets) and seconds > self.buckets[position]:
+                position += 1
+            histogram.counts[position] += 1
+            histogram.count += 1
+            histogram.sum += seconds
+            histogram.min = seconds if histogram.min is None else min(histogram.min, seconds)
+            histogram.max = seconds if histogram.max is None else max(histogram.max, seconds)
+
+            if label is not None:
+                if len(histogram.slowest) < self.slowest:
+                    heapq.heappush(histogram.slowest, (seconds, label))
+                elif seconds > histogram.slowest[0][0]:
+                    heapq.heapreplace(histogram.slowest, (seconds, label))
+
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+
+    def cache_lookup(self, cache, hit, count=1):
+        self.inc('cache_lookups', count, cache=cache, result='hit' if hit else 'miss')
+
+
+    def _quantile(self, histogram, fraction):
+        # Оцінка квантиля лінійною інтерполяцією всередині кошика (як histogram_quantile у Prometheus)
+        rank = fraction * histogram.count
+        cumulative = 0
+        for position, count in enumerate(histogram.counts):
+            if count and cumulative + count >= rank:
+                lower = self.buckets[position - 1] if position > 0 else 0.0
+                upper = self.buckets[position] if position < len(self.buckets) else histogram.max
+                value = lower + (upper - lower) * (rank - cumulative) / count
+                return min(max(value, histogram.min), histogram.max)
+            cumulative += count
+        return histogram.max
+
+
+    # MARK: snapshot
+    def snapshot(self):
+        with self._lock:
+            timings = {}
+            for name, histogram in sorted(self._histograms.items()):
+                timings[name] = {
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "min": round(histogram.min, 6),
+                    "max": round(histogram.max, 6),
+                    "p50": round(self._quantile(histogram, 0.50), 6),
+                    "p90": round(self._quantile(histogram, 0.90), 6),
+                    "p99": round(self._quantile(histogram, 0.99), 6),
+                    "buckets": {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), histogram.counts)},
+                    "slowest": [{"seconds": round(seconds, 6), "label": label}
+                                for seconds, label in sorted(histogram.slowest, reverse=True)]
+                }
+
+            counters = {}
+            cache_lookups = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                counters.setdefault(name, []).append({"labels": dict(labels), "value": value})
+                if name == 'cache_lookups':
+                    labels = dict(labels)
+                    cache_lookups.setdefault(labels["cache"], {"hit": 0, "miss": 0})[labels["result"]] += value
+
+        cache_hit_ratio = {cache: round(lookups["hit"] / (lookups["hit"] + lookups["miss"]), 4) if lookups["hit"] + lookups["miss"] else None
+                           for cache, lookups in cache_lookups.items()}
+
+        return {"timings": timings, "counters": counters, "cache_hit_ratio": cache_hit_ratio}
+
+
+    # MARK: to_prometheus
+    def to_prometheus(self, stats=None, prefix='igruha'):
+        snapshot = self.snapshot()
+        lines = [f'# TYPE {prefix}_stage_seconds histogram']
+        for name, timing in snapshot["timings"].items():
+            cumulative = 0
+            for bound, count in timing["buckets"].items():
+                cumulative += count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {timing["sum"]}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {timing["count"]}')
+
+        for name, series in snapshot["counters"].items():
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            for item in series:
+                labels = ','.join(f'{label}="{value}"' for label, value in item["labels"].items())
+                lines.append(f'{prefix}_{name}_total{{{labels}}} {item["value"]}' if labels else f'{prefix}_{name}_total {item["value"]}')
+
+        lines.append(f'# TYPE {prefix}_cache_hit_ratio gauge')
+        for cache, ratio in snapshot["cache_hit_ratio"].items():
+            if ratio is not None:
+                lines.append(f'{prefix}_cache_hit_ratio{{cache="{cache}"}} {ratio}')
+
+        if stats:
+            lines.append(f'# TYPE {prefix}_run_stat gauge')
+            for stat_name, stat_value in stats.items():
+                lines.append(f'{prefix}_run_stat{{stat="{stat_name}"}} {len(stat_value) if isinstance(stat_value, list) else stat_value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+    # MARK: export
+    def export(self, json_file, prom_file, stats=None):
+        os.makedirs(os.path.dirname(json_file) or '.', exist_ok=True)  # Create the directory if it doesn't exist
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=4)
+        with open(prom_file, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus(stats))
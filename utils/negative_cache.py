@@ -0,0 +1,107 @@
+import json
+import os
+import threading
+import time
+
+
+# Негативний кеш: ключі, перевірка яких нещодавно не дала результату, і скільки запитів вона коштувала.
+#   INVALID_PAGE        - сторінка не з грою (ключ - URL сторінки)
+#   NO_DOWNLOAD_OPTIONS - сторінка гри без жодного робочого варіанта завантаження (ключ - URL сторінки)
+#   DEAD_TORRENT        - торрент, який не вдалося перетворити в магнет-посилання (ключ - URL сторінки завантаження)
+# Запис зберігає ознаки стану, за якого його зроблено (sitemap_lastmod і/або site_update_date), і чинний,
+# поки вони ті самі і не минув термін: TTL причини (у годинах), подвоєний за кожну повторну перевірку з тим самим
+# результатом (failures), але не більше max_ttl. Зміна ознак скидає лічильник, успішна перевірка видаляє запис.
+# Записи DEAD_TORRENT мають поле page - URL сторінки гри, до якої вони належать (для розподілу між шардами).
+
+NEGATIVE_CACHE_FILE = 'negative_cache.json'
+
+
+class NegativeCache:
+
+    def __init__(self, cache_file, ttl, max_ttl=None):
+        # ttl - {причина: години}; причини без TTL (або з 0) не кешуються
+        self.cache_file = cache_file
+        self.ttl = ttl or {}
+        self.max_ttl = max_ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = False
+
+        if os.path.exists(self.cache_file):
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def expires(self, entry):
+        hours = self.ttl.get(entry["reason"], 0) * 2 ** (entry["failures"] - 1)
+        if self.max_ttl is not None:
+            hours = min(hours, self.max_ttl)
+        return entry["checked"] + hours * 3600
+
+
+    # MARK: lookup
+    def lookup(self, key, **state):
+        # Чинний запис для key або None; state - поточні ознаки (sitemap_lastmod=..., site_update_date=...)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or any(entry.get(name) != value for name, value in state.items()):
+            return None
+        if time.time() >= self.expires(entry):
+            return None
+        return entry
+
+
+    # MARK: record
+    def record(self, key, reason, requests, **state):
+        # Негативний результат перевірки; requests - скільки запитів зекономить кожне влучання в запис
+        if not self.ttl.get(reason):
+            return None
+        with self._lock:
+            previous = self._entries.get(key)
+            failures = 1
+            if previous is not None and previous["reason"] == reason and all(previous.get(name) == value for name, value in state.items()):
+                failures = previous["failures"] + 1
+            entry = {"reason": reason, **state, "failures": failures, "checked": int(time.time()), "requests": requests}
+            self._entries[key] = entry
+            self._dirty = True
+            return entry
+
+
+    def discard(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._dirty = True
+
+
+    def _page_entries(self, pages):
+        return {key: entry for key, entry in self._entries.items() if entry.get("page", key) in pages}
+
+
+    def merge(self, other, pages):
+        # Записи шарда, який обробив сторінки pages, замінюють записи цих сторінок (зокрема видалені шардом)
+        pages = set(pages)
+        with self._lock:
+            for key in self._page_entries(pages):
+                del self._entries[key]
+            self._entries.update(other._page_entries(pages))
+            self._dirty = True
+
+
+    def save(self, cache_file=None, pages=None):
+        # pages - зберегти лише записи цих сторінок (каталог шарда)
+        with self._lock:
+            if not self._dirty and cache_file is None:
+                return
+            entries = self._entries if pages is None else self._page_entries(set(pages))
+            cache_file = cache_file or self.cache_file
+            os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+            temp_file = f'{cache_file}.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_file, cache_file)
+            if cache_file == self.cache_file:
+                self._dirty = False
@@ -0,0 +1,67 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    # Обмежує кількість запитів на секунду окремо для кожного хоста (token bucket).
+    # rate=None або 0 вимикає обмеження.
+    # Circuit breaker (utils/transport.py) може призупинити хост (pause) і зменшити для нього швидкість (slow_down).
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._lock = threading.Lock()
+        self._buckets = {}  # host -> [tokens, last_refill]
+        self._penalty = {}  # host -> у скільки разів зменшено швидкість
+        self._paused_until = {}  # host -> time.monotonic(), до якого запити не надсилаються
+
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                delay = self._paused_until.get(host, 0) - now
+
+                if delay <= 0:
+                    if not self.rate:
+                        return
+
+                    rate = self.rate / self._penalty.get(host, 1)
+                    tokens, last_refill = self._buckets.get(host, (self.burst, now))
+                    tokens = min(self.burst, tokens + (now - last_refill) * rate)
+
+                    if tokens >= 1:
+                        self._buckets[host] = (tokens - 1, now)
+                        return
+
+                    self._buckets[host] = (tokens, now)
+                    delay = (1 - tokens) / rate
+
+            time.sleep(delay)
+
+
+    def pause(self, url, seconds):
+        host = urlparse(url).netloc
+        with self._lock:
+            self._paused_until[host] = max(self._paused_until.get(host, 0), time.monotonic() + seconds)
+
+
+    def slow_down(self, url, factor=2, max_penalty=16):
+        host = urlparse(url).netloc
+        with self._lock:
+            self._penalty[host] = min(max_penalty, self._penalty.get(host, 1) * factor)
+            return self._penalty[host]
+
+
+    def speed_up(self, url, factor=2):
+        host = urlparse(url).netloc
+        with self._lock:
+            self._penalty[host] = max(1, self._penalty.get(host, 1) / factor)
+            return self._penalty[host]
+
+
+    def penalty(self, url):
+        with self._lock:
+            return self._penalty.get(urlparse(url).netloc, 1)
@@ -0,0 +1,126 @@
+import sys
+
+
+# Компактне представлення записів кешу сторінок у пам'яті (JSONCacheStore).
+# Звичайний dict на кожен запис завантаження і кожну сторінку займає сотні байтів лише на структуру,
+# а однакові рядки (трекери в магнет-посиланнях, " by <uploader>" у назвах, розміри і дати)
+# повторюються в десятках тисяч записів. Тут:
+#   DownloadRecord - {"title", "uris", "uploadDate", "fileSize"} на __slots__; назва розділена на назву гри
+#                    і інтернований суфікс " by ...", магнет-посилання - на частини з інтернованим списком трекерів
+#   PageRecord     - запис сторінки: спільний (інтернований) кортеж ключів і кортеж значень, тому довільні
+#                    поля (sitemap_lastmod, etag, ...) і їхній порядок зберігаються як є
+# to_dict() відтворює вихідний dict точно, тому JSON з записів збігається з JSON зі словників байт-у-байт.
+# Записи іншої форми (наприклад, відредаговані вручну) залишаються звичайними dict.
+
+DOWNLOAD_FIELDS = ('title', 'uris', 'uploadDate', 'fileSize')
+
+# Поля сторінки з рядками, які часто повторюються між записами
+INTERNED_PAGE_FIELDS = frozenset(['site_update_date', 'last_modified'])
+
+_shapes = {}  # кортеж ключів -> той самий кортеж, один на всі записи однієї форми
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class MagnetURI:
+    # magnet:?xt=...&dn=... | &tr=...&tr=... | &xl=... - трекери однакові для багатьох торрентів
+    __slots__ = ('head', 'trackers', 'tail')
+
+    def __init__(self, head, trackers, tail):
+        self.head = head
+        self.trackers = trackers
+        self.tail = tail
+
+
+    def __str__(self):
+        return f'{self.head}{self.trackers}{self.tail}'
+
+
+def pack_uri(uri):
+    start = uri.find('&tr=')
+    if start < 0:
+        return uri
+    end = uri.find('&', start + 4)
+    while end >= 0 and uri.startswith('&tr=', end):
+        end = uri.find('&', end + 4)
+    if end < 0:
+        end = len(uri)
+    return MagnetURI(uri[:start], sys.intern(uri[start:end]), uri[end:])
+
+
+class DownloadRecord:
+    __slots__ = ('name', 'suffix', 'uris', 'uploadDate', 'fileSize')
+
+    def __init__(self, title, uris, uploadDate, fileSize):
+        # "<назва гри> by <uploader> ..." - суфікс з " by " спільний для багатьох записів
+        split = title.rfind(' by ')
+        if split < 0:
+            split = len(title)
+        self.name = title[:split]
+        self.suffix = sys.intern(title[split:])
+        self.uris = tuple(pack_uri(uri) for uri in uris)
+        self.uploadDate = _intern(uploadDate)
+        self.fileSize = _intern(fileSize)
+
+
+    def to_dict(self):
+        return {
+            "title": self.name + self.suffix,
+            "uris": [str(uri) for uri in self.uris],
+            "uploadDate": self.uploadDate,
+            "fileSize": self.fileSize
+        }
+
+
+class PageRecord:
+    __slots__ = ('keys', 'values')
+
+    def __init__(self, entry):
+        keys = tuple(entry)
+        self.keys = _shapes.setdefault(keys, keys)
+        self.values = tuple(pack_downloads(value) if key == 'download_options'
+                            else _intern(value) if key in INTERNED_PAGE_FIELDS else value
+                            for key, value in entry.items())
+
+
+    def to_dict(self):
+        return {key: unpack_downloads(value) if key == 'download_options' else value
+                for key, value in zip(self.keys, self.values)}
+
+
+def _is_download(entry):
+    return (isinstance(entry, dict) and tuple(entry) == DOWNLOAD_FIELDS
+            and isinstance(entry["title"], str) and isinstance(entry["uris"], list)
+            and all(isinstance(uri, str) for uri in entry["uris"]))
+
+
+def pack_downloads(downloads):
+    if not isinstance(downloads, list):
+        return downloads
+    return tuple(DownloadRecord(**download) if _is_download(download) else download for download in downloads)
+
+
+def unpack_downloads(downloads):
+    if not isinstance(downloads, tuple):
+        return downloads
+    return [download.to_dict() if isinstance(download, DownloadRecord) else download for download in downloads]
+
+
+def pack_json_object(entry):
+    # object_hook для json.load: записи пакуються одразу при читанні файлу, без проміжного дерева з dict
+    if _is_download(entry):
+        return DownloadRecord(**entry)
+    return pack_entry(entry)
+
+
+def pack_entry(entry):
+    # dict сторінки -> PageRecord (або той самий dict, якщо це не запис сторінки)
+    if isinstance(entry, dict) and isinstance(entry.get("download_options"), list):
+        return PageRecord(entry)
+    return entry
+
+
+def unpack_entry(record):
+    return record.to_dict() if isinstance(record, PageRecord) else record
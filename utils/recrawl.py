@@ -0,0 +1,127 @@
+import heapq
+import json
+import logging
+import os
+
+
+# Адаптивний планувальник повторних перевірок сторінок (інкрементальний режим).
+# У записі кешу сторінки зберігається історія перевірок:
+#   first_checked - номер запуску першої перевірки
+#   last_checked  - номер запуску останньої перевірки
+#   changes       - номери запусків, у яких змінилась site_update_date (останні HISTORY_SIZE)
+# За нею оцінюється, як часто сторінка змінюється, і скільки запусків можна її не перевіряти:
+# від 1 (гаряча сторінка) до max_interval (давно не змінювалась). Після першої перевірки і після кожної зміни
+# інтервал дорівнює 1 і далі приблизно подвоюється, поки сторінка не змінюється.
+# На початку запуску plan() вибирає сторінки, черга яких настала, - не більше budget, найбільш прострочені першими.
+# Решта сторінок (без ознаки зміни в sitemap) береться з кешу без запиту.
+#
+# cache/recrawl.json: {"run": номер запуску, "checks": [URL, вибрані для перевірки в цьому запуску], "finished": чи завершився він} -
+# відновлений з контрольної точки запуск і шарди використовують той самий план. Номер запуску зараховується лише
+# після успішного завершення (finish()): запуск, перерваний або зупинений через недоступний sitemap, не зсуває інтервали,
+# і наступний план отримує той самий номер.
+
+RECRAWL_FILE = 'recrawl.json'
+HISTORY_SIZE = 8
+
+
+class RecrawlScheduler:
+
+    def __init__(self, state_file, max_interval=8, budget=None):
+        self.state_file = state_file
+        self.max_interval = max(1, max_interval)
+        self.budget = budget
+        self.run = 0
+        self.checks = None  # set URL для перевірки; None - план поточного запуску ще не складено
+        self.finished = True
+
+
+    def load(self):
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            self.run = state["run"]
+            self.checks = set(state["checks"])
+            self.finished = state.get("finished", True)
+        return self
+
+
+    def save(self, state_file=None, urls=None):
+        # urls - зберегти план лише для цих URL (каталог шарда)
+        checks = self.checks or set()
+        if urls is not None:
+            checks = [url for url in urls if url in checks]
+        else:
+            checks = sorted(checks)
+        state_file = state_file or self.state_file
+        temp_file = f'{state_file}.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as file:
+            json.dump({"run": self.run, "checks": checks, "finished": self.finished}, file, ensure_ascii=False)
+        os.replace(temp_file, state_file)
+
+
+    def finish(self):
+        # Запуск успішно завершено - наступний план матиме наступний номер
+        self.finished = True
+        self.save()
+
+
+    # MARK: interval
+    def interval(self, entry):
+        # Кількість запусків між перевірками сторінки; залежить лише від її історії
+        first = entry.get("first_checked")
+        last = entry.get("last_checked")
+        if first is None or last is None:
+            return 1
+
+        changes = entry.get("changes") or []
+        # Історія змін обрізана - частота оцінюється за період, який вона покриває
+        start = changes[0] if len(changes) >= HISTORY_SIZE else first
+        interval = (last - start + 1) // (len(changes) + 1)
+        if changes:
+            interval = min(interval, last - changes[-1] + 1)
+        return max(1, min(self.max_interval, interval))
+
+
+    # MARK: plan
+    def plan(self, cache):
+        # Новий запуск: вибирає сторінки кешу, які треба перевірити. Номер запуску - наступний після завершеного
+        # (план незавершеного запуску, який не продовжили через --resume, складається заново з тим самим номером).
+        self.load()
+        if self.finished:
+            self.run += 1
+        self.finished = False
+        due = []
+        total = 0
+        for position, (url, entry) in enumerate(cache.items()):
+            total += 1
+            interval = self.interval(entry)
+            waited = self.run - entry.get("last_checked", 0)
+            if waited >= interval:
+                due.append((-waited / interval, interval, position, url))
+
+        selected = due
+        if self.budget is not None and len(due) > self.budget:
+            selected = heapq.nsmallest(self.budget, due)
+        self.checks = {url for _, _, _, url in selected}
+        self.save()
+
+        budget_text = f" (budget {self.budget})" if self.budget is not None else ""
+        plan_text = f"Recrawl run {self.run}: {len(due)} of {total} cached pages due, {len(self.checks)} to check{budget_text}"
+        print(plan_text)
+        logging.info(plan_text)
+
+
+    def skips(self, url):
+        return url not in self.checks
+
+
+    # MARK: checked
+    def checked(self, entry, changed):
+        # Поля історії для запису кешу після перевірки сторінки в цьому запуску (entry - попередній запис або None)
+        if not entry or "first_checked" not in entry:
+            return {"first_checked": self.run, "last_checked": self.run, "changes": []}
+
+        changes = list(entry.get("changes") or [])
+        if changed:
+            changes = (changes + [self.run])[-HISTORY_SIZE:]
+        return {"first_checked": entry["first_checked"], "last_checked": self.run, "changes": changes}
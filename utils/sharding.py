@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+import shutil
+
+from utils.cache_store import open_cache_store
+from utils.recrawl import RECRAWL_FILE
+from utils.negative_cache import NEGATIVE_CACHE_FILE
+
+
+# Шардований запуск: URL із sitemap розподіляються за стабільним хешем на shard_count шардів,
+# кожен шард обробляється окремим IgruhaParser (в окремому процесі або на окремому раннері)
+# зі своїм каталогом shards/shard-<k>/ (вихідний файл, кеші, лог), а IgruhaParser.merge_shards
+# збирає результати в DATA_FILE і основні кеші так, ніби всі URL оброблено одним запуском.
+#
+# Файли каталогу шарда:
+#   shard.json     - [глобальний індекс, url] сторінок шарда, <lastmod> з sitemap і шляхи файлів шарда
+#   manifest.jsonl - рядок [локальний індекс, кількість записів у вихідному файлі] на кожну сторінку
+#   stats.json     - stats шарда після завершення
+
+SHARD_FILE = 'shard.json'
+MANIFEST_FILE = 'manifest.jsonl'
+STATS_FILE = 'stats.json'
+
+
+def shard_of(url, shard_count):
+    # Не hash(): він залежить від PYTHONHASHSEED і відрізняється між процесами
+    digest = hashlib.sha1(url.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
+
+
+def split_urls(urls, shard_count):
+    # [[глобальний індекс, url], ...] для кожного шарда; індекси - позиції в sitemap, починаючи з 1
+    shards = [[] for _ in range(shard_count)]
+    for index, url in enumerate(urls, start=1):
+        shards[shard_of(url, shard_count)].append([index, url])
+    return shards
+
+
+def shard_dir(shards_dir, shard):
+    return os.path.join(shards_dir, f'shard-{shard}')
+
+
+def shard_kwargs(parser_kwargs, shards_dir, shard):
+    # Аргументи IgruhaParser для шарда: ті самі налаштування, але власні файли в каталозі шарда.
+    # Резервні копії і дельта робляться лише після об'єднання.
+    directory = shard_dir(shards_dir, shard)
+    cache_dir = os.path.join(directory, 'cache')
+    return dict(parser_kwargs,
+                log_file=os.path.join(directory, 'parser.log'),
+                data_file=os.path.join(directory, os.path.basename(parser_kwargs["data_file"])),
+                backup_dir=None,
+                cache_dir=cache_dir,
+                cache_file=os.path.join(cache_dir, os.path.basename(parser_kwargs["cache_file"])),
+                delta_output=False,
+                manifest_file=os.path.join(directory, MANIFEST_FILE))
+
+
+# MARK: prepare_shard
+def prepare_shard(parser, kwargs, entries):
+    # Створює каталог шарда заново: список його URL, записи кешу сторінок лише для цих URL,
+    # копії кешів торрентів і перекладів основного запуску, план перевірок і записи негативного кешу для URL шарда
+    directory = os.path.dirname(kwargs["data_file"])
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(kwargs["cache_dir"])
+
+    store = open_cache_store(kwargs["cache_backend"], kwargs["cache_file"])
+    for _, url in entries:
+        cache_entry = parser.cache.get(url)
+        if cache_entry is not None:
+            store.set(url, cache_entry)
+    store.save()
+    store.close()
+
+    for name in ('torrent_cache.json', 'translation_cache.json', 'translation_cache.json.journal'):
+        source = os.path.join(parser.cache_dir, name)
+        if os.path.exists(source):
+            shutil.copy2(source, os.path.join(kwargs["cache_dir"], name))
+
+    # План складається один раз для всього sitemap, щоб бюджет перевірок ділився між шардами так само,
+    # як при звичайному запуску
+    if parser.recrawl is not None:
+        parser.plan_recrawl()
+        parser.recrawl.save(os.path.join(kwargs["cache_dir"], RECRAWL_FILE), urls=[url for _, url in entries])
+
+    if parser.negative_cache is not None:
+        parser.negative_cache.save(os.path.join(kwargs["cache_dir"], NEGATIVE_CACHE_FILE), pages=[url for _, url in entries])
+
+    with open(os.path.join(directory, SHARD_FILE), 'w', encoding='utf-8') as file:
+        json.dump({
+            "urls": entries,
+            "sitemap_lastmod": {url: parser.sitemap_lastmod[url] for _, url in entries if url in parser.sitemap_lastmod},
+            "data_file": kwargs["data_file"],
+            "cache_dir": kwargs["cache_dir"],
+            "cache_file": kwargs["cache_file"],
+            "cache_backend": kwargs["cache_backend"]
+        }, file, ensure_ascii=False)
+
+
+# MARK: run_shard
+def run_shard(kwargs, resume=False):
+    # Виконується в дочірньому процесі (або на окремому раннері): обробляє URL одного шарда
+    from igruha_parser import IgruhaParser
+
+    directory = os.path.dirname(kwargs["data_file"])
+    with open(os.path.join(directory, SHARD_FILE), 'r', encoding='utf-8') as file:
+        shard = json.load(file)
+
+    parser = IgruhaParser(**kwargs)
+    parser.sitemap_lastmod = shard["sitemap_lastmod"]
+    if parser.recrawl is not None:
+        parser.recrawl.load()
+    parser.run([url for _, url in shard["urls"]], resume=resume)
+
+    with open(os.path.join(directory, STATS_FILE), 'w', encoding='utf-8') as file:
+        json.dump(parser.stats, file, ensure_ascii=False, indent=4)
+    return len(shard["urls"])
+
+
+# MARK: load_shard
+def load_shard(directory):
+    # Результати завершеного шарда: {"urls", "stats", "downloads": [записи кожної сторінки в порядку шарда], ...}
+    with open(os.path.join(directory, SHARD_FILE), 'r', encoding='utf-8') as file:
+        shard = json.load(file)
+    if not os.path.exists(os.path.join(directory, STATS_FILE)):
+        raise ValueError(f'Shard {directory} has not finished')
+    with open(os.path.join(directory, STATS_FILE), 'r', encoding='utf-8') as file:
+        shard["stats"] = json.load(file)
+
+    # Після відновлення з контрольної точки сторінки можуть повторюватися - діє останній рядок
+    counts = {}
+    with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as file:
+        for line in file:
+            local_index, count = json.loads(line)
+            counts[local_index] = count
+
+    with open(shard["data_file"], 'r', encoding='utf-8') as file:
+        downloads = json.load(file)["downloads"]
+
+    shard["downloads"] = []
+    offset = 0
+    for local_index in range(1, len(shard["urls"]) + 1):
+        if local_index not in counts:
+            raise ValueError(f'Shard {directory} is missing page {local_index} in {MANIFEST_FILE}')
+        shard["downloads"].append(downloads[offset:offset + counts[local_index]])
+        offset += counts[local_index]
+    if offset != len(downloads):
+        raise ValueError(f'Shard {directory}: {MANIFEST_FILE} does not match {shard["data_file"]}')
+    return shard
+
+
+# MARK: run_local_shards
+def run_local_shards(parser, parser_kwargs, urls, shard_count, shards_dir, processes=None, resume=False):
+    # Усі шарди на одній машині пулом процесів, потім об'єднання в parser.
+    # resume=True - продовжити шарди, вже підготовлені в shards_dir (urls не потрібні): завершені шарди
+    # не запускаються повторно, решта продовжуються з контрольних точок
+    import functools
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    shard_dirs = [shard_dir(shards_dir, shard) for shard in range(shard_count)]
+    all_kwargs = [shard_kwargs(parser_kwargs, shards_dir, shard) for shard in range(shard_count)]
+    if resume:
+        for directory in shard_dirs:
+            if not os.path.exists(os.path.join(directory, SHARD_FILE)):
+                raise ValueError(f'Shard {directory} has not been prepared, nothing to resume')
+        pending = [shard for shard, directory in enumerate(shard_dirs) if not os.path.exists(os.path.join(directory, STATS_FILE))]
+    else:
+        for shard, entries in enumerate(split_urls(urls, shard_count)):
+            prepare_shard(parser, all_kwargs[shard], entries)
+        pending = list(range(shard_count))
+
+    # spawn: дочірні процеси не успадковують потоки і налаштування logging батьківського процесу
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processes or max(len(pending), 1), mp_context=context) as executor:
+        counts = executor.map(functools.partial(run_shard, resume=resume), [all_kwargs[shard] for shard in pending])
+        for shard, count in zip(pending, counts):
+            print(f"Shard {shard + 1}/{shard_count} done: {count} URLs")
+
+    parser.merge_shards(shard_dirs)
@@ -0,0 +1,163 @@
+import logging
+import queue
+import threading
+import time
+import zlib
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+# Потокове читання sitemap: (loc, lastmod) віддаються по мірі надходження байтів відповіді,
+# без завантаження всього файлу і без побудови всього дерева XML.
+#   <urlset>       - записи <url> віддаються одразу
+#   <sitemapindex> - дочірні sitemap завантажуються паралельно (concurrency потоків), кожен у власну чергу,
+#                    а записи віддаються в порядку індексу; вкладені індекси обробляються так само (до max_depth)
+# Стиснені sitemap (.xml.gz без Content-Encoding) розпізнаються за сигнатурою gzip.
+# Помилка завантаження або розбору одного sitemap записується в лог і в failed; записи, прочитані до неї, залишаються,
+# але список URL неповний.
+
+CHUNK_SIZE = 64 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+MAX_DEPTH = 3
+
+_DONE = object()  # кінець записів дочірнього sitemap у його черзі
+
+
+def _local_name(tag):
+    # '{http://www.sitemaps.org/schemas/sitemap/0.9}loc' -> 'loc'
+    return tag.rpartition('}')[2]
+
+
+def _child_text(element, name):
+    for child in element:
+        if _local_name(child.tag) == name:
+            return child.text.strip() if child.text and child.text.strip() else None
+    return None
+
+
+class SitemapReader:
+
+    def __init__(self, get, concurrency=4, max_depth=MAX_DEPTH, metrics=None):
+        # get(url, stage=..., stream=True) -> requests.Response (IgruhaParser._get)
+        self.get = get
+        self.concurrency = max(1, concurrency)
+        self.max_depth = max_depth
+        self.metrics = metrics
+        self.failed = []  # sitemap, які не вдалося завантажити або розібрати до кінця
+        self._seen = set()
+        self._seen_lock = threading.Lock()
+        self._closed = threading.Event()
+
+
+    # MARK: entries
+    def entries(self, sitemap_url):
+        # Генератор (loc, lastmod). Кореневий sitemap читається в потоці, що перебирає записи,
+        # тому перший URL доступний, щойно прийшов перший блок відповіді.
+        self._seen = {sitemap_url}
+        self.failed = []
+        self._closed.clear()
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='sitemap')
+        try:
+            yield from self._expand(executor, self._read(sitemap_url), depth=0)
+        finally:
+            # Перебір зупинено достроково (або завершено): дочірні sitemap більше не потрібні
+            self._closed.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+    def _expand(self, executor, items, depth):
+        # items - ('url', loc, lastmod) або ('sitemap', loc, None). Дочірні sitemap ставляться в пул одразу,
+        # як тільки з'являються в індексі, а їхні записи віддаються після записів, що йдуть перед ними.
+        children = []
+        for kind, loc, lastmod in items:
+            if kind == 'url':
+                yield from self._drain(executor, children, depth)
+                children = []
+                yield loc, lastmod
+                continue
+
+            if depth >= self.max_depth:
+                logging.warning(f"Sitemap index nesting deeper than {self.max_depth}, skipping {loc}")
+                continue
+            with self._seen_lock:
+                if loc in self._seen:
+                    continue
+                self._seen.add(loc)
+            child_queue = queue.Queue()
+            executor.submit(self._read_into, loc, child_queue)
+            children.append(child_queue)
+
+        yield from self._drain(executor, children, depth)
+
+
+    def _drain(self, executor, children, depth):
+        for child_queue in children:
+            yield from self._expand(executor, iter(child_queue.get, _DONE), depth + 1)
+
+
+    def _read_into(self, sitemap_url, child_queue):
+        # Виконується в пулі: записи дочірнього sitemap у його чергу
+        try:
+            for item in self._read(sitemap_url):
+                child_queue.put(item)
+        finally:
+            child_queue.put(_DONE)
+
+
+    # MARK: _read
+    def _read(self, sitemap_url):
+        # Завантажує один sitemap блоками і віддає ('url' | 'sitemap', loc, lastmod) по мірі розбору
+        started = time.perf_counter()
+        count = 0
+        try:
+            response = self.get(sitemap_url, stage='sitemap', stream=True)
+        except requests.RequestException as e:
+            logging.error(f"Error connecting to {sitemap_url}: {e}")
+            self.failed.append(sitemap_url)
+            return
+
+        try:
+            response.raise_for_status()
+            parser = ET.XMLPullParser(events=('start', 'end'))
+            decompressor = None
+            root = None
+            for chunk in response.iter_content(CHUNK_SIZE):
+                if self._closed.is_set():
+                    return
+                if not chunk:
+                    continue
+                if self.metrics is not None:
+                    self.metrics.inc('response_bytes', len(chunk), stage='sitemap')
+                if root is None and decompressor is None and chunk.startswith(GZIP_MAGIC):
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                if decompressor is not None:
+                    chunk = decompressor.decompress(chunk)
+
+                parser.feed(chunk)
+                for event, element in parser.read_events():
+                    if root is None:
+                        root = element
+                    if event != 'end':
+                        continue
+                    name = _local_name(element.tag)
+                    if name not in ('url', 'sitemap'):
+                        continue
+                    loc = _child_text(element, 'loc')
+                    if loc is not None:
+                        count += 1
+                        yield name, loc, _child_text(element, 'lastmod')
+                    # Прочитані записи видаляються з дерева, тому пам'ять не залежить від розміру sitemap
+                    root.clear()
+            parser.close()
+        except requests.RequestException as e:
+            logging.error(f"Error connecting to {sitemap_url}: {e}")
+            self.failed.append(sitemap_url)
+        except (ET.ParseError, zlib.error) as e:
+            logging.error(f"Error parsing {sitemap_url} after {count} entries: {e}")
+            self.failed.append(sitemap_url)
+        finally:
+            response.close()
+            if self.metrics is not None:
+                self.metrics.observe('sitemap_read', time.perf_counter() - started, label=sitemap_url)
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+
+
+class TorrentCache:
+    # Кеш метаданих .torrent файлів за URL торрента: ETag/Last-Modified, довжина і SHA-1 тіла,
+    # а також вже обчислені магнет-посилання, дата і розмір.
+    # Незмінений торрент не завантажується повторно (умовний GET -> 304) або принаймні
+    # не розбирається ще раз (SHA-1 тіла збігся з кешованим).
+    # Розмір обмежується max_bytes: найдавніше використані записи витісняються при збереженні.
+    # last_used - час запуску (завантаження кешу), а не кожного влучання: сам по собі він файл не змінює,
+    # і save() перезаписує файл, лише якщо записи додано, змінено або витіснено (файл комітиться в репозиторій).
+
+    def __init__(self, cache_file, max_bytes=None):
+        self.cache_file = cache_file
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._run_time = int(time.time())
+        self._dirty = False
+
+        if os.path.exists(self.cache_file):
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def get(self, torrent_url):
+        with self._lock:
+            return self._entries.get(torrent_url)
+
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+
+    def hit(self, torrent_url, sha1=None):
+        # Повертає (магнет, дата, розмір) з кешу, якщо запис є і (за наявності sha1) тіло не змінилось
+        with self._lock:
+            entry = self._entries.get(torrent_url)
+            if not entry or (sha1 is not None and entry["sha1"] != sha1):
+                self.misses += 1
+                return None
+
+            entry["last_used"] = self._run_time
+            self.hits += 1
+            return entry["magnet_link"], entry["date"], entry["size"]
+
+
+    def put(self, torrent_url, response_headers, length, sha1, magnet_link, date, size):
+        with self._lock:
+            self._entries[torrent_url] = {
+                "etag": response_headers.get("ETag"),
+                "last_modified": response_headers.get("Last-Modified"),
+                "length": length,
+                "sha1": sha1,
+                "magnet_link": magnet_link,
+                "date": date,
+                "size": size,
+                "last_used": self._run_time
+            }
+            self._dirty = True
+
+
+    def merge(self, other):
+        # Переносить записи іншого кешу (наприклад, шарда); для спільних URL залишається найсвіжіше використаний.
+        # Повертає кількість нових або змінених записів (лише новіший last_used файл не змінює)
+        with self._lock:
+            merged = 0
+            for torrent_url, entry in other._entries.items():
+                current = self._entries.get(torrent_url)
+                if current is not None and entry["last_used"] <= current["last_used"]:
+                    continue
+                if current is None or any(entry[name] != current.get(name) for name in entry if name != "last_used"):
+                    merged += 1
+                    self._dirty = True
+                self._entries[torrent_url] = entry
+            return merged
+
+
+    def prune(self, max_bytes=None, max_age_days=None):
+        # Видаляє записи, старші за max_age_days, і найдавніше використані записи понад max_bytes.
+        # Повертає кількість видалених записів.
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        with self._lock:
+            before = len(self._entries)
+
+            if max_age_days is not None:
+                threshold = time.time() - max_age_days * 86400
+                self._entries = {url: entry for url, entry in self._entries.items() if entry["last_used"] >= threshold}
+
+            if max_bytes:
+                sizes = {url: len(json.dumps({url: entry}, ensure_ascii=False).encode('utf-8')) for url, entry in self._entries.items()}
+                total = sum(sizes.values())
+                for url in sorted(self._entries, key=lambda url: self._entries[url]["last_used"]):
+                    if total <= max_bytes:
+                        break
+                    total -= sizes[url]
+                    del self._entries[url]
+
+            if len(self._entries) != before:
+                self._dirty = True
+            return before - len(self._entries)
+
+
+    def save(self):
+        self.prune()
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)  # Create the directory if it doesn't exist
+            temp_file = f'{self.cache_file}.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                # Без відступів: файл великий і не призначений для ручного редагування
+                json.dump(self._entries, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(temp_file, self.cache_file)
+            self._dirty = False
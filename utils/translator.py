@@ -1,48 +1,154 @@
-import requests
 import json
 import os
+import random
+import threading
+import time
 
 
 CACHE_DIR = 'cache'
 CACHE_FILE = os.path.join(CACHE_DIR, 'translation_cache.json')
 
+TRANSLATE_ENDPOINT = 'https://translate.googleapis.com/translate_a/single'
 
-def load_cache():
-    # Завантажує кеш з файлу, якщо файл існує.
-    if os.path.exists(CACHE_FILE):
-        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+# Максимальна довжина тексту одного пакетного запиту (обмеження на довжину URL)
+MAX_BATCH_CHARS = 4000
 
-def save_cache(cache):
-    # Зберігає кеш у файл.
-    os.makedirs(CACHE_DIR , exist_ok=True)  # Create the directory if it doesn't exist
-    with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cache, f, ensure_ascii=False, indent=4)
 
+class TranslationCache:
+    # Кеш перекладів, який завантажується з файлу один раз і повністю тримається в пам'яті.
+    # Нові переклади не перезаписують весь файл, а дописуються рядком у журнал (cache_file + '.journal').
+    # save() зливає журнал в основний файл; якщо процес впав, журнал буде застосовано при наступному завантаженні.
 
-def translate_line(text, target_language='en', source_language='auto'):
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = cache_file
+        self.journal_file = f'{cache_file}.journal'
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._journal = None
+        self._entries = self._read_all()
+
+
+    def __contains__(self, text):
+        with self._lock:
+            return text in self._entries
+
+
+    def get(self, text):
+        with self._lock:
+            if text not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._entries[text]
+
+
+    def set(self, text, translated_text):
+        with self._lock:
+            self._entries[text] = translated_text
+
+            if self._journal is None:
+                os.makedirs(os.path.dirname(self.journal_file) or '.', exist_ok=True)
+                self._journal = open(self.journal_file, 'a', encoding='utf-8')
+            self._journal.write(json.dumps([text, translated_text], ensure_ascii=False) + '\n')
+            self._journal.flush()
+
+
+    def merge(self, other):
+        # Додає переклади іншого кешу (наприклад, шарда), яких тут ще немає
+        merged = 0
+        for text, translated_text in other._read_all().items():
+            if text not in self:
+                self.set(text, translated_text)
+                merged += 1
+        return merged
+
+
+    def save(self):
+        # Зливає журнал в основний файл: у пам'яті вже є і файл, і всі записи журналу
+        with self._lock:
+            if self._journal is None and not os.path.exists(self.journal_file):
+                return
+
+            os.makedirs(os.path.dirname(self.cache_file) or '.', exist_ok=True)  # Create the directory if it doesn't exist
+            temp_file = f'{self.cache_file}.tmp'
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=4)
+            os.replace(temp_file, self.cache_file)
+
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            os.remove(self.journal_file)
+
+
+    def _read_all(self):
+        cache = {}
+        if os.path.exists(self.cache_file):
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        text, translated_text = json.loads(line)
+                    except ValueError:
+                        continue  # Недописаний рядок після аварійного завершення
+                    cache[text] = translated_text
+
+        return cache
+
+
+_default_cache = None
+
+
+def _request_translation(text, target_language, source_language, endpoint=TRANSLATE_ENDPOINT, retries=3, backoff=1.0):
+    # Один HTTP-запит на переклад з повторами при тимчасових помилках (мережа, 429, 5xx).
+    # requests імпортується тут, а не в модулі: TranslationCache використовується і без мережі
+    import requests
+
+    params = {'client': 'gtx', 'sl': source_language, 'tl': target_language, 'dt': 't', 'q': text}
+
+    for attempt in range(retries + 1):
+        try:
+            response = requests.get(endpoint, params=params, timeout=30)
+            if response.status_code == 429 or response.status_code >= 500:
+                response.raise_for_status()
+            break
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.HTTPError):
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt + random.uniform(0, backoff))
+
+    response.raise_for_status()  # перевіряємо на помилки
+    data = response.json()
+
+    return ''.join(part[0] for part in data[0] if part[0])  # об'єднуємо перекладені частини
+
+
+def translate_line(text, target_language='en', source_language='auto', cache=None, endpoint=TRANSLATE_ENDPOINT):
+    import requests
+
+    global _default_cache
+    if cache is None:
+        if _default_cache is None:
+            _default_cache = TranslationCache()
+        cache = _default_cache
 
     # Перевіряємо, чи є текст вже в кеші
-    cache = load_cache()
-    if text in cache:
+    translated_text = cache.get(text)
+    if translated_text is not None:
         # print(f'(TRANSLATE_TEXT) CACHE HIT FOR "{text}"')
-        return cache[text]
-
-    url = f"https://translate.googleapis.com/translate_a/single?client=gtx&sl={source_language}&tl={target_language}&dt=t&q={requests.utils.quote(text)}"
+        return translated_text
 
     # print(f'(TRANSLATE_TEXT) "{text}"')
-    
+
     try:
-        response = requests.get(url)
-        response.raise_for_status()  # перевіряємо на помилки
-        data = response.json()
+        translated_text = _request_translation(text, target_language, source_language, endpoint)
 
-        translated_text = ''.join(part[0] for part in data[0])  # об'єднуємо перекладені частини
+        cache.set(text, translated_text)
 
-        cache[text] = translated_text
-        save_cache(cache)
-        
         return translated_text
 
     except requests.exceptions.RequestException as e:
@@ -50,4 +156,46 @@ def translate_line(text, target_language='en', source_language='auto'):
         return None
 
 
-
+def translate_batch(texts, target_language='en', source_language='auto', cache=None, endpoint=TRANSLATE_ENDPOINT):
+    # Перекладає список рядків кількома багаторядковими запитами. Повертає {текст: переклад}.
+    # Якщо кількість рядків у відповіді не збігається із запитом, пакет перекладається по одному рядку.
+    import requests
+
+    translations = {}
+    pending = []
+    for text in dict.fromkeys(texts):  # без дублікатів, зі збереженням порядку
+        translated_text = cache.get(text) if cache is not None else None
+        if translated_text is not None:
+            translations[text] = translated_text
+        else:
+            pending.append(text)
+
+    chunks = []
+    for text in pending:
+        if '\n' in text:
+            chunks.append([text])  # Багаторядковий текст не можна надійно розділити після перекладу
+        elif chunks and '\n' not in chunks[-1][0] and sum(len(line) + 1 for line in chunks[-1]) + len(text) < MAX_BATCH_CHARS:
+            chunks[-1].append(text)
+        else:
+            chunks.append([text])
+
+    for chunk in chunks:
+        translated_lines = None
+        if len(chunk) > 1:
+            try:
+                translated_lines = _request_translation('\n'.join(chunk), target_language, source_language, endpoint).split('\n')
+            except requests.exceptions.RequestException as e:
+                print(f'Error: {e}')
+
+        if translated_lines is None or len(translated_lines) != len(chunk):
+            for text in chunk:
+                translations[text] = translate_line(text, target_language, source_language, cache, endpoint)
+            continue
+
+        for text, translated_text in zip(chunk, translated_lines):
+            translated_text = translated_text.strip()
+            translations[text] = translated_text
+            if cache is not None:
+                cache.set(text, translated_text)
+
+    return translations
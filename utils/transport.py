@@ -0,0 +1,142 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# Статуси, після яких GET повторюється
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+# Статуси, якими сайт просить зменшити навантаження (рахуються circuit breaker)
+THROTTLE_STATUSES = frozenset([429, 503])
+
+
+def parse_retry_after(value):
+    # Retry-After: кількість секунд або HTTP-дата. Повертає секунди або None.
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    # Після threshold відповідей 429/503 поспіль від одного хоста "розмикається": хост призупиняється на
+    # cooldown секунд (або на Retry-After, якщо він довший), а швидкість запитів до нього зменшується вдвічі.
+    # Після recovery успішних відповідей поспіль швидкість поступово повертається.
+
+    def __init__(self, rate_limiter, threshold=5, cooldown=30.0, recovery=50):
+        self.rate_limiter = rate_limiter
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.recovery = recovery
+        self.trips = 0
+        self._lock = threading.Lock()
+        self._hosts = {}  # host -> [відповідей 429/503 поспіль, успішних відповідей поспіль]
+
+
+    def record(self, url, status_code, retry_after=None):
+        if not self.threshold:
+            return
+
+        host = urlparse(url).netloc
+        with self._lock:
+            counters = self._hosts.setdefault(host, [0, 0])
+
+            if status_code in THROTTLE_STATUSES:
+                counters[0] += 1
+                counters[1] = 0
+                if counters[0] < self.threshold:
+                    return
+                counters[0] = 0
+                self.trips += 1
+                pause = max(self.cooldown, retry_after or 0)
+                self.rate_limiter.pause(url, pause)
+                penalty = self.rate_limiter.slow_down(url)
+                logging.warning(f'(CIRCUIT BREAKER) {host} returned {status_code} {self.threshold} times in a row: '
+                                f'pausing for {pause:.1f}s, request rate / {penalty:g}')
+                return
+
+            counters[0] = 0
+            counters[1] += 1
+            if counters[1] >= self.recovery and self.rate_limiter.penalty(url) > 1:
+                counters[1] = 0
+                penalty = self.rate_limiter.speed_up(url)
+                logging.info(f'(CIRCUIT BREAKER) {host} recovered: request rate / {penalty:g}')
+
+
+class Transport:
+    # Усі HTTP-запити парсера: таймаути, пул з'єднань під кількість потоків, повтори GET з експоненційною
+    # затримкою і джитером (з урахуванням Retry-After), circuit breaker і метрики.
+    # session - сесія cloudscraper; її адаптери (зокрема CipherSuiteAdapter для https) зберігаються,
+    # змінюється лише розмір пулу.
+
+    def __init__(self, session, rate_limiter, metrics, connect_timeout=10, read_timeout=30, retries=3, backoff=1.0,
+                 max_backoff=60.0, pool_size=10, breaker_threshold=5, breaker_cooldown=30.0):
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = CircuitBreaker(rate_limiter, threshold=breaker_threshold, cooldown=breaker_cooldown)
+
+        for adapter in self.session.adapters.values():
+            if isinstance(adapter, HTTPAdapter):
+                adapter._pool_connections = adapter._pool_maxsize = pool_size
+                adapter.init_poolmanager(pool_size, pool_size, block=adapter._pool_block)
+
+
+    def _backoff_delay(self, attempt):
+        # Експоненційна затримка з джитером, щоб потоки не повторювали запити одночасно
+        return min(self.max_backoff, self.backoff * 2 ** attempt + random.uniform(0, self.backoff))
+
+
+    # MARK: get
+    def get(self, url, stage='request', **kwargs):
+        # stage - назва етапу для метрик: sitemap, page, download_page, torrent
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.retries + 1):
+            self.rate_limiter.wait(url)
+            try:
+                with self.metrics.timer(f'{stage}_fetch', label=url):
+                    response = self.session.get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == self.retries:
+                    raise
+                self.metrics.inc('http_retries', stage=stage, reason=type(e).__name__)
+                delay = self._backoff_delay(attempt)
+                logging.warning(f'(RETRY {attempt + 1}/{self.retries}) {url}: {e}, retrying in {delay:.1f}s')
+                time.sleep(delay)
+                continue
+
+            self.metrics.inc('http_responses', stage=stage, status=response.status_code)
+            # Тіло потокової відповіді (stream=True) читає і рахує той, хто її запросив
+            if not kwargs.get('stream'):
+                self.metrics.inc('response_bytes', len(response.content), stage=stage)
+
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.breaker.record(url, response.status_code, retry_after)
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+
+            response.close()
+            self.metrics.inc('http_retries', stage=stage, reason=str(response.status_code))
+            delay = min(self.max_backoff, retry_after) if retry_after is not None else self._backoff_delay(attempt)
+            logging.warning(f'(RETRY {attempt + 1}/{self.retries}) {url}: HTTP {response.status_code}, retrying in {delay:.1f}s')
+            time.sleep(delay)